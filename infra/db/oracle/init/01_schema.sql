@@ -32,14 +32,16 @@ END;
 
 CREATE USER loan_user IDENTIFIED BY "Welcome12345!";
 GRANT CONNECT, RESOURCE TO loan_user;
+-- SCN probes of the True Cache read-routing monitor (loan_api.routing)
+GRANT SELECT ON v_$database TO loan_user;
 ALTER USER loan_user QUOTA UNLIMITED ON USERS;
 
 -- Create Tables
 CREATE TABLE loan_user.applications (
     id VARCHAR2(50) PRIMARY KEY,
     status VARCHAR2(50) NOT NULL,
-    applicant_data CLOB,
-    decision_data CLOB,
+    applicant_data JSON,
+    decision_data JSON,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -48,7 +50,7 @@ CREATE TABLE loan_user.audit_logs (
     id NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
     application_id VARCHAR2(50),
     action VARCHAR2(100),
-    details CLOB,
+    details JSON,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -60,12 +62,18 @@ CREATE TABLE loan_user.idempotency_keys (
     execution_mode VARCHAR2(50),
     status VARCHAR2(20) NOT NULL,
     response_code NUMBER,
-    response_body CLOB,
+    response_body JSON,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT pk_idempotency PRIMARY KEY (idempotency_key, route_path)
 );
 
+-- Audit reads filter by application and page in (created_at, id) order
+CREATE INDEX loan_user.ix_audit_logs_app ON loan_user.audit_logs (application_id, created_at, id);
+
+-- A key may only be used on one route; lets check_and_lock detect cross-route reuse on INSERT
+CREATE UNIQUE INDEX loan_user.ux_idempotency_key ON loan_user.idempotency_keys (idempotency_key);
+
 -- Grant access to tables if needed (user is owner, so explicit grants not needed for self)
 
 EXIT;
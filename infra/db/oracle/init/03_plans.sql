@@ -12,10 +12,53 @@ CREATE TABLE decision_plans (
     application_id VARCHAR2(50) NOT NULL,
     idempotency_key VARCHAR2(100) NOT NULL,
     inputs_hash VARCHAR2(64) NOT NULL,
-    plan_json CLOB,
+    plan_json JSON,
     status VARCHAR2(20) DEFAULT 'CREATED', -- CREATED, EXECUTED, SUPERSEDED
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     executed_at TIMESTAMP
 );
 
 CREATE INDEX idx_plans_app_id ON decision_plans(application_id);
+
+-- Portfolio re-decisioning (loan_api.redecide): one row per job run, checkpointed per chunk
+CREATE TABLE redecision_jobs (
+    job_id VARCHAR2(50) PRIMARY KEY,
+    status VARCHAR2(20) NOT NULL, -- RUNNING, COMPLETED
+    policy JSON,
+    last_application_id VARCHAR2(50),
+    processed NUMBER DEFAULT 0,
+    changed NUMBER DEFAULT 0,
+    skipped NUMBER DEFAULT 0,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Re-decision outcomes; by default only applications whose decision changed
+CREATE TABLE redecision_results (
+    job_id VARCHAR2(50) NOT NULL,
+    application_id VARCHAR2(50) NOT NULL,
+    old_decision VARCHAR2(50),
+    new_decision VARCHAR2(50) NOT NULL,
+    reason_codes JSON,
+    pricing JSON,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT pk_redecision_results PRIMARY KEY (job_id, application_id)
+);
+
+-- Memoized agent decisions (loan_api.decision, DECISION_CACHE_DB=true), keyed by inputs hash + decision version
+CREATE TABLE decision_cache (
+    cache_key VARCHAR2(200) PRIMARY KEY,
+    result JSON NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Booked loans (POST /bookings, /bookings:batch, python -m loan_api.bookings); one per application
+CREATE TABLE bookings (
+    booking_id VARCHAR2(50) PRIMARY KEY,
+    application_id VARCHAR2(50) NOT NULL,
+    activation_date DATE NOT NULL,
+    principal NUMBER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT ux_bookings_app UNIQUE (application_id)
+);
@@ -0,0 +1,95 @@
+-- 01_clob_to_json.sql
+-- Online migration of the JSON document columns from CLOB to native JSON (OSON).
+--
+-- Only needed for databases initialized before init/01_schema.sql and
+-- init/03_plans.sql switched to JSON columns; fresh installs already have them.
+-- Uses DBMS_REDEFINITION, so the tables stay readable and writable while the
+-- data is copied. Run as a user with redefinition privileges (e.g. ADMIN):
+--   sqlplus admin/...@service @01_clob_to_json.sql
+--
+-- Optional pre-check (reports rows that are not valid JSON):
+--   SELECT id FROM loan_user.applications
+--    WHERE applicant_data IS NOT JSON OR decision_data IS NOT JSON;
+
+SET SERVEROUTPUT ON
+
+DECLARE
+    PROCEDURE redefine(p_table IN VARCHAR2, p_interim_ddl IN VARCHAR2, p_col_mapping IN VARCHAR2) IS
+        v_interim VARCHAR2(128) := p_table || '_JSON_INTERIM';
+        v_errors  PLS_INTEGER;
+    BEGIN
+        DBMS_OUTPUT.PUT_LINE('Redefining LOAN_USER.' || p_table || ' ...');
+        EXECUTE IMMEDIATE 'CREATE TABLE loan_user.' || v_interim || ' (' || p_interim_ddl || ')';
+
+        DBMS_REDEFINITION.CAN_REDEF_TABLE('LOAN_USER', p_table, DBMS_REDEFINITION.CONS_USE_PK);
+        DBMS_REDEFINITION.START_REDEF_TABLE(
+            uname        => 'LOAN_USER',
+            orig_table   => p_table,
+            int_table    => v_interim,
+            col_mapping  => p_col_mapping,
+            options_flag => DBMS_REDEFINITION.CONS_USE_PK
+        );
+        -- Copies PK/unique/secondary indexes, constraints, triggers and grants
+        DBMS_REDEFINITION.COPY_TABLE_DEPENDENTS(
+            uname            => 'LOAN_USER',
+            orig_table       => p_table,
+            int_table        => v_interim,
+            copy_indexes     => DBMS_REDEFINITION.CONS_ORIG_PARAMS,
+            ignore_errors    => FALSE,
+            num_errors       => v_errors
+        );
+        DBMS_REDEFINITION.SYNC_INTERIM_TABLE('LOAN_USER', p_table, v_interim);
+        DBMS_REDEFINITION.FINISH_REDEF_TABLE('LOAN_USER', p_table, v_interim);
+
+        EXECUTE IMMEDIATE 'DROP TABLE loan_user.' || v_interim || ' PURGE';
+        DBMS_OUTPUT.PUT_LINE('  done (' || v_errors || ' dependent copy errors)');
+    EXCEPTION
+        WHEN OTHERS THEN
+            DBMS_OUTPUT.PUT_LINE('  failed: ' || SQLERRM);
+            BEGIN
+                DBMS_REDEFINITION.ABORT_REDEF_TABLE('LOAN_USER', p_table, v_interim);
+            EXCEPTION WHEN OTHERS THEN NULL;
+            END;
+            RAISE;
+    END;
+BEGIN
+    redefine(
+        'APPLICATIONS',
+        'id VARCHAR2(50), status VARCHAR2(50), applicant_data JSON, decision_data JSON, ' ||
+        'created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP',
+        'id id, status status, JSON(applicant_data) applicant_data, JSON(decision_data) decision_data, ' ||
+        'created_at created_at, updated_at updated_at'
+    );
+
+    redefine(
+        'AUDIT_LOGS',
+        'id NUMBER GENERATED BY DEFAULT AS IDENTITY, application_id VARCHAR2(50), action VARCHAR2(100), details JSON, ' ||
+        'created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP',
+        'id id, application_id application_id, action action, JSON(details) details, created_at created_at'
+    );
+    -- Continue the identity after the copied ids
+    EXECUTE IMMEDIATE 'ALTER TABLE loan_user.audit_logs MODIFY id GENERATED BY DEFAULT AS IDENTITY (START WITH LIMIT VALUE)';
+
+    redefine(
+        'IDEMPOTENCY_KEYS',
+        'idempotency_key VARCHAR2(100), route_path VARCHAR2(100), payload_hash VARCHAR2(64), ' ||
+        'request_mode VARCHAR2(50), execution_mode VARCHAR2(50), status VARCHAR2(20), response_code NUMBER, ' ||
+        'response_body JSON, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP',
+        'idempotency_key idempotency_key, route_path route_path, payload_hash payload_hash, ' ||
+        'request_mode request_mode, execution_mode execution_mode, status status, response_code response_code, ' ||
+        'JSON(response_body) response_body, created_at created_at, updated_at updated_at'
+    );
+
+    redefine(
+        'DECISION_PLANS',
+        'plan_id VARCHAR2(50), workspace_id VARCHAR2(50), application_id VARCHAR2(50), ' ||
+        'idempotency_key VARCHAR2(100), inputs_hash VARCHAR2(64), plan_json JSON, ' ||
+        'status VARCHAR2(20) DEFAULT ''CREATED'', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, executed_at TIMESTAMP',
+        'plan_id plan_id, workspace_id workspace_id, application_id application_id, ' ||
+        'idempotency_key idempotency_key, inputs_hash inputs_hash, JSON(plan_json) plan_json, ' ||
+        'status status, created_at created_at, executed_at executed_at'
+    );
+END;
+/
+
+EXIT;
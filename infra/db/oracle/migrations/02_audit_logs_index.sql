@@ -0,0 +1,9 @@
+-- 02_audit_logs_index.sql
+-- Index for GET /applications/{id}/audit (filter by application, keyset paging
+-- on created_at, id). Fresh installs get it from init/01_schema.sql.
+-- ONLINE keeps audit_logs writable while the index is built:
+--   sqlplus admin/...@service @02_audit_logs_index.sql
+
+CREATE INDEX loan_user.ix_audit_logs_app ON loan_user.audit_logs (application_id, created_at, id) ONLINE;
+
+EXIT;
@@ -0,0 +1,34 @@
+-- 03_redecision_tables.sql
+-- Tables for the portfolio re-decisioning job (python -m loan_api.redecide).
+-- Fresh installs get them from init/03_plans.sql.
+--   sqlplus admin/...@service @03_redecision_tables.sql
+
+ALTER SESSION SET CURRENT_SCHEMA = loan_user;
+
+-- Portfolio re-decisioning (loan_api.redecide): one row per job run, checkpointed per chunk
+CREATE TABLE redecision_jobs (
+    job_id VARCHAR2(50) PRIMARY KEY,
+    status VARCHAR2(20) NOT NULL, -- RUNNING, COMPLETED
+    policy JSON,
+    last_application_id VARCHAR2(50),
+    processed NUMBER DEFAULT 0,
+    changed NUMBER DEFAULT 0,
+    skipped NUMBER DEFAULT 0,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Re-decision outcomes; by default only applications whose decision changed
+CREATE TABLE redecision_results (
+    job_id VARCHAR2(50) NOT NULL,
+    application_id VARCHAR2(50) NOT NULL,
+    old_decision VARCHAR2(50),
+    new_decision VARCHAR2(50) NOT NULL,
+    reason_codes JSON,
+    pricing JSON,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT pk_redecision_results PRIMARY KEY (job_id, application_id)
+);
+
+EXIT;
@@ -0,0 +1,15 @@
+-- 04_decision_cache.sql
+-- Table for the DB tier of the decision result cache (DECISION_CACHE_DB=true).
+-- Fresh installs get it from init/03_plans.sql.
+--   sqlplus admin/...@service @04_decision_cache.sql
+
+ALTER SESSION SET CURRENT_SCHEMA = loan_user;
+
+-- Memoized agent decisions (loan_api.decision, DECISION_CACHE_DB=true), keyed by inputs hash + decision version
+CREATE TABLE decision_cache (
+    cache_key VARCHAR2(200) PRIMARY KEY,
+    result JSON NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+EXIT;
@@ -0,0 +1,20 @@
+-- 05_bookings.sql
+-- Table for booked loans, written by the guarded OFFER_ACCEPTED -> BOOKED transition.
+-- Fresh installs get it from init/03_plans.sql.
+--   sqlplus admin/...@service @05_bookings.sql
+
+ALTER SESSION SET CURRENT_SCHEMA = loan_user;
+
+-- Booked loans (POST /bookings, /bookings:batch, python -m loan_api.bookings); one per application
+CREATE TABLE bookings (
+    booking_id VARCHAR2(50) PRIMARY KEY,
+    application_id VARCHAR2(50) NOT NULL,
+    activation_date DATE NOT NULL,
+    principal NUMBER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT ux_bookings_app UNIQUE (application_id)
+);
+
+-- Applications booked before this migration keep their BOOKING_CREATED audit rows only
+
+EXIT;
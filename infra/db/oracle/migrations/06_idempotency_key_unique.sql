@@ -0,0 +1,52 @@
+-- 06_idempotency_key_unique.sql
+-- Unique index on idempotency_keys (idempotency_key): a key may only be used on
+-- one route. The single-round-trip check-and-lock of loan_api (see
+-- IdempotencyRepository.CHECK_AND_LOCK_SQL in loan_api/storage/oracle.py) relies
+-- on it to detect cross-route reuse on INSERT. Without it a reused key locks a
+-- second row instead of returning 409, and later retries of that key fail with
+-- TOO_MANY_ROWS. Fresh installs get it from init/01_schema.sql.
+--
+-- Run it before deploying an API version with the single-round-trip check-and-lock:
+--   sqlplus admin/...@service @06_idempotency_key_unique.sql
+--
+-- Keys used on several routes before the index existed are listed, and only the
+-- first use of each is kept (the later ones are the requests that should have
+-- been refused with 409). Retries of a removed (key, route) return 409 afterwards.
+-- ONLINE keeps idempotency_keys writable while the index is built; if a new
+-- duplicate is written in between, the CREATE fails with ORA-01452: run the
+-- script again.
+
+SET SERVEROUTPUT ON
+
+ALTER SESSION SET CURRENT_SCHEMA = loan_user;
+
+DECLARE
+    v_removed PLS_INTEGER := 0;
+BEGIN
+    FOR r IN (
+        SELECT idempotency_key, route_path, status, created_at
+          FROM (SELECT k.*, ROW_NUMBER() OVER (PARTITION BY idempotency_key ORDER BY created_at, route_path) AS rn,
+                       COUNT(*) OVER (PARTITION BY idempotency_key) AS uses
+                  FROM idempotency_keys k)
+         WHERE uses > 1
+         ORDER BY idempotency_key, rn
+    ) LOOP
+        DBMS_OUTPUT.PUT_LINE('Key ' || r.idempotency_key || ' on ' || r.route_path || ' (' || r.status || ', '
+                             || TO_CHAR(r.created_at, 'YYYY-MM-DD HH24:MI:SS') || ')');
+    END LOOP;
+
+    DELETE FROM idempotency_keys k
+     WHERE ROWID IN (
+        SELECT rid FROM (
+            SELECT ROWID AS rid, ROW_NUMBER() OVER (PARTITION BY idempotency_key ORDER BY created_at, route_path) AS rn
+              FROM idempotency_keys)
+         WHERE rn > 1);
+    v_removed := SQL%ROWCOUNT;
+    COMMIT;
+    DBMS_OUTPUT.PUT_LINE('Removed ' || v_removed || ' later use(s) of reused keys');
+END;
+/
+
+CREATE UNIQUE INDEX ux_idempotency_key ON idempotency_keys (idempotency_key) ONLINE;
+
+EXIT;
@@ -1,4 +1,5 @@
 from .runner import AgentRunner
 from .agent import LoanDecisionAgent
+from .registry import SpecRegistry, spec_registry, get_runner
 
-__all__ = ["AgentRunner", "LoanDecisionAgent"]
+__all__ = ["AgentRunner", "LoanDecisionAgent", "SpecRegistry", "spec_registry", "get_runner"]
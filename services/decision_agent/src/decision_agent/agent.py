@@ -1,10 +1,28 @@
-from typing import Dict, Any, Callable
+from typing import Dict, Any, Callable, List
+import numpy as np
 
 class LoanDecisionAgent:
     """
     A deterministic implementation of the Loan Decision Agent.
     """
-    
+
+    # Policy thresholds (shared by the scalar and batch paths)
+    FRAUD_REJECT_SCORE = 80
+    MIN_CREDIT_SCORE = 600
+
+    # Reason code bits used by run_batch; order matches the scalar evaluation order
+    REASON_KYC_FAILURE = 1
+    REASON_FRAUD_RISK_HIGH = 2
+    REASON_CREDIT_SCORE_LOW = 4
+    REASON_CODES = (
+        (REASON_KYC_FAILURE, "KYC_FAILURE"),
+        (REASON_FRAUD_RISK_HIGH, "FRAUD_RISK_HIGH"),
+        (REASON_CREDIT_SCORE_LOW, "CREDIT_SCORE_LOW"),
+    )
+
+    # Columns expected by run_batch
+    BATCH_COLUMNS = ("credit_score", "risk_score", "kyc_pass", "amount", "income", "debt")
+
     def run(self, inputs: Dict[str, Any], tools: Dict[str, Callable]) -> Dict[str, Any]:
         # Extract inputs
         app = inputs.get("application", {})
@@ -25,7 +43,7 @@ class LoanDecisionAgent:
         # 2. Check Fraud
         # Assume fraud_result has 'risk_score' (0-100), high is bad
         risk_score = fraud.get("risk_score", 0)
-        if risk_score >= 80:
+        if risk_score >= self.FRAUD_REJECT_SCORE:
             decision = "REJECT"
             reason_codes.append("FRAUD_RISK_HIGH")
         elif risk_score >= 50:
@@ -34,7 +52,7 @@ class LoanDecisionAgent:
 
         # 3. Check Credit Score
         # Simple policy
-        if credit_score < 600:
+        if credit_score < self.MIN_CREDIT_SCORE:
             decision = "REJECT"
             reason_codes.append("CREDIT_SCORE_LOW")
         elif credit_score < 650:
@@ -58,3 +76,69 @@ class LoanDecisionAgent:
             "reason_codes": reason_codes,
             "pricing": pricing
         }
+
+    def run_batch(self, batch: Dict[str, Any], tools: Dict[str, Callable]) -> Dict[str, Any]:
+        """
+        Scores many applications in one vectorized pass.
+
+        Args:
+            batch: Equal-length columns (anything np.asarray accepts) named in BATCH_COLUMNS.
+                `kyc_pass` is True where the KYC status is 'PASS'. `income` and `debt`
+                are accepted for policy changes but not used by the current policy.
+            tools: Must provide 'price_offer_batch' (vectorized price_offer) for pricing
+                to match the scalar path; otherwise the scalar fallback pricing is used.
+
+        Returns:
+            Dictionary of arrays: `decision` (str), `reason_mask` (bits from REASON_CODES),
+            `approved` (bool) and `pricing` (dict of arrays, only meaningful where approved).
+        """
+        missing = [c for c in self.BATCH_COLUMNS if c not in batch]
+        if missing:
+            raise ValueError(f"Batch missing columns: {missing}")
+
+        credit_score = np.asarray(batch["credit_score"])
+        risk_score = np.asarray(batch["risk_score"])
+        kyc_pass = np.asarray(batch["kyc_pass"], dtype=bool)
+        amount = np.asarray(batch["amount"], dtype=np.float64)
+
+        size = credit_score.shape[0]
+        for name in self.BATCH_COLUMNS:
+            if np.shape(batch[name]) != (size,):
+                raise ValueError(f"Batch column '{name}' must be 1-D with length {size}")
+
+        reason_mask = np.zeros(size, dtype=np.uint8)
+        reason_mask |= np.where(~kyc_pass, self.REASON_KYC_FAILURE, 0).astype(np.uint8)
+        reason_mask |= np.where(risk_score >= self.FRAUD_REJECT_SCORE, self.REASON_FRAUD_RISK_HIGH, 0).astype(np.uint8)
+        reason_mask |= np.where(credit_score < self.MIN_CREDIT_SCORE, self.REASON_CREDIT_SCORE_LOW, 0).astype(np.uint8)
+
+        approved = reason_mask == 0
+        decision = np.where(approved, "APPROVE", "REJECT")
+
+        if "price_offer_batch" in tools:
+            pricing = tools["price_offer_batch"](credit_scores=credit_score, amounts=amount)
+        else:
+            pricing = {"rate": np.full(size, 5.0), "term": np.full(size, 36)}
+
+        return {
+            "decision": decision,
+            "reason_mask": reason_mask,
+            "approved": approved,
+            "pricing": pricing
+        }
+
+    @classmethod
+    def decode_reasons(cls, mask: int) -> List[str]:
+        """Converts a reason_mask entry back to the scalar reason_codes list."""
+        return [code for bit, code in cls.REASON_CODES if mask & bit]
+
+    @classmethod
+    def batch_row(cls, result: Dict[str, Any], i: int) -> Dict[str, Any]:
+        """Returns row i of a run_batch result in the shape produced by run()."""
+        pricing = {}
+        if result["approved"][i]:
+            pricing = {k: v[i].item() for k, v in result["pricing"].items()}
+        return {
+            "decision": str(result["decision"][i]),
+            "reason_codes": cls.decode_reasons(int(result["reason_mask"][i])),
+            "pricing": pricing
+        }
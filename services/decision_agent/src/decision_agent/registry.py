@@ -0,0 +1,102 @@
+import os
+import hashlib
+import json
+import threading
+import logging
+from typing import Any, Dict, Tuple
+
+from .runner import AgentRunner
+
+logger = logging.getLogger("agent_registry")
+
+class SpecRegistry:
+    """
+    Process-wide cache of parsed and validated Agent Specs.
+
+    Each (spec_path, tools_path) pair is loaded once and stored together with
+    the files' (mtime_ns, size) signature. Every lookup stats both files; if
+    the signature changed the spec is re-read and re-validated (hot reload),
+    otherwise the cached spec is reused without touching the YAML parser.
+
+    Each entry also carries a content fingerprint (SHA-256 of the parsed spec
+    and tools), which changes only when the spec content does; callers use it
+    to version results derived from the spec.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Tuple[Tuple, Dict, Dict, str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _signature(self, spec_path: str, tools_path: str) -> Tuple:
+        spec_stat = os.stat(spec_path)
+        tools_stat = os.stat(tools_path)
+        return (spec_stat.st_mtime_ns, spec_stat.st_size, tools_stat.st_mtime_ns, tools_stat.st_size)
+
+    def _entry(self, spec_path: str, tools_path: str) -> Tuple[Tuple, Dict, Dict, str]:
+        key = (os.path.abspath(spec_path), os.path.abspath(tools_path))
+        signature = self._signature(spec_path, tools_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == signature:
+                self.hits += 1
+                return entry
+
+            # Concurrent misses for the same key are serialized by the lock, so the spec is parsed once.
+            spec = AgentRunner.load_yaml(spec_path)
+            tools_def = AgentRunner.load_yaml(tools_path)
+            AgentRunner.validate_spec(spec)
+            if entry:
+                self.reloads += 1
+                logger.info(f"Agent Spec changed on disk, reloaded: {spec_path}")
+            else:
+                self.misses += 1
+            fingerprint = hashlib.sha256(
+                json.dumps([spec, tools_def], sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
+            entry = (signature, spec, tools_def, fingerprint)
+            self._entries[key] = entry
+            return entry
+
+    def get_spec(self, spec_path: str, tools_path: str) -> Tuple[Dict, Dict]:
+        """
+        Returns the parsed (spec, tools_def) pair, loading it on first use or when the files changed.
+        """
+        _, spec, tools_def, _ = self._entry(spec_path, tools_path)
+        return spec, tools_def
+
+    def get_fingerprint(self, spec_path: str, tools_path: str) -> str:
+        """
+        Returns the content fingerprint of the current spec, e.g. "1.0.0:3f2a..." (spec version, SHA-256).
+        """
+        _, spec, _, fingerprint = self._entry(spec_path, tools_path)
+        return f"{spec.get('version', '')}:{fingerprint}"
+
+    def get_runner(self, spec_path: str, tools_path: str, agent_impl: Any) -> AgentRunner:
+        """
+        Returns an AgentRunner bound to agent_impl, backed by the cached (already validated) spec.
+        """
+        spec, tools_def = self.get_spec(spec_path, tools_path)
+        return AgentRunner.from_spec(spec, tools_def, agent_impl)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Process-wide default registry
+spec_registry = SpecRegistry()
+
+def get_runner(spec_path: str, tools_path: str, agent_impl: Any) -> AgentRunner:
+    return spec_registry.get_runner(spec_path, tools_path, agent_impl)
@@ -6,12 +6,25 @@ logger = logging.getLogger("agent_runner")
 
 class AgentRunner:
     def __init__(self, spec_path: str, tools_path: str, agent_impl: Any):
-        self.spec = self._load_yaml(spec_path)
-        self.tools_def = self._load_yaml(tools_path)
+        self.spec = self.load_yaml(spec_path)
+        self.tools_def = self.load_yaml(tools_path)
         self.agent_impl = agent_impl
-        self._validate_spec()
+        self.validate_spec(self.spec)
 
-    def _load_yaml(self, path: str) -> Dict:
+    @classmethod
+    def from_spec(cls, spec: Dict, tools_def: Dict, agent_impl: Any) -> "AgentRunner":
+        """
+        Builds a runner from an already loaded and validated spec (see SpecRegistry).
+        No file IO or validation happens here.
+        """
+        runner = cls.__new__(cls)
+        runner.spec = spec
+        runner.tools_def = tools_def
+        runner.agent_impl = agent_impl
+        return runner
+
+    @staticmethod
+    def load_yaml(path: str) -> Dict:
         try:
             with open(path, 'r') as f:
                 return yaml.safe_load(f)
@@ -19,15 +32,16 @@ class AgentRunner:
             logger.error(f"Failed to load spec from {path}: {e}")
             raise
 
-    def _validate_spec(self):
+    @staticmethod
+    def validate_spec(spec: Dict):
         # Minimal validation of the Agent Spec
-        if not self.spec.get('name'):
+        if not spec.get('name'):
             raise ValueError("Agent Spec missing 'name'")
-        if 'inputs' not in self.spec:
+        if 'inputs' not in spec:
             raise ValueError("Agent Spec missing 'inputs'")
-        if 'outputs' not in self.spec:
+        if 'outputs' not in spec:
             raise ValueError("Agent Spec missing 'outputs'")
-        logger.info(f"Loaded Agent Spec: {self.spec['name']}")
+        logger.info(f"Loaded Agent Spec: {spec['name']}")
 
     def run(self, inputs: Dict[str, Any], tools_map: Dict[str, Callable]) -> Dict[str, Any]:
         logger.info("AgentRunner: Starting execution")
@@ -0,0 +1,77 @@
+"""
+run_batch() must decide exactly like run(): same decision, same reason codes in
+the same order, and bit-identical pricing, row by row.
+"""
+import itertools
+
+import numpy as np
+import pytest
+
+from decision_agent import LoanDecisionAgent
+from workflows.loan_origination_wayflow.workflow import tool_price_offer, tool_price_offer_batch
+
+agent = LoanDecisionAgent()
+SCALAR_TOOLS = {"price_offer": tool_price_offer}
+BATCH_TOOLS = {"price_offer_batch": tool_price_offer_batch}
+
+# Policy thresholds and the pricing bands of tool_price_offer, with their neighbours
+CREDIT_SCORES = sorted({300, 850} | {t + d for t in (agent.MIN_CREDIT_SCORE, 650, 750) for d in (-1, 0, 1)})
+RISK_SCORES = sorted({0, 100} | {t + d for t in (50, agent.FRAUD_REJECT_SCORE) for d in (-1, 0, 1)})
+KYC_STATUSES = ("PASS", "FAIL", None)
+AMOUNTS = (0.0, 0.01, 10000.0, 25000.0, 1234567.89)
+
+def scalar_inputs(credit_score, risk_score, kyc_status, amount):
+    return {
+        "application": {"amount": amount, "income": 85000.0, "debt": 12000.0},
+        "kyc_result": {} if kyc_status is None else {"status": kyc_status},
+        "fraud_result": {"risk_score": risk_score},
+        "credit_score": credit_score,
+    }
+
+def assert_batch_matches_scalar(rows):
+    credit, risk, kyc, amount = zip(*rows)
+    result = agent.run_batch({
+        "credit_score": np.array(credit),
+        "risk_score": np.array(risk),
+        "kyc_pass": np.array([status == "PASS" for status in kyc]),
+        "amount": np.array(amount),
+        "income": np.full(len(rows), 85000.0),
+        "debt": np.full(len(rows), 12000.0),
+    }, BATCH_TOOLS)
+
+    for i, row in enumerate(rows):
+        expected = agent.run(scalar_inputs(*row), SCALAR_TOOLS)
+        assert LoanDecisionAgent.batch_row(result, i) == expected, f"row {i}: {row}"
+        assert bool(result["approved"][i]) == (expected["decision"] == "APPROVE")
+
+def test_threshold_grid():
+    assert_batch_matches_scalar(list(itertools.product(CREDIT_SCORES, RISK_SCORES, KYC_STATUSES, AMOUNTS)))
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_random_rows(seed):
+    rng = np.random.default_rng(seed)
+    size = 5000
+    rows = list(zip(
+        rng.integers(300, 851, size).tolist(),
+        rng.integers(0, 101, size).tolist(),
+        rng.choice(np.array(KYC_STATUSES, dtype=object), size).tolist(),
+        np.round(rng.uniform(0, 100000, size), 2).tolist(),
+    ))
+    assert_batch_matches_scalar(rows)
+
+@pytest.mark.parametrize("mask", range(8))
+def test_decode_reasons(mask):
+    # One row failing exactly the checks in `mask`
+    row = (
+        agent.MIN_CREDIT_SCORE - 1 if mask & agent.REASON_CREDIT_SCORE_LOW else agent.MIN_CREDIT_SCORE,
+        agent.FRAUD_REJECT_SCORE if mask & agent.REASON_FRAUD_RISK_HIGH else agent.FRAUD_REJECT_SCORE - 1,
+        "FAIL" if mask & agent.REASON_KYC_FAILURE else "PASS",
+        10000.0,
+    )
+    expected = agent.run(scalar_inputs(*row), SCALAR_TOOLS)
+    assert LoanDecisionAgent.decode_reasons(mask) == expected["reason_codes"]
+    assert_batch_matches_scalar([row])
+
+def test_missing_column():
+    with pytest.raises(ValueError, match="missing columns"):
+        agent.run_batch({"credit_score": [700]}, BATCH_TOOLS)
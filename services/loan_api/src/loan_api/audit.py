@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .db import get_write_connection, release_connection
+from .storage import audit_repo
+
+logger = logging.getLogger("loan_api.audit")
+
+# sync: every audit row is inserted in the request transaction (default).
+# buffered: non-critical events (log_audit(..., durable=False)) are queued and written in batches.
+AUDIT_WRITER_MODE = os.environ.get("AUDIT_WRITER_MODE", "sync").lower()
+AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL_MS = int(os.environ.get("AUDIT_FLUSH_INTERVAL_MS", "500"))
+AUDIT_QUEUE_MAX = int(os.environ.get("AUDIT_QUEUE_MAX", "10000"))
+
+AuditRecord = Tuple[str, str, str] # (application_id, action, details JSON)
+
+def audit_record(app_id: str, action: str, details: Dict) -> AuditRecord:
+    return (app_id, action, json.dumps(details))
+
+class AuditWriter:
+    """
+    Background writer for non-critical audit events.
+
+    Records are queued by submit() and inserted with executemany on a
+    dedicated connection, in batches of up to batch_size rows or every
+    flush_interval_ms, whichever comes first. When the queue is full the
+    record is dropped (counted, never blocks the request). A failed flush
+    drops its batch; audit_logs is not the system of record for the data.
+    """
+
+    def __init__(self, batch_size: int = AUDIT_BATCH_SIZE, flush_interval_ms: int = AUDIT_FLUSH_INTERVAL_MS,
+                 queue_max: int = AUDIT_QUEUE_MAX):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue: "queue.Queue[AuditRecord]" = queue.Queue(maxsize=queue_max)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.flush_ms_sum = 0.0
+        self.flush_ms_max = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"Audit writer started (batch_size={self.batch_size}, flush_interval={self.flush_interval}s)")
+
+    def stop(self, timeout: float = 10.0):
+        """Stops the thread after flushing what is already queued."""
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, record: Optional[AuditRecord]):
+        if record is None:
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            logger.warning(f"Audit queue full, dropped {record[1]} for {record[0]}")
+            return
+        with self._lock:
+            self.enqueued += 1
+
+    def _next_batch(self) -> List[AuditRecord]:
+        batch: List[AuditRecord] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._flush(batch)
+        # Drain on shutdown
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            self._flush(batch)
+
+    def _flush(self, batch: List[AuditRecord]):
+        start = time.perf_counter()
+        conn = None
+        try:
+            conn = get_write_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.executemany(audit_repo.INSERT_AUDIT_SQL, batch)
+            finally:
+                cursor.close()
+            conn.commit()
+            ok = True
+        except Exception as e:
+            logger.error(f"Audit flush of {len(batch)} records failed: {e}")
+            ok = False
+        finally:
+            release_connection(conn)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.flushes += 1
+            self.flush_ms_sum += elapsed_ms
+            self.flush_ms_max = max(self.flush_ms_max, elapsed_ms)
+            if ok:
+                self.written += len(batch)
+            else:
+                self.flush_errors += 1
+                self.dropped += len(batch)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "mode": AUDIT_WRITER_MODE,
+                "running": self.running,
+                "queue_depth": self._queue.qsize(),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "flushes": self.flushes,
+                "flush_errors": self.flush_errors,
+                "flush_ms_sum": round(self.flush_ms_sum, 3),
+                "flush_ms_max": round(self.flush_ms_max, 3)
+            }
+
+audit_writer = AuditWriter()
+
+def buffered() -> bool:
+    return AUDIT_WRITER_MODE == "buffered" and audit_writer.running
@@ -0,0 +1,181 @@
+"""
+Latency benchmark for a running API (sync or async app): the write paths, and the
+application and audit reads.
+
+Sends requests with a fixed concurrency and reports latency percentiles and the
+DB round trips per request (X-DB-Round-Trips response header). Round trips are
+what pipelining removes, so compare runs with the database behind an injected
+network delay (see the runbook), e.g.:
+
+    python -m loan_api.bench --url http://localhost:8001 --scenario check --requests 2000
+    DB_PIPELINING=false uvicorn loan_api.main_async:app --port 8001   # baseline run
+
+The read scenarios (get, audit) also compare CLOB and native JSON document columns:
+read the same applications (--app-ids) before and after migrations/01_clob_to_json.sql.
+
+Needs httpx (pip install loan-api[bench]).
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+APPLICANT = {"applicant_id": "bench", "applicant_name": "Bench Applicant", "amount": 25000.0, "income": 85000.0, "debt": 12000.0}
+
+SCENARIOS = ("create", "batch", "check", "accept", "get", "audit")
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    # Nearest-rank
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+def summarize(scenario: str, latencies_ms: List[float], round_trips: List[int], errors: int, elapsed: float,
+              items_per_request: int = 1) -> Dict:
+    latencies_ms = sorted(latencies_ms)
+    return {
+        "scenario": scenario,
+        "requests": len(latencies_ms) + errors,
+        "items_per_request": items_per_request,
+        "errors": errors,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p95_ms": percentile(latencies_ms, 95),
+        "p99_ms": percentile(latencies_ms, 99),
+        "max_ms": latencies_ms[-1] if latencies_ms else None,
+        "round_trips_per_request": round(sum(round_trips) / len(round_trips), 2) if round_trips else None,
+        "requests_per_sec": round(len(latencies_ms) / elapsed, 1) if elapsed > 0 else None,
+        # Applications created per second, for comparing create with batch
+        "items_per_sec": round(len(latencies_ms) * items_per_request / elapsed, 1) if elapsed > 0 else None
+    }
+
+async def create_application(client, run: str, n: int) -> str:
+    resp = await client.post("/applications", json=APPLICANT, headers={"Idempotency-Key": f"bench-{run}-setup-{n}"})
+    resp.raise_for_status()
+    return resp.json()["id"]
+
+async def checked_application(client, run: str, n: int) -> str:
+    # Read scenarios: all three check results in decision_data and four audit rows
+    app_id = await create_application(client, run, n)
+    steps = [
+        (f"/applications/{app_id}/kyc", {"status": "PASS"}),
+        (f"/applications/{app_id}/fraud", {"risk_score": 10}),
+        (f"/applications/{app_id}/credit-score", {"score": 780})
+    ]
+    for step, (path, body) in enumerate(steps):
+        resp = await client.post(path, json=body, headers={"Idempotency-Key": f"bench-{run}-setup-{n}-{step}"})
+        resp.raise_for_status()
+    return app_id
+
+async def approve_application(client, run: str, n: int) -> str:
+    # Offers can only be accepted once, from APPROVE: checks, plan and execute on the sync app
+    app_id = await checked_application(client, run, n)
+    resp = await client.post(f"/applications/{app_id}/decision/plan", json={"workspace_id": "bench", "scenarios_count": 0},
+                             headers={"Idempotency-Key": f"bench-{run}-setup-{n}-plan"})
+    resp.raise_for_status()
+    resp = await client.post(f"/applications/{app_id}/decision/execute", json={"plan_id": resp.json()["plan_id"]},
+                             headers={"Idempotency-Key": f"bench-{run}-setup-{n}-execute"})
+    resp.raise_for_status()
+    if resp.json()["decision"] != "APPROVE":
+        raise RuntimeError(f"Setup application {app_id} was not approved: {resp.json()}")
+    return app_id
+
+def make_request(scenario: str, run: str, n: int, app_ids: List[str], batch_size: int = 1):
+    app_id = app_ids[n % len(app_ids)] if app_ids else None
+    headers = {"Idempotency-Key": f"bench-{run}-{n}"}
+    if scenario == "create":
+        return "POST", "/applications", APPLICANT, headers
+    if scenario == "batch":
+        items = [{"idempotency_key": f"bench-{run}-{n}-{i}", "application": APPLICANT} for i in range(batch_size)]
+        return "POST", "/applications:batch", items, {}
+    if scenario == "check":
+        return "POST", f"/applications/{app_id}/kyc", {"status": "PASS"}, headers
+    if scenario == "accept":
+        return "POST", f"/offers/{app_id}/accept", None, headers
+    if scenario == "audit":
+        return "GET", f"/applications/{app_id}/audit", None, {}
+    return "GET", f"/applications/{app_id}", None, {}
+
+async def setup_applications(client, scenario: str, run: str, requests: int, apps: int, setup_url: Optional[str]) -> List[str]:
+    if scenario == "accept":
+        # One approved application per request
+        async with httpx.AsyncClient(base_url=setup_url or client.base_url, timeout=120.0) as setup:
+            return [await approve_application(setup, run, n) for n in range(requests)]
+    if scenario == "check":
+        return [await create_application(client, run, n) for n in range(apps)]
+    if scenario in ("create", "batch"):
+        return []
+    return [await checked_application(client, run, n) for n in range(apps)]
+
+def read_app_ids(path: str) -> List[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+async def run(url: str, scenario: str, requests: int, concurrency: int, apps: int, setup_url: Optional[str] = None,
+              app_ids: Optional[List[str]] = None, batch_size: int = 1) -> Dict:
+    run_id = uuid.uuid4().hex[:8]
+    latencies: List[float] = []
+    round_trips: List[int] = []
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=url, timeout=30.0,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        if app_ids is None:
+            app_ids = await setup_applications(client, scenario, run_id, requests, apps, setup_url)
+
+        counter = iter(range(requests))
+
+        async def worker():
+            nonlocal errors
+            for n in counter:
+                method, path, body, headers = make_request(scenario, run_id, n, app_ids, batch_size)
+                start = time.perf_counter()
+                try:
+                    resp = await client.request(method, path, json=body, headers=headers)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if resp.status_code >= 400 or (scenario == "batch" and resp.json()["failed"]):
+                    errors += 1
+                    continue
+                latencies.append(round(elapsed_ms, 3))
+                if "X-DB-Round-Trips" in resp.headers:
+                    round_trips.append(int(resp.headers["X-DB-Round-Trips"]))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(scenario, latencies, round_trips, errors, elapsed, batch_size if scenario == "batch" else 1)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="p50/p99 latency and DB round trips of the API write and read paths")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="check")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--apps", type=int, default=50, help="applications created up front for check/get/audit")
+    parser.add_argument("--setup-url", help="sync app that approves the applications of the accept scenario (default: --url)")
+    parser.add_argument("--batch-size", type=int, default=100, help="applications per POST /applications:batch request")
+    parser.add_argument("--app-ids", help="file of existing application ids (one per line) to use instead of creating them")
+    args = parser.parse_args(argv)
+
+    if httpx is None:
+        print("loan_api.bench needs httpx: pip install loan-api[bench]", file=sys.stderr)
+        return 2
+    app_ids = read_app_ids(args.app_ids) if args.app_ids else None
+    summary = asyncio.run(run(args.url, args.scenario, args.requests, args.concurrency, args.apps, args.setup_url, app_ids, args.batch_size))
+    print(json.dumps({"url": args.url, **summary}, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
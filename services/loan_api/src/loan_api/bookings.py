@@ -0,0 +1,153 @@
+"""
+Bulk booking of accepted offers (activation runs).
+
+book_many() moves a batch of applications from OFFER_ACCEPTED to BOOKED in a
+fixed number of round trips, whatever the batch size: one executemany of the
+conditional status update (array DML row counts tell which rows moved), one
+INSERT ... SELECT into bookings and one audit insert for those, plus one status
+lookup only when some rows were refused (409 vs 404).
+
+CLI (booking ids are generated, commits per batch):
+    python -m loan_api.bookings activations.csv        # columns: application_id[,activation_date]
+    python -m loan_api.bookings activations.ndjson --batch-size 5000
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from .audit import audit_record
+from .db import get_write_connection, release_connection
+from .ingest import RecordParser, format_for, open_text
+from .lifecycle import TRANSITIONS
+from .models import BookingCreate
+from .snapshots import invalidate_application
+from .storage import application_repo, audit_repo
+
+logger = logging.getLogger("loan_api.bookings")
+
+BOOKING_BATCH_SIZE = int(os.environ.get("BOOKING_BATCH_SIZE", "1000"))
+
+BookingItem = Tuple[str, str, Optional[str]] # (booking_id, application_id, activation_date)
+
+def book_many(conn, items: List[BookingItem]) -> List[Optional[HTTPException]]:
+    """
+    Books items in the caller's transaction (no commit). Per item, returns None
+    (booked) or the HTTPException POST /bookings would have raised (404 / 409).
+    A repeated application_id is booked once; its later items get 409. The caller
+    invalidates the snapshots of the booked applications after committing.
+    """
+    if not items:
+        return []
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(application_repo.BOOK_TRANSITION_SQL, [[app_id] for _, app_id, _ in items], arraydmlrowcounts=True)
+        rowcounts = cursor.getarraydmlrowcounts()
+        booked = [item for item, moved in zip(items, rowcounts) if moved]
+        if booked:
+            cursor.executemany(application_repo.INSERT_BOOKING_SQL, [
+                application_repo.booking_row(booking_id, app_id, activation_date)
+                for booking_id, app_id, activation_date in booked
+            ])
+            cursor.executemany(audit_repo.INSERT_AUDIT_SQL, [
+                audit_record(app_id, "BOOKING_CREATED", {"booking_id": booking_id, "activation_date": activation_date})
+                for booking_id, app_id, activation_date in booked
+            ])
+
+        statuses: Dict[str, str] = {}
+        refused = [app_id for (_, app_id, _), moved in zip(items, rowcounts) if not moved]
+        if refused:
+            cursor.execute(*application_repo.select_statuses(json.dumps(sorted(set(refused)))))
+            statuses = dict(cursor.fetchall())
+    finally:
+        cursor.close()
+
+    expected = " or ".join(TRANSITIONS["BOOKED"])
+    results: List[Optional[HTTPException]] = []
+    for (_, app_id, _), moved in zip(items, rowcounts):
+        if moved:
+            results.append(None)
+        elif app_id in statuses:
+            results.append(HTTPException(status_code=409, detail=f"Application is {statuses[app_id]}, expected {expected}"))
+        else:
+            results.append(HTTPException(status_code=404, detail="Application not found"))
+    return results
+
+def book_lines(conn, fmt: str, lines, batch_size: int = BOOKING_BATCH_SIZE) -> Dict:
+    """Books the application_id[, activation_date] records of a file, committing per batch."""
+    started = time.perf_counter()
+    summary = {"rows": 0, "booked": 0, "failed": 0, "errors": []}
+    batch: List[Tuple[int, BookingItem]] = []
+
+    def error(line: int, app_id: Optional[str], message):
+        summary["failed"] += 1
+        summary["errors"].append({"line": line, "application_id": app_id, "error": message})
+
+    def flush():
+        if not batch:
+            return
+        try:
+            results = book_many(conn, [item for _, item in batch])
+            conn.commit()
+            for (_, (_, app_id, _)), result in zip(batch, results):
+                if result is None:
+                    invalidate_application(app_id)
+        except Exception as e:
+            logger.error(f"Booking batch of {len(batch)} rows failed: {e}")
+            conn.rollback()
+            results = [HTTPException(status_code=500, detail=str(e))] * len(batch)
+        for (line, (_, app_id, _)), result in zip(batch, results):
+            if result is None:
+                summary["booked"] += 1
+            else:
+                error(line, app_id, result.detail)
+        batch.clear()
+
+    for line_no, record in RecordParser(fmt).records(lines):
+        summary["rows"] += 1
+        if isinstance(record, ValueError):
+            error(line_no, None, f"Malformed line: {record}")
+            continue
+        try:
+            booking = BookingCreate.model_validate({k: v or None for k, v in record.items()})
+        except ValidationError as e:
+            error(line_no, record.get("application_id"), e.errors(include_url=False, include_input=False))
+            continue
+        batch.append((line_no, (str(uuid.uuid4()), booking.application_id, booking.activation_date)))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    elapsed = time.perf_counter() - started
+    summary["elapsed_ms"] = round(elapsed * 1000, 3)
+    summary["rows_per_sec"] = round(summary["rows"] / elapsed, 1) if elapsed > 0 else None
+    return summary
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Book accepted offers listed in a CSV or NDJSON file")
+    parser.add_argument("path", help="CSV (with header) or NDJSON file of application_id[, activation_date], '-' for stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=BOOKING_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or format_for(args.path)
+    conn = get_write_connection()
+    try:
+        with open_text(args.path) as f:
+            summary = book_lines(conn, fmt, f, args.batch_size)
+    finally:
+        release_connection(conn)
+
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
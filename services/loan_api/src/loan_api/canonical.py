@@ -0,0 +1,115 @@
+"""
+Canonical JSON hashing shared by idempotency payload hashes and plan inputs hashes.
+
+Scheme v1 (default) is byte-compatible with the original
+sha256(json.dumps(obj, sort_keys=True)), so hashes already stored in
+idempotency_keys.payload_hash and decision_plans.inputs_hash keep matching.
+The suffix (e.g. request/execution mode) is fed to the hash separately instead
+of being concatenated to the document string, and sub-documents wrapped with
+frozen() are encoded once and spliced into every document that contains them.
+
+Scheme v2 (CANONICAL_HASH_SCHEME=v2, needs the optional orjson dependency)
+serializes with orjson and sorted keys. It is faster but produces different
+bytes (compact separators, UTF-8 instead of \\u escapes), so v2 hashes never
+match stored v1 hashes: switching makes retries of in-flight idempotency keys
+and executes of existing plans fail with 409 until they are re-created.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger("loan_api.canonical")
+
+SCHEMES = ("v1", "v2")
+
+def _configured_scheme() -> str:
+    scheme = os.environ.get("CANONICAL_HASH_SCHEME", "v1").lower()
+    if scheme not in SCHEMES:
+        raise ValueError(f"CANONICAL_HASH_SCHEME must be one of {SCHEMES}, got '{scheme}'")
+    if scheme == "v2" and orjson is None:
+        logger.warning("CANONICAL_HASH_SCHEME=v2 requires orjson, which is not installed; using v1.")
+        return "v1"
+    return scheme
+
+CANONICAL_HASH_SCHEME = _configured_scheme()
+
+def _encode(obj: Any, scheme: str) -> bytes:
+    if scheme == "v2":
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True).encode("utf-8")
+
+class FrozenDict(dict):
+    """
+    Read-only dict that remembers its canonical encoding, for sub-documents that
+    are hashed many times (e.g. KYC / fraud results shared by a plan's scenarios).
+    Behaves like a dict everywhere else, including json.dumps.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, scheme: str) -> bytes:
+        cached = self._encoded.get(scheme)
+        if cached is None:
+            cached = self._encoded[scheme] = _encode(dict(self), scheme)
+        return cached
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("FrozenDict is read-only")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+def frozen(doc: Dict) -> FrozenDict:
+    return doc if isinstance(doc, FrozenDict) else FrozenDict(doc)
+
+def _value_chunk(value: Any, scheme: str) -> bytes:
+    if isinstance(value, FrozenDict):
+        return value.encoded(scheme)
+    return _encode(value, scheme)
+
+def canonical_chunks(obj: Any, scheme: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Yields the canonical encoding of obj in pieces; b"".join() of them equals _encode(obj).
+    Top-level dicts holding frozen() values are split per key, reusing the cached encodings.
+    """
+    scheme = scheme or CANONICAL_HASH_SCHEME
+    if isinstance(obj, FrozenDict):
+        yield obj.encoded(scheme)
+        return
+    # One C-level encode is faster than per-key pieces unless cached sub-documents can be spliced in
+    if not isinstance(obj, dict) or not any(isinstance(v, FrozenDict) for v in obj.values()) \
+            or not all(isinstance(k, str) for k in obj):
+        yield _encode(obj, scheme)
+        return
+    item_sep, key_sep = (b",", b":") if scheme == "v2" else (b", ", b": ")
+    yield b"{"
+    for n, key in enumerate(sorted(obj)):
+        if n:
+            yield item_sep
+        yield _encode(key, scheme)
+        yield key_sep
+        yield _value_chunk(obj[key], scheme)
+    yield b"}"
+
+def canonical_hash(obj: Any, suffix: str = "", scheme: Optional[str] = None) -> str:
+    """SHA-256 hex digest of canonical(obj) followed by suffix."""
+    digest = hashlib.sha256()
+    for chunk in canonical_chunks(obj, scheme):
+        digest.update(chunk)
+    if suffix:
+        digest.update(suffix.encode("utf-8"))
+    return digest.hexdigest()
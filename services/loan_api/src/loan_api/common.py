@@ -0,0 +1,114 @@
+"""
+Helpers shared by the sync (loan_api.main) and async (loan_api.main_async) apps
+and the bulk tools, so that neither app has to import the other.
+"""
+from fastapi import Header, HTTPException, Request
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import datetime
+import json
+import os
+import uuid
+
+from .db import pool_stats, DB_COUNT_ROUND_TRIPS, round_trip_stats, start_round_trip_count, stop_round_trip_count
+from .idempotency import completed_responses
+from .decision import decision_cache
+from .audit import AuditRecord, audit_record, audit_writer, buffered as audit_buffered
+from .routing import CONSISTENCY_HEADER, issue_token, read_router
+from .snapshots import application_snapshots
+from .storage import Op, application_repo, audit_repo
+
+from decision_agent import spec_registry
+
+# Audit log paging (keyset on the (application_id, created_at, id) index, see 01_schema.sql)
+AUDIT_PAGE_DEFAULT_LIMIT = int(os.environ.get("AUDIT_PAGE_DEFAULT_LIMIT", "100"))
+AUDIT_PAGE_MAX_LIMIT = int(os.environ.get("AUDIT_PAGE_MAX_LIMIT", "1000"))
+AUDIT_STREAM_ARRAYSIZE = int(os.environ.get("AUDIT_STREAM_ARRAYSIZE", "500"))
+
+# Helpers
+def derive_id(key: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, key))
+
+def get_idempotency_key(idempotency_key: str = Header(..., alias="Idempotency-Key")):
+    return idempotency_key
+
+# The write routes hand their ops to IdempotencyManager.complete(), which sends them
+# with the completion and the commit in one round trip (a pipeline on the async app, one
+# PL/SQL block on the sync app, see loan_api.db.DB_PIPELINING). Updates that must hit a row
+# raise ORA-20404 when no row was updated and stop before the commit (status transitions
+# are guarded the same way, see loan_api.lifecycle).
+
+def audit_op(app_id: str, action: str, details: Dict) -> Op:
+    return audit_repo.insert(app_id, action, json.dumps(details))
+
+def app_data_op(app_id: str, field: str, value: Any) -> Op:
+    return application_repo.patch_decision_data(app_id, field, json.dumps(value))
+
+def check_ops(app_id: str, field: str, value: Any, action: str, details: Dict) -> Tuple[List[Op], Optional[AuditRecord]]:
+    """
+    Ops of a KYC / fraud / credit-score result. The audit event is non-durable: with
+    AUDIT_WRITER_MODE=buffered it is returned instead, for audit_writer.submit() after the commit.
+    """
+    deferred = audit_record(app_id, action, details) if audit_buffered() else None
+    ops = [app_data_op(app_id, field, value)]
+    if not deferred:
+        ops.append(audit_op(app_id, action, details))
+    return ops, deferred
+
+# The callers drop the application's snapshot (snapshots.invalidate_application) once the op has committed
+
+def accept_offer_op(app_id: str) -> Op:
+    """The APPROVE -> OFFER_ACCEPTED transition and its audit row."""
+    details = {"timestamp": str(datetime.datetime.now())}
+    return application_repo.accept_offer(app_id, json.dumps(details))
+
+def book_op(app_id: str, booking_id: str, activation_date: Optional[str]) -> Op:
+    """The OFFER_ACCEPTED -> BOOKED transition, the bookings row and its audit row."""
+    details = {"booking_id": booking_id, "activation_date": activation_date}
+    return application_repo.book(app_id, booking_id, activation_date, json.dumps(details))
+
+# Middleware and routes, registered by each app
+async def stamp_consistency_token(request: Request, call_next):
+    # Stamped after the handler returned, i.e. after its commit; reads send it back for read-your-writes
+    response = await call_next(request)
+    if read_router.active and request.method not in ("GET", "HEAD", "OPTIONS"):
+        response.headers[CONSISTENCY_HEADER] = issue_token()
+    return response
+
+ROUND_TRIPS_HEADER = "X-DB-Round-Trips"
+
+async def count_round_trips(request: Request, call_next):
+    # DB round trips made while producing the response (not while streaming its body)
+    if not DB_COUNT_ROUND_TRIPS:
+        return await call_next(request)
+    started = start_round_trip_count()
+    try:
+        response = await call_next(request)
+    finally:
+        round_trips = stop_round_trip_count(started)
+    route = request.scope.get("route")
+    round_trip_stats.record(f"{request.method} {route.path if route else request.url.path}", round_trips)
+    response.headers[ROUND_TRIPS_HEADER] = str(round_trips)
+    return response
+
+def encode_audit_cursor(created_at: datetime.datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{row_id}".encode()).decode()
+
+def decode_audit_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    try:
+        ts, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.datetime.fromisoformat(ts), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid audit cursor")
+
+def get_metrics():
+    return {
+        "pools": pool_stats(),
+        "db_round_trips": round_trip_stats.snapshot(),
+        "idempotency_cache": completed_responses.stats(),
+        "audit_writer": audit_writer.stats(),
+        "decision_cache": decision_cache.stats(),
+        "application_snapshots": application_snapshots.stats(),
+        "read_routing": read_router.stats(),
+        "agent_spec_registry": spec_registry.stats()
+    }
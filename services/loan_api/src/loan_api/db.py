@@ -1,18 +1,336 @@
 import os
+import bisect
+import json
+import re
+import threading
+import time
 import oracledb
 import logging
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 logger = logging.getLogger("loan_api.db")
 
 _write_pool = None
 _read_pool = None
 
-def init_db():
-    global _write_pool, _read_pool
-    if _write_pool is not None:
-        return
+_write_pool_async = None
+_read_pool_async = None
 
-    # --- Primary / Write Pool ---
+_GETMODES = {
+    "wait": oracledb.POOL_GETMODE_WAIT,
+    "nowait": oracledb.POOL_GETMODE_NOWAIT,
+    "forceget": oracledb.POOL_GETMODE_FORCEGET,
+    "timedwait": oracledb.POOL_GETMODE_TIMEDWAIT,
+}
+
+def _pool_sizing(prefix: str) -> dict:
+    """
+    Pool sizing and behavior from the environment, e.g. for prefix DB_POOL_:
+    DB_POOL_MIN, DB_POOL_MAX, DB_POOL_INCREMENT, DB_POOL_GETMODE (wait|nowait|forceget|timedwait),
+    DB_POOL_WAIT_TIMEOUT (ms, used by timedwait), DB_POOL_STMT_CACHE_SIZE, DB_POOL_PING_INTERVAL (s).
+    """
+    getmode = os.environ.get(f"{prefix}GETMODE", "wait").lower()
+    if getmode not in _GETMODES:
+        raise ValueError(f"{prefix}GETMODE must be one of {sorted(_GETMODES)}, got '{getmode}'")
+    return dict(
+        min=int(os.environ.get(f"{prefix}MIN", "1")),
+        max=int(os.environ.get(f"{prefix}MAX", "10")),
+        increment=int(os.environ.get(f"{prefix}INCREMENT", "1")),
+        getmode=_GETMODES[getmode],
+        wait_timeout=int(os.environ.get(f"{prefix}WAIT_TIMEOUT", "0")),
+        stmtcachesize=int(os.environ.get(f"{prefix}STMT_CACHE_SIZE", "20")),
+        ping_interval=int(os.environ.get(f"{prefix}PING_INTERVAL", "60"))
+    )
+
+class PoolMetrics:
+    """Acquire counters and a wait-time histogram (milliseconds) for one pool."""
+
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquires = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.wait_ms_sum = 0.0
+        self.wait_ms_max = 0.0
+        self.bucket_counts = [0] * (len(self.BUCKETS_MS) + 1) # last bucket is +Inf
+
+    def observe(self, wait_seconds: float):
+        wait_ms = wait_seconds * 1000
+        with self._lock:
+            self.acquires += 1
+            self.wait_ms_sum += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+            self.bucket_counts[bisect.bisect_left(self.BUCKETS_MS, wait_ms)] += 1
+
+    def failed(self, error: Exception):
+        err = error.args[0] if error.args else None
+        with self._lock:
+            # DPY-4005: no connection available (nowait) or wait_timeout expired (timedwait)
+            if getattr(err, "full_code", None) == "DPY-4005":
+                self.timeouts += 1
+            else:
+                self.errors += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "acquires": self.acquires,
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+                "wait_ms_sum": round(self.wait_ms_sum, 3),
+                "wait_ms_max": round(self.wait_ms_max, 3),
+                "wait_ms_buckets": {
+                    **{f"le_{b}": c for b, c in zip(self.BUCKETS_MS, self.bucket_counts)},
+                    "le_inf": self.bucket_counts[-1]
+                }
+            }
+
+_metrics = {
+    "write": PoolMetrics(),
+    "read": PoolMetrics(),
+    "write_async": PoolMetrics(),
+    "read_async": PoolMetrics(),
+}
+
+# --- Round-trip accounting ---
+# Connections from the pools count, per request, the calls that cost a network round trip
+# (execute, executemany, callproc, callfunc, commit, rollback, run_pipeline). Fetches beyond
+# the prefetched rows and LOB reads are not counted.
+DB_COUNT_ROUND_TRIPS = os.environ.get("DB_COUNT_ROUND_TRIPS", "false").lower() == "true"
+# Send the statements of a write path with its commit in one round trip: a pipeline on asyncio
+# connections (the database executes pipelines natively from 23ai, older versions run them one
+# by one), one anonymous PL/SQL block (plsql_batch) on sync connections, which have no pipelines
+DB_PIPELINING = os.environ.get("DB_PIPELINING", "true").lower() == "true"
+
+# PL/SQL binds a str as VARCHAR2 (at most 32767 bytes); batches with longer values are not built
+PLSQL_BATCH_MAX_STR_BYTES = 32000
+# String literals, quoted identifiers and comments are copied as is; group 1 is a bind name
+_SQL_TOKENS = re.compile(r"'(?:[^']|'')*'|\"[^\"]*\"|--[^\n]*|/\*.*?\*/|:(\w+)", re.DOTALL)
+
+def plsql_batch(ops: Sequence[Tuple[str, Any]], commit: bool = True) -> Optional[Tuple[str, Dict]]:
+    """
+    Combines (sql, binds) ops into one anonymous block (sql, binds) that runs them in order,
+    then commits. PL/SQL ops become nested blocks and DML statements get their ';'. The binds
+    of op k are renamed :o<k>_<name>; a positional :N takes binds[N - 1]. Returns None when a
+    str bind is too long for PL/SQL; the caller then executes the ops one by one.
+    """
+    statements: List[str] = []
+    batch_binds: Dict[str, Any] = {}
+    for k, (sql, binds) in enumerate(ops):
+        def rename(match):
+            name = match.group(1)
+            if name is None:
+                return match.group(0)
+            value = binds[name] if isinstance(binds, dict) else binds[int(name) - 1]
+            if isinstance(value, str) and len(value.encode()) > PLSQL_BATCH_MAX_STR_BYTES:
+                raise OverflowError(name)
+            batch_binds[f"o{k}_{name}"] = value
+            return f":o{k}_{name}"
+        try:
+            statement = _SQL_TOKENS.sub(rename, sql).strip()
+        except OverflowError:
+            return None
+        if statement.upper().startswith(("BEGIN", "DECLARE")):
+            statements.append(statement)
+        else:
+            statements.append(statement.rstrip(";") + ";")
+    if commit:
+        statements.append("COMMIT;")
+    return "BEGIN\n" + "\n".join(statements) + "\nEND;", batch_binds
+
+# Storage behind the pools: oracle, or embedded (SQLite stand-in for load tests without a
+# database, see loan_api.embedded). The embedded backend has a single pool for reads and writes.
+DB_BACKEND = os.environ.get("DB_BACKEND", "oracle").lower()
+if DB_BACKEND not in ("oracle", "embedded"):
+    raise ValueError(f"DB_BACKEND must be 'oracle' or 'embedded', got '{DB_BACKEND}'")
+
+_round_trips: ContextVar[Optional[List[int]]] = ContextVar("db_round_trips", default=None)
+
+def _count_round_trip():
+    counter = _round_trips.get()
+    if counter is not None:
+        counter[0] += 1
+
+def start_round_trip_count():
+    """Starts counting for the current request; pass the result to stop_round_trip_count()."""
+    counter = [0]
+    return counter, _round_trips.set(counter)
+
+def stop_round_trip_count(started) -> int:
+    counter, token = started
+    _round_trips.reset(token)
+    return counter[0]
+
+class _CursorProxy:
+    # Wraps the driver's cursor (composition: the Cursor constructors are not public API)
+    def __init__(self, cursor):
+        object.__setattr__(self, "_cursor", cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+class _CountingCursor(_CursorProxy):
+    def execute(self, *args, **kwargs):
+        _count_round_trip()
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        _count_round_trip()
+        return self._cursor.executemany(*args, **kwargs)
+
+    def callproc(self, *args, **kwargs):
+        _count_round_trip()
+        return self._cursor.callproc(*args, **kwargs)
+
+    def callfunc(self, *args, **kwargs):
+        _count_round_trip()
+        return self._cursor.callfunc(*args, **kwargs)
+
+class CountingConnection(oracledb.Connection):
+    # connectiontype= of the pools; subclassing Connection is the documented way to customize it
+    def cursor(self, *args, **kwargs):
+        return _CountingCursor(super().cursor(*args, **kwargs))
+
+    def commit(self):
+        _count_round_trip()
+        super().commit()
+
+    def rollback(self):
+        _count_round_trip()
+        super().rollback()
+
+class _CountingAsyncCursor(_CursorProxy):
+    def __aiter__(self):
+        return self._cursor.__aiter__()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._cursor.close()
+
+    async def execute(self, *args, **kwargs):
+        _count_round_trip()
+        return await self._cursor.execute(*args, **kwargs)
+
+    async def executemany(self, *args, **kwargs):
+        _count_round_trip()
+        return await self._cursor.executemany(*args, **kwargs)
+
+    async def callproc(self, *args, **kwargs):
+        _count_round_trip()
+        return await self._cursor.callproc(*args, **kwargs)
+
+    async def callfunc(self, *args, **kwargs):
+        _count_round_trip()
+        return await self._cursor.callfunc(*args, **kwargs)
+
+class CountingAsyncConnection(oracledb.AsyncConnection):
+    def cursor(self, *args, **kwargs):
+        return _CountingAsyncCursor(super().cursor(*args, **kwargs))
+
+    async def commit(self):
+        _count_round_trip()
+        await super().commit()
+
+    async def rollback(self):
+        _count_round_trip()
+        await super().rollback()
+
+    async def run_pipeline(self, pipeline, continue_on_error: bool = False):
+        _count_round_trip()
+        return await super().run_pipeline(pipeline, continue_on_error)
+
+class RoundTripStats:
+    """Requests and DB round trips per route."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, List[int]] = {} # route -> [requests, round trips, max per request]
+
+    def record(self, route: str, round_trips: int):
+        with self._lock:
+            entry = self._routes.setdefault(route, [0, 0, 0])
+            entry[0] += 1
+            entry[1] += round_trips
+            entry[2] = max(entry[2], round_trips)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                route: {
+                    "requests": requests,
+                    "round_trips": total,
+                    "round_trips_per_request": round(total / requests, 2),
+                    "round_trips_max": peak
+                }
+                for route, (requests, total, peak) in sorted(self._routes.items())
+            }
+
+round_trip_stats = RoundTripStats()
+
+def _inline_lobs_handler(cursor, metadata):
+    """
+    Output type handler that fetches LOB columns as str/bytes with the row,
+    instead of LOB locators that need one extra round trip per .read().
+    """
+    if metadata.type_code is oracledb.DB_TYPE_CLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG, arraysize=cursor.arraysize)
+    if metadata.type_code is oracledb.DB_TYPE_NCLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG_NVARCHAR, arraysize=cursor.arraysize)
+    if metadata.type_code is oracledb.DB_TYPE_BLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG_RAW, arraysize=cursor.arraysize)
+
+def _fetch_lobs_inline(prefix: str) -> bool:
+    # e.g. DB_POOL_FETCH_LOBS_INLINE=false restores LOB locators for the write pool
+    return os.environ.get(f"{prefix}FETCH_LOBS_INLINE", "true").lower() == "true"
+
+# Per pool (same keys as _metrics), filled in by init_db / init_db_async
+_inline_lobs: Dict[str, bool] = {}
+
+def _acquire(pool, name: str):
+    metrics = _metrics[name]
+    start = time.perf_counter()
+    try:
+        conn = pool.acquire()
+    except oracledb.Error as e:
+        metrics.failed(e)
+        raise
+    metrics.observe(time.perf_counter() - start)
+    if _inline_lobs.get(name):
+        conn.outputtypehandler = _inline_lobs_handler
+    return conn
+
+async def _acquire_async(pool, name: str):
+    metrics = _metrics[name]
+    start = time.perf_counter()
+    try:
+        conn = await pool.acquire()
+    except oracledb.Error as e:
+        metrics.failed(e)
+        raise
+    metrics.observe(time.perf_counter() - start)
+    if _inline_lobs.get(name):
+        conn.outputtypehandler = _inline_lobs_handler
+    return conn
+
+def _primary_params() -> dict:
+    """Connection parameters for the primary, shared by the sync and async pools."""
     user = os.environ.get("DB_USER", "loan_user")
     password = os.environ.get("DB_PASSWORD", "Welcome12345!")
     dsn = os.environ.get("DB_DSN", "localhost:1521/FREEPDB1")
@@ -24,66 +342,120 @@ def init_db():
     service_name = os.environ.get("DB_SERVICE")
     wallet_location = os.environ.get("DB_WALLET_LOCATION") or os.environ.get("TNS_ADMIN")
     wallet_password = os.environ.get("WALLET_PASSWORD")
-    
+
+    if protocol and host and port and service_name:
+        return dict(
+            user=user,
+            password=password,
+            protocol=protocol,
+            host=host,
+            port=int(port),
+            service_name=service_name,
+            wallet_location=wallet_location,
+            wallet_password=wallet_password,
+            ssl_server_dn_match=False,
+            disable_oob=True,
+            **_pool_sizing("DB_POOL_")
+        )
+    return dict(
+        user=user,
+        password=password,
+        dsn=dsn,
+        disable_oob=True,
+        **_pool_sizing("DB_POOL_")
+    )
+
+def _read_params() -> Optional[dict]:
+    """Connection parameters for the True Cache read pool, or None if disabled."""
+    true_cache_enabled = os.environ.get("TRUE_CACHE_ENABLED", "false").lower() == "true"
+    if not true_cache_enabled:
+        return None
+
+    tc_dsn = os.environ.get("TRUE_CACHE_DSN")
+    if not tc_dsn:
+        raise ValueError("TRUE_CACHE_ENABLED is True but TRUE_CACHE_DSN is not set.")
+
+    # Assuming True Cache uses same user/pass/wallet as primary or simple DSN
+    # We reuse the user/password from primary.
+    return dict(
+        user=os.environ.get("DB_USER", "loan_user"),
+        password=os.environ.get("DB_PASSWORD", "Welcome12345!"),
+        dsn=tc_dsn,
+        disable_oob=True,
+        **_pool_sizing("TRUE_CACHE_POOL_")
+    )
+
+def _counting(async_pool: bool) -> dict:
+    if not DB_COUNT_ROUND_TRIPS:
+        return {}
+    return {"connectiontype": CountingAsyncConnection if async_pool else CountingConnection}
+
+# create_pool() arguments that oracledb.connect() does not accept
+_POOL_ONLY_PARAMS = ("min", "max", "increment", "getmode", "wait_timeout", "ping_interval")
+
+def connect_standalone(read: bool = False):
+    """Unpooled connection to the primary, or to True Cache with read=True (for background monitors)."""
+    params = _read_params() if read else _primary_params()
+    if params is None:
+        raise ValueError("True Cache is not enabled")
+    return oracledb.connect(**{k: v for k, v in params.items() if k not in _POOL_ONLY_PARAMS})
+
+def init_db():
+    global _write_pool, _read_pool
+    if _write_pool is not None:
+        return
+
+    if DB_BACKEND == "embedded":
+        from . import embedded
+        _write_pool = _read_pool = embedded.create_pool(**_pool_sizing("DB_POOL_"))
+        _inline_lobs["write"] = _inline_lobs["read"] = False
+        return
+
+    # --- Primary / Write Pool ---
     logger.info(f"Initializing Write Pool...")
     try:
-        if protocol and host and port and service_name:
-             _write_pool = oracledb.create_pool(
-                user=user,
-                password=password,
-                protocol=protocol,
-                host=host,
-                port=int(port),
-                service_name=service_name,
-                wallet_location=wallet_location,
-                wallet_password=wallet_password,
-                ssl_server_dn_match=False,
-                min=1,
-                max=10,
-                increment=1,
-                disable_oob=True
-            )
-        else:
-            _write_pool = oracledb.create_pool(
-                user=user,
-                password=password,
-                dsn=dsn,
-                min=1,
-                max=10,
-                increment=1,
-                disable_oob=True
-            )
+        _write_pool = oracledb.create_pool(**_primary_params(), **_counting(False))
     except Exception as e:
         logger.error(f"Failed to create Write Pool: {e}")
         raise
+    _inline_lobs["write"] = _fetch_lobs_inline("DB_POOL_")
 
     # --- True Cache / Read Pool ---
-    true_cache_enabled = os.environ.get("TRUE_CACHE_ENABLED", "false").lower() == "true"
+    read_params = _read_params()
     
-    if true_cache_enabled:
-        tc_dsn = os.environ.get("TRUE_CACHE_DSN")
-        if not tc_dsn:
-            raise ValueError("TRUE_CACHE_ENABLED is True but TRUE_CACHE_DSN is not set.")
-        
-        logger.info(f"Initializing Read Pool (True Cache) at {tc_dsn}...")
+    if read_params:
+        logger.info(f"Initializing Read Pool (True Cache) at {read_params['dsn']}...")
         try:
-             # Assuming True Cache uses same user/pass/wallet as primary or simple DSN
-             # We reuse the user/password from primary.
-             _read_pool = oracledb.create_pool(
-                user=user,
-                password=password,
-                dsn=tc_dsn,
-                min=1,
-                max=10,
-                increment=1,
-                disable_oob=True
-            )
+             _read_pool = oracledb.create_pool(**read_params, **_counting(False))
         except Exception as e:
             logger.error(f"Failed to create Read Pool: {e}")
             raise
+        _inline_lobs["read"] = _fetch_lobs_inline("TRUE_CACHE_POOL_")
     else:
         logger.info("True Cache disabled, Read Pool aliases Write Pool.")
         _read_pool = _write_pool # Alias
+        _inline_lobs["read"] = _inline_lobs["write"]
+
+def load_json(value):
+    """
+    Normalizes a JSON document column value to Python.
+    Native JSON columns already arrive as dict/list; CLOB columns (databases not yet
+    migrated, see infra/db/oracle/migrations) arrive as str, or as a LOB locator
+    when FETCH_LOBS_INLINE is disabled for the pool.
+    """
+    if value is None:
+        return {}
+    if isinstance(value, (dict, list)):
+        return value
+    if hasattr(value, "read"):
+        value = value.read()
+    return json.loads(value) if value else {}
+
+async def load_json_async(value):
+    # Same as load_json, but AsyncLOB.read() must be awaited
+    if hasattr(value, "read"):
+        value = await value.read()
+    return load_json(value)
 
 def get_connection():
     # Backward compatibility, defaults to write for safety unless explicit
@@ -92,12 +464,12 @@ def get_connection():
 def get_write_connection():
     if _write_pool is None:
         init_db()
-    return _write_pool.acquire()
+    return _acquire(_write_pool, "write")
 
 def get_read_connection():
     if _read_pool is None:
         init_db()
-    return _read_pool.acquire()
+    return _acquire(_read_pool, "read")
 
 def close_db():
     global _write_pool, _read_pool
@@ -115,3 +487,95 @@ def release_connection(conn):
         conn.close()
     except Exception as e:
         logger.warning(f"Failed to release connection: {e}")
+
+# --- Async pools (python-oracledb asyncio API, used by loan_api.main_async) ---
+
+def init_db_async():
+    global _write_pool_async, _read_pool_async
+    if _write_pool_async is not None:
+        return
+
+    if DB_BACKEND == "embedded":
+        from . import embedded
+        _write_pool_async = _read_pool_async = embedded.create_pool_async(**_pool_sizing("DB_POOL_"))
+        _inline_lobs["write_async"] = _inline_lobs["read_async"] = False
+        return
+
+    logger.info("Initializing async Write Pool...")
+    try:
+        _write_pool_async = oracledb.create_pool_async(**_primary_params(), **_counting(True))
+    except Exception as e:
+        logger.error(f"Failed to create async Write Pool: {e}")
+        raise
+    _inline_lobs["write_async"] = _fetch_lobs_inline("DB_POOL_")
+
+    read_params = _read_params()
+    if read_params:
+        logger.info(f"Initializing async Read Pool (True Cache) at {read_params['dsn']}...")
+        try:
+            _read_pool_async = oracledb.create_pool_async(**read_params, **_counting(True))
+        except Exception as e:
+            logger.error(f"Failed to create async Read Pool: {e}")
+            raise
+        _inline_lobs["read_async"] = _fetch_lobs_inline("TRUE_CACHE_POOL_")
+    else:
+        _read_pool_async = _write_pool_async # Alias
+        _inline_lobs["read_async"] = _inline_lobs["write_async"]
+
+async def get_write_connection_async():
+    if _write_pool_async is None:
+        init_db_async()
+    return await _acquire_async(_write_pool_async, "write_async")
+
+async def get_read_connection_async():
+    if _read_pool_async is None:
+        init_db_async()
+    return await _acquire_async(_read_pool_async, "read_async")
+
+async def close_db_async():
+    global _write_pool_async, _read_pool_async
+    if _read_pool_async and _read_pool_async != _write_pool_async:
+        await _read_pool_async.close()
+    if _write_pool_async:
+        await _write_pool_async.close()
+    _write_pool_async = None
+    _read_pool_async = None
+
+async def release_connection_async(conn):
+    if not conn:
+        return
+    try:
+        await conn.close()
+    except Exception as e:
+        logger.warning(f"Failed to release async connection: {e}")
+
+# --- Pool statistics ---
+
+def _pool_state(pool) -> Dict:
+    return {
+        "opened": pool.opened,
+        "busy": pool.busy,
+        "min": pool.min,
+        "max": pool.max,
+        "wait_timeout_ms": pool.wait_timeout,
+        "stmtcachesize": pool.stmtcachesize,
+        "ping_interval": pool.ping_interval
+    }
+
+def pool_stats() -> Dict:
+    """Open/busy counts plus acquire metrics for every initialized pool."""
+    pools = {
+        "write": (_write_pool, None),
+        "read": (_read_pool, "write" if _read_pool is _write_pool else None),
+        "write_async": (_write_pool_async, None),
+        "read_async": (_read_pool_async, "write_async" if _read_pool_async is _write_pool_async else None),
+    }
+    stats = {}
+    for name, (pool, alias_of) in pools.items():
+        if pool is None:
+            continue
+        entry = {**_pool_state(pool), "fetch_lobs_inline": _inline_lobs.get(name, False), **_metrics[name].snapshot()}
+        if alias_of:
+            entry["aliases"] = alias_of
+        stats[name] = entry
+    return stats
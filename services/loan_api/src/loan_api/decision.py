@@ -1,26 +1,177 @@
-from workflows.loan_origination_wayflow import create_loan_workflow
-from workflows.wayflow import WorkflowContext
+from workflows.loan_origination_wayflow import LOAN_WORKFLOW_NAME, decision_version
+from workflows.wayflow import WorkflowContext, get_workflow
+import json
 import logging
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+import oracledb
+
+from .cache import LRUCache
+from .canonical import canonical_hash
+from .storage import application_repo, plan_repo
 
 logger = logging.getLogger("loan_api.decision")
 
-def execute_decision_workflow(inputs: dict, mode: str, run_id_base: str):
+# Memoized agent results, keyed by the decision inputs hash and decision_version().
+# The agent is deterministic, so PLAN / DRY_RUN / EXECUTE over unchanged inputs reuse one result.
+DECISION_CACHE_DB = os.environ.get("DECISION_CACHE_DB", "false").lower() == "true"
+
+class DecisionCache:
+    """
+    Two-tier cache of agent decision results: an in-process LRU and, with
+    DECISION_CACHE_DB=true, the decision_cache table shared by all workers.
+
+    Workflow runs (including plan scenarios on the planning pool) only use the
+    LRU. The table is read and written by the request thread: load() before the
+    runs, save() once the request has committed.
+    """
+
+    def __init__(self):
+        self.memory = LRUCache(
+            max_entries=int(os.environ.get("DECISION_CACHE_MAX_ENTRIES", "10000")),
+            max_bytes=int(os.environ.get("DECISION_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+            ttl_seconds=float(os.environ.get("DECISION_CACHE_TTL_SECONDS", "3600"))
+        )
+        self.use_db = DECISION_CACHE_DB
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @staticmethod
+    def key(inputs: Dict) -> str:
+        data = {
+            "application": inputs["application"],
+            "kyc_result": inputs["kyc_result"],
+            "fraud_result": inputs["fraud_result"],
+            "credit_score": inputs["credit_score"]
+        }
+        return f"{canonical_hash(data)}:{decision_version()}"
+
+    def bypass(self):
+        self._count("bypassed")
+
+    def _count(self, counter: str, n: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def get(self, key: str) -> Optional[Dict]:
+        cached = self.memory.get(key)
+        if cached is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return json.loads(cached)
+
+    def put(self, key: str, result: Dict, writes: Optional[List] = None):
+        """Stores a result in the LRU; with `writes`, also queues it for save()."""
+        body = json.dumps(result)
+        self.memory.put(key, body, size=len(body))
+        if self.use_db and writes is not None:
+            writes.append({"cache_key": key, "result": body})
+
+    def load(self, conn, inputs: Iterable[Dict]):
+        """Copies the DB tier entries for these workflow inputs that the LRU lacks into it, in one query."""
+        if not self.use_db:
+            return
+        keys = {self.key(i) for i in inputs if not i.get("mock_agent")}
+        missing = sorted(key for key in keys if key not in self.memory)
+        if not missing:
+            return
+        cursor = conn.cursor()
+        try:
+            cursor.execute(*plan_repo.select_cached_decisions(json.dumps(missing)))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        for key, result in rows:
+            body = json.dumps(result)
+            self.memory.put(key, body, size=len(body))
+        self._count("db_hits", len(rows))
+
+    def save(self, conn, writes: List[Dict]):
+        """
+        Writes the results queued by put() to the DB tier and commits. Call it
+        after the request's own commit. Failures are logged, never raised.
+        """
+        if not writes:
+            return
+        cursor = conn.cursor()
+        # Own short transaction, committed with the executemany (one round trip)
+        conn.autocommit = True
+        try:
+            # Keys stored concurrently by another worker are skipped (batch errors)
+            cursor.executemany(plan_repo.INSERT_DECISION_CACHE_SQL, writes, batcherrors=True)
+        except oracledb.Error as e:
+            logger.warning(f"Decision cache write of {len(writes)} results failed: {e}")
+        finally:
+            conn.autocommit = False
+            cursor.close()
+        writes.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "memory": self.memory.stats(),
+                "db_tier": self.use_db,
+                "hits": self.hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None
+            }
+
+decision_cache = DecisionCache()
+
+def decision_persister(conn) -> Callable[[str, str, Dict], None]:
+    """
+    The persist_decision input of EXECUTE runs: writes the decision in the
+    connection's open transaction, committed by the caller with the idempotency completion.
+    """
+    def persist_decision(app_id: str, decision: str, result: Dict):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(*application_repo.persist_decision(app_id, decision, json.dumps(result)))
+            if not cursor.rowcount:
+                raise RuntimeError(f"Application {app_id} not found or past the decision stage")
+        finally:
+            cursor.close()
+    return persist_decision
+
+def execute_decision_workflow(inputs: dict, mode: str, run_id_base: str, cache_writes: Optional[List] = None):
     """
     Executes the Loan Origination Workflow.
     
     Args:
-        inputs: Dictionary containing workflow inputs (application, kyc, fraud, credit, db_conn).
+        inputs: Dictionary containing workflow inputs (application, kyc, fraud, credit, persist_decision).
         mode: Execution mode ('EXECUTE', 'DRY_RUN', 'PLAN').
         run_id_base: Base string for the Run ID.
+        cache_writes: Collects new results for decision_cache.save() (DB tier).
         
     Returns:
         Dictionary with decision results.
     """
-    # Prepare Workflow
-    wf = create_loan_workflow()
+    # Compiled once at import by the workflow module
+    wf = get_workflow(LOAN_WORKFLOW_NAME)
     
     # Run ID
     run_id = f"run_{run_id_base}"
+
+    # Reuse a prior result for identical inputs; the workflow still runs so EXECUTE persists it.
+    # Mock runs are neither served from nor stored in the cache.
+    cache_key = None
+    if inputs.get("mock_agent"):
+        decision_cache.bypass()
+    else:
+        cache_key = decision_cache.key(inputs)
+        precomputed = decision_cache.get(cache_key)
+        if precomputed is not None:
+            inputs = {**inputs, "precomputed_decision": precomputed}
+            cache_key = None
     
     ctx = WorkflowContext(
         run_id=run_id,
@@ -32,6 +183,8 @@ def execute_decision_workflow(inputs: dict, mode: str, run_id_base: str):
     try:
         result = wf.run(ctx)
         agent_res = result["results"].get("agent_decision", {})
+        if cache_key:
+            decision_cache.put(cache_key, agent_res, cache_writes)
         
         return {
             "run_id": run_id,
@@ -0,0 +1,499 @@
+"""
+Embedded storage engine (DB_BACKEND=embedded): SQLite in place of Oracle, so the
+whole request pipeline can be load-tested and profiled without a database
+container.
+
+The statements come from the SQLite repositories (loan_api.storage.sqlite); this
+module only runs them. Connections come from a pool with the interface of an
+oracledb pool, so pool metrics and X-DB-Round-Trips work as with Oracle; an async
+pool serves loan_api.main_async, including pipelines. What Oracle does in PL/SQL
+(idempotency check-and-lock, guarded transitions) runs as registered procedures:
+Python functions executed by the statement "CALL <name>", which raise the same
+ORA- errors and set cursor.var() out binds the same way, so the callers do not
+tell the backends apart. Columns declared TIMESTAMP or JSON are read back as
+datetime and dict / list, as from Oracle.
+
+Semantics: SQLite allows one writer at a time. A transaction takes the write
+lock with its first write and holds it until commit or rollback; other writers
+wait up to EMBEDDED_BUSY_TIMEOUT_MS, readers never wait (WAL). Use it to compare
+the Python side (hashing, serialization, caches, round-trip counts), not to
+predict Oracle latencies.
+"""
+import asyncio
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import oracledb
+
+from .db import _count_round_trip
+
+logger = logging.getLogger("loan_api.embedded")
+
+EMBEDDED_DB_PATH = os.environ.get("EMBEDDED_DB_PATH", os.path.join(tempfile.gettempdir(), "loan_api_embedded.db"))
+EMBEDDED_BUSY_TIMEOUT_MS = int(os.environ.get("EMBEDDED_BUSY_TIMEOUT_MS", "5000"))
+# Start from an empty database (applications, idempotency keys, ...) on every start
+EMBEDDED_RESET = os.environ.get("EMBEDDED_RESET", "false").lower() == "true"
+
+# Timestamps are stored as ISO text with microseconds, so they sort as text and
+# updated_at keeps changing between quick successive writes (it versions the snapshot cache)
+_TS_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+NOW = "systimestamp()"
+
+# Bumped with every schema change; a database file of another version is recreated
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS applications (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    applicant_data JSON,
+    decision_data JSON,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS audit_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    application_id TEXT,
+    action TEXT,
+    details JSON,
+    created_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_audit_logs_app ON audit_logs (application_id, created_at, id);
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    idempotency_key TEXT NOT NULL,
+    route_path TEXT NOT NULL,
+    payload_hash TEXT NOT NULL,
+    request_mode TEXT,
+    execution_mode TEXT,
+    status TEXT NOT NULL,
+    response_code INTEGER,
+    response_body JSON,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    PRIMARY KEY (idempotency_key, route_path)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_idempotency_key ON idempotency_keys (idempotency_key);
+CREATE TABLE IF NOT EXISTS decision_plans (
+    plan_id TEXT PRIMARY KEY,
+    workspace_id TEXT NOT NULL,
+    application_id TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    inputs_hash TEXT NOT NULL,
+    plan_json JSON,
+    status TEXT DEFAULT 'CREATED',
+    created_at TIMESTAMP,
+    executed_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_plans_app_id ON decision_plans (application_id);
+CREATE TABLE IF NOT EXISTS decision_cache (
+    cache_key TEXT PRIMARY KEY,
+    result JSON NOT NULL,
+    created_at TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS bookings (
+    booking_id TEXT PRIMARY KEY,
+    application_id TEXT NOT NULL UNIQUE,
+    activation_date TEXT NOT NULL,
+    principal REAL,
+    created_at TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS redecision_jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    policy JSON,
+    last_application_id TEXT,
+    processed INTEGER DEFAULT 0,
+    changed INTEGER DEFAULT 0,
+    skipped INTEGER DEFAULT 0,
+    started_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS redecision_results (
+    job_id TEXT NOT NULL,
+    application_id TEXT NOT NULL,
+    old_decision TEXT,
+    new_decision TEXT NOT NULL,
+    reason_codes JSON,
+    pricing JSON,
+    created_at TIMESTAMP,
+    PRIMARY KEY (job_id, application_id)
+);
+"""
+
+def _now() -> str:
+    return datetime.datetime.now().strftime(_TS_FORMAT)
+
+# Read back by declared column type (connections use PARSE_DECLTYPES); NULLs are not converted
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("JSON", json.loads)
+
+class _Error:
+    """Stands in for the error object of oracledb exceptions (code, full_code, message)."""
+
+    def __init__(self, full_code: str, message: str, code: int = 0):
+        self.code = code
+        self.full_code = full_code
+        self.message = f"{full_code}: {message}"
+
+    def __str__(self):
+        return self.message
+
+def ora_error(code: int, message: str, cls=oracledb.DatabaseError) -> Exception:
+    return cls(_Error(f"ORA-{code:05d}", message, code))
+
+class _Var:
+    """Out bind created by cursor.var()."""
+
+    def __init__(self):
+        self.value = None
+
+    def getvalue(self, pos: int = 0):
+        return self.value
+
+    def setvalue(self, pos: int, value):
+        self.value = value
+
+# --- Procedures: statement "CALL <name>" -> run(db, binds) -> (rows, rowcount) ---
+
+Procedure = Callable[[sqlite3.Connection, Any], Tuple[List[tuple], int]]
+PROCEDURES: Dict[str, Procedure] = {}
+
+def procedure(name: str, run: Procedure) -> str:
+    """Registers run as a procedure and returns the statement that calls it."""
+    statement = f"CALL {name}"
+    PROCEDURES[statement] = run
+    return statement
+
+def _adapt(binds):
+    def value(v):
+        return v.strftime(_TS_FORMAT) if isinstance(v, datetime.datetime) else v
+    if isinstance(binds, dict):
+        return {k: value(v) for k, v in binds.items()}
+    return [value(v) for v in binds or ()]
+
+# --- Connections ---
+
+def _open(path: str) -> sqlite3.Connection:
+    # isolation_level IMMEDIATE: the first write of a transaction takes the write lock (BEGIN IMMEDIATE),
+    # so transactions never fail on a lock upgrade; reads before it run in autocommit
+    db = sqlite3.connect(path, timeout=EMBEDDED_BUSY_TIMEOUT_MS / 1000, isolation_level="IMMEDIATE",
+                         check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+    db.create_function("systimestamp", 0, _now)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+def _remove(path: str):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+def _init_schema(path: str):
+    if EMBEDDED_RESET:
+        _remove(path)
+    elif os.path.exists(path):
+        db = sqlite3.connect(path)
+        try:
+            version = db.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            db.close()
+        if version != SCHEMA_VERSION:
+            logger.warning(f"Embedded database {path} has schema version {version}, expected {SCHEMA_VERSION}: recreating it")
+            _remove(path)
+    db = _open(path)
+    try:
+        db.executescript(SCHEMA)
+        db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    finally:
+        db.close()
+
+class EmbeddedCursor:
+    def __init__(self, connection: "EmbeddedConnection"):
+        self.connection = connection
+        self.arraysize = 100
+        self.prefetchrows = 2
+        self.rowcount = 0
+        self._rows: List[tuple] = []
+        self._pos = 0
+        self._batch_errors: List[Any] = []
+        self._rowcounts: List[int] = []
+
+    def var(self, typ=None, *args, **kwargs) -> _Var:
+        return _Var()
+
+    def _execute(self, statement: str, binds):
+        self._rows, self.rowcount = self.connection._run(statement, binds)
+        self._pos = 0
+
+    def execute(self, statement: str, parameters=None, **keyword_parameters):
+        _count_round_trip()
+        self._execute(statement, parameters if parameters is not None else keyword_parameters)
+        self.connection._autocommit()
+
+    def _executemany(self, statement: str, parameters, batcherrors: bool, arraydmlrowcounts: bool):
+        self._batch_errors, self._rowcounts = [], []
+        total = 0
+        for offset, binds in enumerate(parameters):
+            try:
+                _, count = self.connection._run(statement, binds)
+            except oracledb.DatabaseError as e:
+                if not batcherrors:
+                    raise
+                self._batch_errors.append(oracledb.DatabaseError(e.args[0]))
+                self._batch_errors[-1].offset = offset
+                self._batch_errors[-1].message = e.args[0].message
+                count = 0
+            total += count
+            self._rowcounts.append(count)
+        self.rowcount = total
+        self._rows, self._pos = [], 0
+
+    def executemany(self, statement: str, parameters, batcherrors: bool = False, arraydmlrowcounts: bool = False, **kwargs):
+        _count_round_trip()
+        self._executemany(statement, parameters, batcherrors, arraydmlrowcounts)
+        self.connection._autocommit()
+
+    def getbatcherrors(self) -> List[Any]:
+        return self._batch_errors
+
+    def getarraydmlrowcounts(self) -> List[int]:
+        return self._rowcounts
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        self._pos += 1
+        return self._rows[self._pos - 1]
+
+    def fetchmany(self, size: Optional[int] = None):
+        size = size or self.arraysize
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        self._rows = []
+
+class EmbeddedConnection:
+    """The subset of oracledb.Connection used by loan_api, on one SQLite connection."""
+
+    def __init__(self, db: sqlite3.Connection, pool: Optional["EmbeddedPool"] = None):
+        self._db = db
+        self._pool = pool
+        self.autocommit = False
+        self.outputtypehandler = None
+        self.call_timeout = 0
+
+    def _run(self, statement: str, binds) -> Tuple[List[tuple], int]:
+        proc = PROCEDURES.get(statement)
+        try:
+            if proc is not None:
+                return proc(self._db, _adapt(binds))
+            cursor = self._db.execute(statement, _adapt(binds))
+            rows = cursor.fetchall() if cursor.description else []
+            return rows, cursor.rowcount
+        except sqlite3.IntegrityError as e:
+            raise ora_error(1, f"unique constraint violated ({e})", oracledb.IntegrityError)
+        except sqlite3.Error as e:
+            raise ora_error(20000, f"embedded backend: {e}")
+
+    def _autocommit(self):
+        if self.autocommit:
+            self._db.commit()
+
+    def cursor(self) -> EmbeddedCursor:
+        return EmbeddedCursor(self)
+
+    def commit(self):
+        _count_round_trip()
+        self._db.commit()
+
+    def rollback(self):
+        _count_round_trip()
+        self._db.rollback()
+
+    def _run_pipeline(self, pipeline) -> List[Any]:
+        # Operations run in order and the first error stops the pipeline (continue_on_error=False)
+        results = []
+        for op in pipeline.operations:
+            if op.op_type == oracledb.PipelineOpType.EXECUTE:
+                cursor = self.cursor()
+                cursor._execute(op.statement, op.parameters if op.parameters is not None else op.keyword_parameters)
+                results.append(cursor.rowcount)
+            elif op.op_type == oracledb.PipelineOpType.COMMIT:
+                self._db.commit()
+                results.append(None)
+            else:
+                raise oracledb.NotSupportedError(_Error("DPY-3001", f"pipeline operation {op.op_type.name} not supported by the embedded backend"))
+        self._autocommit()
+        return results
+
+    def close(self):
+        # Like a pooled oracledb connection: uncommitted work is rolled back and the connection returns to the pool
+        self._db.rollback()
+        self.autocommit = False
+        if self._pool is not None:
+            self._pool._release(self._db)
+        else:
+            self._db.close()
+
+class EmbeddedPool:
+    """Pool of SQLite connections with the attributes and getmode behavior of an oracledb pool."""
+
+    def __init__(self, path: str, min: int = 1, max: int = 10, increment: int = 1,
+                 getmode: int = oracledb.POOL_GETMODE_WAIT, wait_timeout: int = 0,
+                 stmtcachesize: int = 20, ping_interval: int = 60):
+        self.path = path
+        self.min = min
+        self.max = max
+        self.getmode = getmode
+        self.wait_timeout = wait_timeout
+        self.stmtcachesize = stmtcachesize
+        self.ping_interval = ping_interval
+        self.opened = 0
+        self.busy = 0
+        self._idle: List[sqlite3.Connection] = []
+        self._cond = threading.Condition()
+        for _ in range(min):
+            self._idle.append(_open(path))
+            self.opened += 1
+
+    def acquire(self) -> EmbeddedConnection:
+        with self._cond:
+            while not self._idle and self.opened >= self.max and self.getmode != oracledb.POOL_GETMODE_FORCEGET:
+                if self.getmode == oracledb.POOL_GETMODE_NOWAIT:
+                    raise oracledb.DatabaseError(_Error("DPY-4005", "no connection available in the embedded pool"))
+                timeout = self.wait_timeout / 1000 if self.getmode == oracledb.POOL_GETMODE_TIMEDWAIT else None
+                if not self._cond.wait(timeout):
+                    raise oracledb.DatabaseError(_Error("DPY-4005", "timed out waiting for the embedded pool"))
+            if self._idle:
+                db = self._idle.pop()
+            else:
+                db = _open(self.path)
+                self.opened += 1
+            self.busy += 1
+        return EmbeddedConnection(db, self)
+
+    def _release(self, db: sqlite3.Connection):
+        with self._cond:
+            self.busy -= 1
+            if self.opened > self.max:
+                # FORCEGET connection beyond max
+                self.opened -= 1
+                db.close()
+            else:
+                self._idle.append(db)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            for db in self._idle:
+                db.close()
+            self.opened -= len(self._idle)
+            self._idle = []
+
+# --- asyncio flavor (loan_api.main_async): each call runs on a worker thread ---
+
+class AsyncEmbeddedCursor:
+    def __init__(self, connection: "AsyncEmbeddedConnection"):
+        self._cursor = EmbeddedCursor(connection._conn)
+
+    arraysize = property(lambda self: self._cursor.arraysize, lambda self, v: setattr(self._cursor, "arraysize", v))
+    prefetchrows = property(lambda self: self._cursor.prefetchrows, lambda self, v: setattr(self._cursor, "prefetchrows", v))
+    rowcount = property(lambda self: self._cursor.rowcount)
+
+    def var(self, typ=None, *args, **kwargs) -> _Var:
+        return _Var()
+
+    async def execute(self, statement: str, parameters=None, **keyword_parameters):
+        await asyncio.to_thread(self._cursor.execute, statement, parameters, **keyword_parameters)
+
+    async def executemany(self, statement: str, parameters, **kwargs):
+        await asyncio.to_thread(self._cursor.executemany, statement, parameters, **kwargs)
+
+    def getbatcherrors(self):
+        return self._cursor.getbatcherrors()
+
+    def getarraydmlrowcounts(self):
+        return self._cursor.getarraydmlrowcounts()
+
+    async def fetchone(self):
+        return self._cursor.fetchone()
+
+    async def fetchmany(self, size: Optional[int] = None):
+        return self._cursor.fetchmany(size)
+
+    async def fetchall(self):
+        return self._cursor.fetchall()
+
+    async def __aiter__(self):
+        for row in self._cursor:
+            yield row
+
+    def close(self):
+        self._cursor.close()
+
+class AsyncEmbeddedConnection:
+    def __init__(self, conn: EmbeddedConnection):
+        self._conn = conn
+        self.outputtypehandler = None
+
+    autocommit = property(lambda self: self._conn.autocommit, lambda self, v: setattr(self._conn, "autocommit", v))
+
+    def cursor(self) -> AsyncEmbeddedCursor:
+        return AsyncEmbeddedCursor(self)
+
+    async def commit(self):
+        await asyncio.to_thread(self._conn.commit)
+
+    async def rollback(self):
+        await asyncio.to_thread(self._conn.rollback)
+
+    async def run_pipeline(self, pipeline, continue_on_error: bool = False):
+        _count_round_trip()
+        return await asyncio.to_thread(self._conn._run_pipeline, pipeline)
+
+    async def close(self):
+        await asyncio.to_thread(self._conn.close)
+
+class AsyncEmbeddedPool:
+    def __init__(self, pool: EmbeddedPool):
+        self._pool = pool
+
+    def __getattr__(self, name):
+        # opened, busy, min, max, wait_timeout, ... for pool_stats()
+        return getattr(self._pool, name)
+
+    async def acquire(self) -> AsyncEmbeddedConnection:
+        return AsyncEmbeddedConnection(await asyncio.to_thread(self._pool.acquire))
+
+    async def close(self):
+        self._pool.close()
+
+def create_pool(path: str = EMBEDDED_DB_PATH, **sizing) -> EmbeddedPool:
+    """Embedded counterpart of oracledb.create_pool(); sizing as returned by db._pool_sizing()."""
+    from .storage import sqlite # registers the procedures
+    _init_schema(path)
+    logger.info(f"Embedded backend (SQLite {sqlite3.sqlite_version}) at {path}")
+    return EmbeddedPool(path, **sizing)
+
+def create_pool_async(path: str = EMBEDDED_DB_PATH, **sizing) -> AsyncEmbeddedPool:
+    return AsyncEmbeddedPool(create_pool(path, **sizing))
@@ -1,26 +1,132 @@
 import hashlib
 import json
 import logging
-from typing import Any, Dict, Optional, Union
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
 import oracledb
 from fastapi import HTTPException, status
 
+from .cache import LRUCache
+from .canonical import canonical_hash
+from .db import DB_BACKEND, DB_PIPELINING, plsql_batch
+from .storage import idempotency_repo
+
 logger = logging.getLogger("loan_api.idempotency")
 
+# Write the stored response in the same transaction as the business change (one commit per request)
+IDEMPOTENCY_TRANSACTIONAL = os.environ.get("IDEMPOTENCY_TRANSACTIONAL", "true").lower() == "true"
+# IN_PROGRESS keys older than this are considered abandoned (e.g. crashed worker) and are reclaimed
+IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get("IDEMPOTENCY_LEASE_SECONDS", "300"))
+
+# In-process cache of COMPLETED responses: key -> (route, payload_hash, response JSON).
+# Completed rows never change, so entries are only dropped by LRU/TTL or invalidate_completed().
+completed_responses = LRUCache(
+    max_entries=int(os.environ.get("IDEMPOTENCY_CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(os.environ.get("IDEMPOTENCY_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=float(os.environ.get("IDEMPOTENCY_CACHE_TTL_SECONDS", "600"))
+)
+
+def invalidate_completed(key: Optional[str] = None):
+    """Drops one key (or everything) from the completed-response cache."""
+    if key is None:
+        completed_responses.clear()
+    else:
+        completed_responses.invalidate(key)
+
 class IdempotencyManager:
-    def __init__(self, conn):
+    def __init__(self, conn, transactional: Optional[bool] = None):
         self.conn = conn
+        self.transactional = IDEMPOTENCY_TRANSACTIONAL if transactional is None else transactional
+        # payload hashes of keys locked by this manager, needed to cache the completed response
+        self._locked_hashes: Dict[str, str] = {}
+
+    def _cache_completed(self, key: str, route: str, phash: str, body_json: str):
+        completed_responses.put(key, (route, phash, body_json), size=len(body_json))
 
     def _hash_payload(self, body: Dict, request_mode: str, execution_mode: str) -> str:
-        # Canonicalize body: Sort keys to ensure consistent hash
+        # Canonicalize body: Sort keys to ensure consistent hash (same bytes as json.dumps(sort_keys=True) under v1)
+        suffix = f"|{request_mode}|{execution_mode}"
         try:
-            canonical = json.dumps(body, sort_keys=True)
+            return canonical_hash(body, suffix)
         except TypeError:
              # Fallback for non-serializable (should not happen with Pydantic models dict)
-             canonical = str(body)
-             
-        raw = f"{canonical}|{request_mode}|{execution_mode}"
-        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+             raw = f"{str(body)}{suffix}"
+             return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _check_cache(self, key: str, route: str, phash: str) -> Optional[Dict]:
+        # Retries of completed requests are answered without a DB round trip
+        cached = completed_responses.get(key)
+        if cached:
+            cached_route, cached_hash, cached_body = cached
+            if cached_route != route or cached_hash != phash:
+                logger.warning(f"Idempotency conflict: Key {key} reused across routes or with different payload.")
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Idempotency key already used for route {cached_route}"
+                )
+            return json.loads(cached_body)
+        return None
+
+    # Binds of IdempotencyRepository.CHECK_AND_LOCK_SQL (loan_api.storage): one round trip that
+    # inserts the lock row or reports the existing one through the out binds
+    def _lock_binds(self, cursor, key: str, route: str, phash: str, request_mode: str, execution_mode: str) -> Dict:
+        return dict(
+            key=key,
+            route=route,
+            phash=phash,
+            request_mode=request_mode,
+            execution_mode=execution_mode,
+            lease_seconds=IDEMPOTENCY_LEASE_SECONDS,
+            outcome=cursor.var(str),
+            existing_route=cursor.var(str),
+            response_body=cursor.var(oracledb.DB_TYPE_JSON)
+        )
+
+    def _resolve_outcome(self, key: str, phash: str, binds: Dict) -> bool:
+        """
+        Interprets the check-and-lock outcome.
+        Returns True if the key is locked for us, False if it is COMPLETED; raises 409 on conflicts.
+        """
+        result = binds["outcome"].getvalue()
+
+        if result == 'LOCKED':
+            self._locked_hashes[key] = phash
+            return True # Proceed with execution
+        if result == 'RECLAIMED':
+            logger.warning(f"Idempotency key {key} IN_PROGRESS lease expired, reclaimed.")
+            self._locked_hashes[key] = phash
+            return True
+        if result == 'CONFLICT':
+            logger.warning(f"Idempotency conflict: Key {key} reused across routes or with different payload.")
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Idempotency key already used for route {binds['existing_route'].getvalue()}"
+            )
+        if result == 'IN_PROGRESS':
+            # Concurrent request
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Request is currently in progress"
+            )
+        return False # COMPLETED
+
+    def _completed_response(self, key: str, route: str, phash: str, stored_body: Optional[Dict]) -> Dict:
+        # response_body is a native JSON column, so it arrives as a dict with the row
+        if stored_body:
+            self._cache_completed(key, route, phash, json.dumps(stored_body))
+            return stored_body
+        return {}
+
+    def _execute_and_commit(self, cursor, sql: str, params: Any, many: bool = False):
+        # With autocommit the commit travels with the execute: one round trip instead of two
+        self.conn.autocommit = True
+        try:
+            if many:
+                cursor.executemany(sql, params)
+            else:
+                cursor.execute(sql, params)
+        finally:
+            self.conn.autocommit = False
 
     def check_and_lock(self, key: str, route: str, body: Dict, request_mode: str, execution_mode: str) -> Optional[Dict]:
         """
@@ -30,85 +136,24 @@ class IdempotencyManager:
         Raises HTTPException if conflict.
         """
         phash = self._hash_payload(body, request_mode, execution_mode)
+        cached = self._check_cache(key, route, phash)
+        if cached:
+            return cached
         
         cursor = self.conn.cursor()
         try:
-            # Enforce key uniqueness across routes
-            cursor.execute(
-                """
-                SELECT route_path, payload_hash, status, response_code, response_body
-                FROM idempotency_keys
-                WHERE idempotency_key = :1
-                """,
-                [key]
-            )
-            any_row = cursor.fetchone()
-            if any_row:
-                any_route, any_hash, any_status, any_code, any_body = any_row
-                if any_route != route or any_hash != phash:
-                    logger.warning(f"Idempotency conflict: Key {key} reused across routes or with different payload.")
-                    raise HTTPException(
-                        status_code=status.HTTP_409_CONFLICT,
-                        detail=f"Idempotency key already used for route {any_route}"
-                    )
-
-            cursor.execute(
-                """
-                SELECT payload_hash, status, response_code, response_body 
-                FROM idempotency_keys 
-                WHERE idempotency_key = :1 AND route_path = :2
-                """,
-                [key, route]
-            )
-            row = cursor.fetchone()
-            
-            if row:
-                stored_hash, stored_status, stored_code, stored_body_clob = row
-                
-                # Enforce payload match
-                if stored_hash != phash:
-                    logger.warning(f"Idempotency conflict: Key {key} reused with different payload hash.")
-                    raise HTTPException(
-                        status_code=status.HTTP_409_CONFLICT,
-                        detail="Idempotency key reused with different payload or mode"
-                    )
-                
-                if stored_status == 'COMPLETED':
-                    # Return cached response
-                    if stored_body_clob:
-                        return json.loads(stored_body_clob.read())
-                    return {}
-                elif stored_status == 'IN_PROGRESS':
-                    # Concurrent request
-                    raise HTTPException(
-                        status_code=status.HTTP_409_CONFLICT,
-                        detail="Request is currently in progress"
-                    )
-                # If FAILED or other, we treat as retryable and update to IN_PROGRESS below
-            
-            # Lock the key
-            if row:
-                cursor.execute(
-                    "UPDATE idempotency_keys SET status = 'IN_PROGRESS', updated_at = CURRENT_TIMESTAMP WHERE idempotency_key = :1 AND route_path = :2",
-                    [key, route]
-                )
-            else:
-                cursor.execute(
-                    """
-                    INSERT INTO idempotency_keys (idempotency_key, route_path, payload_hash, request_mode, execution_mode, status)
-                    VALUES (:1, :2, :3, :4, :5, 'IN_PROGRESS')
-                    """,
-                    [key, route, phash, request_mode, execution_mode]
-                )
-            
-            self.conn.commit()
-            return None # Proceed with execution
+            binds = self._lock_binds(cursor, key, route, phash, request_mode, execution_mode)
+            cursor.execute(idempotency_repo.CHECK_AND_LOCK_SQL, binds)
+            if self._resolve_outcome(key, phash, binds):
+                return None
+
+            # COMPLETED: return cached response
+            return self._completed_response(key, route, phash, binds["response_body"].getvalue())
             
         except oracledb.IntegrityError:
             self.conn.rollback()
             raise HTTPException(status_code=409, detail="Concurrent request detected")
         except HTTPException:
-            self.conn.rollback()
             raise
         except Exception as e:
             logger.error(f"Idempotency check failed: {e}")
@@ -117,27 +162,274 @@ class IdempotencyManager:
         finally:
             cursor.close()
 
-    def complete(self, key: str, route: str, response_body: Any, status_code: int = 200):
+    def complete(self, key: str, route: str, response_body: Any, status_code: int = 200,
+                 ops: Optional[List[Tuple[str, Any]]] = None):
+        """
+        Marks the request as completed, stores the response and commits.
+
+        Transactional mode: the UPDATE joins the caller's open transaction, so the
+        business change and the stored response commit together. Errors propagate
+        so the caller rolls back both.
+        Legacy mode: the caller's work is committed first, then the completion is
+        written and committed separately; completion errors are only logged.
+
+        ops are the (sql, binds) statements of the request's business change, executed
+        before the completion. In transactional mode with DB_PIPELINING (Oracle only) they
+        are sent with the completion UPDATE and the commit as one PL/SQL block (a single
+        round trip, see loan_api.db.plsql_batch); a failing statement is raised before the commit.
+        """
+        body_json = json.dumps(response_body)
+        if ops and self.transactional and DB_PIPELINING and DB_BACKEND == "oracle":
+            batch = plsql_batch(list(ops) + [idempotency_repo.complete(key, route, status_code, body_json)])
+            if batch is not None:
+                cursor = self.conn.cursor()
+                try:
+                    cursor.execute(*batch)
+                finally:
+                    cursor.close()
+                phash = self._locked_hashes.pop(key, None)
+                if phash:
+                    self._cache_completed(key, route, phash, body_json)
+                return
+
+        if ops:
+            cursor = self.conn.cursor()
+            try:
+                for sql, binds in ops:
+                    cursor.execute(sql, binds)
+            finally:
+                cursor.close()
+        if not self.transactional:
+            self.conn.commit()
+
+        cursor = self.conn.cursor()
+        try:
+            self._execute_and_commit(cursor, *idempotency_repo.complete(key, route, status_code, body_json))
+            phash = self._locked_hashes.pop(key, None)
+            if phash:
+                self._cache_completed(key, route, phash, body_json)
+        except Exception as e:
+            logger.error(f"Failed to complete idempotency for {key}: {e}")
+            self.conn.rollback()
+            if self.transactional:
+                raise
+        finally:
+            cursor.close()
+
+    def check_and_lock_many(self, items: List[Tuple[str, str, Dict]], request_mode: str,
+                            execution_mode: str) -> List[Union[None, Dict, HTTPException]]:
         """
-        Marks the request as completed and stores the response.
+        Bulk check_and_lock for (key, route, body) items, in one executemany round trip
+        for the new keys. Per item, returns None (locked, proceed), the stored response
+        (Dict) or the HTTPException check_and_lock would have raised.
+        Keys that already exist fall back to check_and_lock one by one.
         """
+        results: List[Union[None, Dict, HTTPException]] = [None] * len(items)
+        pending = []
+        for i, (key, route, body) in enumerate(items):
+            phash = self._hash_payload(body, request_mode, execution_mode)
+            try:
+                cached = self._check_cache(key, route, phash)
+            except HTTPException as e:
+                results[i] = e
+                continue
+            if cached:
+                results[i] = cached
+            else:
+                pending.append((i, key, route, body, phash))
+        if not pending:
+            return results
+
         cursor = self.conn.cursor()
         try:
-            body_json = json.dumps(response_body)
-            cursor.execute(
-                """
-                UPDATE idempotency_keys 
-                SET status = 'COMPLETED', 
-                    response_code = :1, 
-                    response_body = :2, 
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE idempotency_key = :3 AND route_path = :4
-                """,
-                [status_code, body_json, key, route]
+            cursor.executemany(
+                idempotency_repo.LOCK_INSERT_SQL,
+                [[key, route, phash, request_mode, execution_mode] for _, key, route, _, phash in pending],
+                batcherrors=True
             )
+            existing = {err.offset for err in cursor.getbatcherrors()}
             self.conn.commit()
         except Exception as e:
-            logger.error(f"Failed to complete idempotency for {key}: {e}")
+            logger.error(f"Bulk idempotency lock failed: {e}")
+            self.conn.rollback()
+            error = HTTPException(status_code=500, detail="Internal idempotency check error")
+            for i, *_ in pending:
+                results[i] = error
+            return results
+        finally:
+            cursor.close()
+
+        for offset, (i, key, route, body, phash) in enumerate(pending):
+            if offset not in existing:
+                self._locked_hashes[key] = phash
+                continue
+            try:
+                results[i] = self.check_and_lock(key, route, body, request_mode, execution_mode)
+            except HTTPException as e:
+                results[i] = e
+        return results
+
+    def complete_many(self, entries: List[Tuple[str, str, Any]], status_code: int = 200):
+        """Bulk complete() for (key, route, response_body) entries; same transaction rules."""
+        if not entries:
+            return
+        if not self.transactional:
+            self.conn.commit()
+
+        bodies = [json.dumps(response_body) for _, _, response_body in entries]
+        cursor = self.conn.cursor()
+        try:
+            self._execute_and_commit(
+                cursor,
+                idempotency_repo.COMPLETE_SQL,
+                [[status_code, body_json, key, route] for (key, route, _), body_json in zip(entries, bodies)],
+                many=True
+            )
+            for (key, route, _), body_json in zip(entries, bodies):
+                phash = self._locked_hashes.pop(key, None)
+                if phash:
+                    self._cache_completed(key, route, phash, body_json)
+        except Exception as e:
+            logger.error(f"Failed to complete {len(entries)} idempotency keys: {e}")
             self.conn.rollback()
+            if self.transactional:
+                raise
         finally:
             cursor.close()
+
+    def fail_many(self, entries: List[Tuple[str, str]]):
+        """
+        Marks locked (key, route) entries FAILED and commits, so a retry re-locks them
+        right away instead of waiting for the IN_PROGRESS lease to expire.
+        """
+        if not entries:
+            return
+        cursor = self.conn.cursor()
+        try:
+            cursor.executemany(idempotency_repo.FAIL_SQL, [list(entry) for entry in entries])
+            self.conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to release {len(entries)} idempotency keys: {e}")
+            self.conn.rollback()
+        finally:
+            cursor.close()
+        for key, _ in entries:
+            self._locked_hashes.pop(key, None)
+
+    def fail(self, key: str, route: str):
+        """
+        Ends a request that failed after check_and_lock: rolls back the caller's open
+        transaction and marks the key FAILED (committed), so a retry re-locks it right
+        away instead of getting 409 until the IN_PROGRESS lease expires. Errors are only
+        logged, since the caller is about to raise the request's own error.
+        """
+        self._locked_hashes.pop(key, None)
+        try:
+            self.conn.rollback()
+            cursor = self.conn.cursor()
+            try:
+                self._execute_and_commit(cursor, *idempotency_repo.fail(key, route))
+            finally:
+                cursor.close()
+        except Exception as e:
+            logger.error(f"Failed to release idempotency key {key}: {e}")
+
+class AsyncIdempotencyManager(IdempotencyManager):
+    """
+    IdempotencyManager for python-oracledb AsyncConnection (see loan_api.main_async).
+    Same SQL, cache and 409 semantics; only the DB calls are awaited.
+    """
+
+    async def check_and_lock(self, key: str, route: str, body: Dict, request_mode: str, execution_mode: str) -> Optional[Dict]:
+        phash = self._hash_payload(body, request_mode, execution_mode)
+        cached = self._check_cache(key, route, phash)
+        if cached:
+            return cached
+
+        cursor = self.conn.cursor()
+        try:
+            binds = self._lock_binds(cursor, key, route, phash, request_mode, execution_mode)
+            await cursor.execute(idempotency_repo.CHECK_AND_LOCK_SQL, binds)
+            if self._resolve_outcome(key, phash, binds):
+                return None
+
+            return self._completed_response(key, route, phash, binds["response_body"].getvalue())
+
+        except oracledb.IntegrityError:
+            await self.conn.rollback()
+            raise HTTPException(status_code=409, detail="Concurrent request detected")
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Idempotency check failed: {e}")
+            await self.conn.rollback()
+            raise HTTPException(status_code=500, detail="Internal idempotency check error")
+        finally:
+            cursor.close()
+
+    async def complete(self, key: str, route: str, response_body: Any, status_code: int = 200,
+                       ops: Optional[List[Tuple[str, Any]]] = None):
+        """
+        ops are the (sql, binds) statements of the request's business change, executed
+        before the completion. In transactional mode with DB_PIPELINING they are sent
+        with the completion UPDATE and the commit as one pipeline (a single round trip);
+        a failing statement stops the pipeline before the commit and is raised.
+        """
+        body_json = json.dumps(response_body)
+        if self.transactional and DB_PIPELINING:
+            pipeline = oracledb.create_pipeline()
+            for sql, binds in ops or ():
+                pipeline.add_execute(sql, binds)
+            pipeline.add_execute(*idempotency_repo.complete(key, route, status_code, body_json))
+            pipeline.add_commit()
+            await self.conn.run_pipeline(pipeline)
+            phash = self._locked_hashes.pop(key, None)
+            if phash:
+                self._cache_completed(key, route, phash, body_json)
+            return
+
+        if ops:
+            cursor = self.conn.cursor()
+            try:
+                for sql, binds in ops:
+                    await cursor.execute(sql, binds)
+            finally:
+                cursor.close()
+        if not self.transactional:
+            await self.conn.commit()
+
+        cursor = self.conn.cursor()
+        try:
+            # Commit travels with the execute (see IdempotencyManager._execute_and_commit)
+            self.conn.autocommit = True
+            try:
+                await cursor.execute(*idempotency_repo.complete(key, route, status_code, body_json))
+            finally:
+                self.conn.autocommit = False
+            phash = self._locked_hashes.pop(key, None)
+            if phash:
+                self._cache_completed(key, route, phash, body_json)
+        except Exception as e:
+            logger.error(f"Failed to complete idempotency for {key}: {e}")
+            await self.conn.rollback()
+            if self.transactional:
+                raise
+        finally:
+            cursor.close()
+
+    async def fail(self, key: str, route: str):
+        self._locked_hashes.pop(key, None)
+        try:
+            await self.conn.rollback()
+            cursor = self.conn.cursor()
+            try:
+                # Commit travels with the execute (see IdempotencyManager._execute_and_commit)
+                self.conn.autocommit = True
+                try:
+                    await cursor.execute(*idempotency_repo.fail(key, route))
+                finally:
+                    self.conn.autocommit = False
+            finally:
+                cursor.close()
+        except Exception as e:
+            logger.error(f"Failed to release idempotency key {key}: {e}")
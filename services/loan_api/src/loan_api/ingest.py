@@ -0,0 +1,284 @@
+"""
+Bulk ingestion of KYC / fraud / credit-score results from vendor files.
+
+Files are read record by record (CSV with a header row, or NDJSON) and applied in
+array-DML batches: one executemany patching decision_data and one audit insert
+per batch, committed per batch. Memory use is bounded by the batch size and the
+number of errors kept, not by the file size.
+
+CLI:
+    python -m loan_api.ingest kyc results.csv
+    python -m loan_api.ingest credit-score scores.ndjson --batch-size 5000
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple, Type, Union
+
+from anyio import from_thread
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from .audit import audit_record, audit_writer, buffered as audit_buffered
+from .db import get_write_connection, release_connection
+from .models import CreditScore, FraudResult, KYCResult
+from .snapshots import invalidate_application
+from .storage import application_repo, audit_repo
+
+logger = logging.getLogger("loan_api.ingest")
+
+INGEST_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", "1000"))
+INGEST_MAX_ERRORS = int(os.environ.get("INGEST_MAX_ERRORS", "1000"))
+
+class CheckSpec(NamedTuple):
+    model: Type[BaseModel]
+    field: str   # decision_data field
+    action: str  # audit action, same as the single-result route
+    value: Callable[[Any], Any]
+    details: Callable[[Any], Dict]
+
+CHECKS = {
+    "kyc": CheckSpec(KYCResult, "kyc_result", "KYC_UPDATED", lambda r: r.model_dump(), lambda r: r.model_dump()),
+    "fraud": CheckSpec(FraudResult, "fraud_result", "FRAUD_CHECK_UPDATED", lambda r: r.model_dump(), lambda r: r.model_dump()),
+    "credit-score": CheckSpec(CreditScore, "credit_score", "CREDIT_SCORE_UPDATED", lambda r: r.score, lambda r: {"score": r.score}),
+}
+
+# Input is decoded with errors="replace" (iter_lines, open_text): bytes that are not UTF-8
+# become U+FFFD, and records containing it are reported as malformed instead of aborting the file
+UNDECODABLE = "\ufffd"
+_NOT_UTF8 = "Line is not valid UTF-8"
+
+class RecordParser:
+    """Turns the lines of a CSV (first record is the header) or NDJSON file into dicts."""
+
+    def __init__(self, fmt: str):
+        if fmt not in ("csv", "ndjson"):
+            raise ValueError(f"Unsupported format '{fmt}', expected csv or ndjson")
+        self.fmt = fmt
+
+    def records(self, lines: Iterable[str]) -> Iterator[Tuple[int, Union[Dict, ValueError]]]:
+        """
+        Yields (line number, record), or (line number, ValueError) for a malformed record;
+        blank lines and the CSV header are skipped. Lines keep their line endings: the CSV
+        is read by a single csv.reader, so quoted fields may span lines, and the line number
+        is the one the record starts on.
+        """
+        if self.fmt == "ndjson":
+            for line_no, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                if UNDECODABLE in line:
+                    yield line_no, ValueError(_NOT_UTF8)
+                    continue
+                try:
+                    record = json.loads(line)
+                    if not isinstance(record, dict):
+                        raise ValueError("NDJSON line is not an object")
+                except ValueError as e:
+                    yield line_no, e
+                    continue
+                yield line_no, record
+            return
+
+        reader = csv.reader(lines)
+        header: Optional[List[str]] = None
+        while True:
+            line_no = reader.line_num + 1
+            try:
+                values = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield line_no, ValueError(str(e))
+                continue
+            if not values or (len(values) == 1 and not values[0].strip()):
+                continue
+            if any(UNDECODABLE in v for v in values):
+                yield line_no, ValueError(_NOT_UTF8)
+                continue
+            if header is None:
+                header = [h.strip() for h in values]
+            elif len(values) != len(header):
+                yield line_no, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            else:
+                yield line_no, dict(zip(header, values))
+
+class Ingestor:
+    """
+    Accumulates validated rows for one check type and applies them in batches.
+    Callers add() parsed records and call flush() whenever add() returns True, and once at the end.
+    """
+
+    def __init__(self, conn, check: str, batch_size: int = INGEST_BATCH_SIZE, max_errors: int = INGEST_MAX_ERRORS):
+        if check not in CHECKS:
+            raise ValueError(f"Unknown check '{check}', expected one of {sorted(CHECKS)}")
+        self.conn = conn
+        self.check = check
+        self.spec = CHECKS[check]
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self._batch: List[Tuple[int, str, Any, Dict]] = [] # (line, application_id, value, audit details)
+        self.rows = 0
+        self.applied = 0
+        self.failed = 0
+        self.errors: List[Dict] = []
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+
+    def error(self, line: int, app_id: Optional[str], message: Any):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "application_id": app_id, "error": message})
+
+    def malformed(self, line: int, error: Exception):
+        self.rows += 1
+        self.error(line, None, f"Malformed line: {error}")
+
+    def add(self, line: int, record: Dict) -> bool:
+        self.rows += 1
+        app_id = record.get("application_id")
+        if not app_id:
+            self.error(line, None, "Missing application_id")
+            return False
+        try:
+            result = self.spec.model.model_validate({k: v for k, v in record.items() if k != "application_id"})
+        except ValidationError as e:
+            self.error(line, app_id, e.errors(include_url=False, include_input=False))
+            return False
+        self._batch.append((line, app_id, self.spec.value(result), self.spec.details(result)))
+        return len(self._batch) >= self.batch_size
+
+    def flush(self):
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        start = time.perf_counter()
+        cursor = self.conn.cursor()
+        try:
+            cursor.executemany(
+                application_repo.PATCH_DECISION_DATA_SQL[self.spec.field],
+                [[json.dumps(value), app_id] for _, app_id, value, _ in batch],
+                batcherrors=True,
+                arraydmlrowcounts=True
+            )
+            batch_errors = {err.offset: err.message for err in cursor.getbatcherrors()}
+            rowcounts = cursor.getarraydmlrowcounts()
+            applied, rejected = [], []
+            for n, (line, app_id, _, details) in enumerate(batch):
+                if n in batch_errors:
+                    rejected.append((line, app_id, batch_errors[n]))
+                elif not rowcounts[n]:
+                    rejected.append((line, app_id, "Application not found"))
+                else:
+                    applied.append(audit_record(app_id, self.spec.action, details))
+
+            deferred = audit_buffered()
+            if applied and not deferred:
+                cursor.executemany(audit_repo.INSERT_AUDIT_SQL, applied)
+            self.conn.commit()
+            for app_id, _, _ in applied:
+                invalidate_application(app_id)
+            if deferred:
+                for record in applied:
+                    audit_writer.submit(record)
+            self.applied += len(applied)
+            for line, app_id, message in rejected:
+                self.error(line, app_id, message)
+        except Exception as e:
+            logger.error(f"Ingest batch of {len(batch)} {self.check} rows failed: {e}")
+            self.conn.rollback()
+            for line, app_id, _, _ in batch:
+                self.error(line, app_id, str(e))
+        finally:
+            cursor.close()
+            self.db_seconds += time.perf_counter() - start
+
+    def summary(self) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "check": self.check,
+            "rows": self.rows,
+            "applied": self.applied,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "db_ms": round(self.db_seconds * 1000, 3),
+            "rows_per_sec": round(self.rows / elapsed, 1) if elapsed > 0 else None
+        }
+
+def ingest_lines(conn, check: str, fmt: str, lines: Iterable[str], batch_size: int = INGEST_BATCH_SIZE) -> Dict:
+    """Applies an iterable of file lines (e.g. an open file) and returns the summary."""
+    ingestor = Ingestor(conn, check, batch_size)
+    for line_no, record in RecordParser(fmt).records(lines):
+        if isinstance(record, ValueError):
+            ingestor.malformed(line_no, record)
+        elif ingestor.add(line_no, record):
+            ingestor.flush()
+    ingestor.flush()
+    return ingestor.summary()
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Splits a byte stream into decoded lines, keeping their line endings, without buffering the whole body."""
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8", errors="replace") + "\n"
+    if pending:
+        yield pending.decode("utf-8", errors="replace")
+
+def open_text(path: str) -> TextIO:
+    """A CLI input file, or stdin for '-', decoded like iter_lines."""
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace", newline="")
+    return open(path, encoding="utf-8", errors="replace", newline="")
+
+def _pull(chunks: AsyncIterator[bytes]) -> Iterator[bytes]:
+    # Runs on a threadpool thread and fetches each chunk from the event loop
+    while True:
+        try:
+            yield from_thread.run(anext, chunks)
+        except StopAsyncIteration:
+            return
+
+async def ingest_stream(conn, check: str, fmt: str, chunks: AsyncIterator[bytes], batch_size: int = INGEST_BATCH_SIZE) -> Dict:
+    """
+    ingest_lines for an HTTP request body (e.g. Request.stream()). Parsing and the batches
+    run on one threadpool thread, which pulls the body from the event loop as it streams in.
+    """
+    return await run_in_threadpool(ingest_lines, conn, check, fmt, iter_lines(_pull(chunks)), batch_size)
+
+def format_for(path: str, content_type: Optional[str] = None) -> str:
+    if content_type:
+        return "csv" if "csv" in content_type else "ndjson"
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Bulk-apply KYC / fraud / credit-score results from a CSV or NDJSON file")
+    parser.add_argument("check", choices=sorted(CHECKS))
+    parser.add_argument("path", help="CSV (with header) or NDJSON file, '-' for stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or format_for(args.path)
+    conn = get_write_connection()
+    try:
+        with open_text(args.path) as f:
+            summary = ingest_lines(conn, args.check, fmt, f, args.batch_size)
+    finally:
+        release_connection(conn)
+
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
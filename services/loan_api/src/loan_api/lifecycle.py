@@ -0,0 +1,50 @@
+"""
+Application state machine for the decision, offer and booking routes.
+
+    NEW --execute--> APPROVE | REJECT --accept offer (APPROVE only)--> OFFER_ACCEPTED --book--> BOOKED
+
+A decision may be (re)executed until an offer is accepted. Offer acceptance and
+booking are conditional updates (UPDATE ... WHERE id = :app_id AND status IN
+(...)), sent together with their audit row (and the bookings row) as one
+statement (ApplicationRepository.ACCEPT_OFFER_SQL / BOOK_APPLICATION_SQL in
+loan_api.storage): one round trip, no JSON column transferred. Only when nothing
+was updated is the current status read, to raise ORA-20409 (wrong state, HTTP
+409) or ORA-20404 (no such application, HTTP 404).
+"""
+from typing import Optional
+
+import oracledb
+from fastapi import HTTPException
+
+APP_NOT_FOUND_ERROR = 20404
+INVALID_TRANSITION_ERROR = 20409
+
+DECISION_STATUSES = ("APPROVE", "REJECT")
+# Statuses the EXECUTE step may overwrite with a decision
+DECIDABLE_STATUSES = ("NEW",) + DECISION_STATUSES
+
+# Target status -> statuses it may be entered from
+TRANSITIONS = {
+    "OFFER_ACCEPTED": ("APPROVE",),
+    "BOOKED": ("OFFER_ACCEPTED",),
+}
+
+def error_code(e: Exception) -> Optional[int]:
+    err = e.args[0] if isinstance(e, oracledb.DatabaseError) and e.args else None
+    return getattr(err, "code", None)
+
+def error_message(e: Exception) -> str:
+    # "ORA-20409: Application is NEW, expected APPROVE\nORA-06512: ..." -> "Application is NEW, expected APPROVE"
+    message = getattr(e.args[0], "message", str(e))
+    return message.splitlines()[0].split(": ", 1)[-1]
+
+def write_error(e: Exception) -> HTTPException:
+    """HTTP error for a failed write: 404 / 409 for the errors raised by the guarded statements, else 500."""
+    if isinstance(e, HTTPException):
+        return e
+    code = error_code(e)
+    if code == APP_NOT_FOUND_ERROR:
+        return HTTPException(status_code=404, detail="Application not found")
+    if code == INVALID_TRANSITION_ERROR:
+        return HTTPException(status_code=409, detail=error_message(e))
+    return HTTPException(status_code=500, detail=str(e))
@@ -1,16 +1,32 @@
-from fastapi import FastAPI, Header, HTTPException, Depends, Request, Body, Path
+from fastapi import FastAPI, Header, HTTPException, Depends, Request, Body, Path, Query
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from contextlib import asynccontextmanager
-from typing import Any, Dict, List, Optional
-import uuid
+from typing import Any, Dict, List, Optional, Union
+import os
 import json
 import logging
 import datetime
 
-from .db import init_db, get_connection, get_write_connection, get_read_connection, close_db, release_connection
-from .models import ApplicationCreate, ApplicationResponse, DecisionResponse, KYCResult, FraudResult, CreditScore, BookingCreate, DecisionPlan, DecisionPlanRequest
+from .db import init_db, get_connection, get_write_connection, close_db, release_connection, load_json
+from .models import ApplicationCreate, ApplicationResponse, BatchApplicationItem, BatchBookingItem, DecisionResponse, KYCResult, FraudResult, CreditScore, BookingCreate, DecisionPlan, DecisionPlanRequest, DecisionPlanReference
 from .idempotency import IdempotencyManager
-from .planning import create_plan, calculate_inputs_hash
-from .decision import execute_decision_workflow
+from .planning import create_plan, calculate_inputs_hash, shutdown_scenario_pool
+from .decision import execute_decision_workflow, decision_cache, decision_persister
+from .routing import CONSISTENCY_HEADER, read_router
+from .snapshots import get_snapshot, invalidate_application, snapshot_response
+from .common import (
+    derive_id, get_idempotency_key, get_metrics, stamp_consistency_token, count_round_trips,
+    accept_offer_op, audit_op, book_op, check_ops,
+    AUDIT_PAGE_DEFAULT_LIMIT, AUDIT_PAGE_MAX_LIMIT, AUDIT_STREAM_ARRAYSIZE,
+    decode_audit_cursor, encode_audit_cursor
+)
+from .ingest import CHECKS as INGEST_CHECKS, format_for, ingest_stream
+from .audit import AUDIT_WRITER_MODE, AuditRecord, audit_record, audit_writer, buffered as audit_buffered
+from .lifecycle import DECIDABLE_STATUSES, write_error
+from .bookings import book_many
+from .storage import application_repo, audit_repo, plan_repo
 
 from workflows.wayflow import WorkflowContext
 
@@ -20,10 +36,18 @@ logger = logging.getLogger("loan_api")
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    if AUDIT_WRITER_MODE == "buffered":
+        audit_writer.start()
+    read_router.start()
     yield
+    read_router.stop()
+    audit_writer.stop()
+    shutdown_scenario_pool()
     close_db()
 
 app = FastAPI(lifespan=lifespan, title="Loan Origination API")
+app.middleware("http")(stamp_consistency_token)
+app.middleware("http")(count_round_trips)
 
 # Dependencies
 def get_db_conn():
@@ -41,27 +65,28 @@ def get_write_db_conn():
     finally:
         release_connection(conn)
 
-def get_read_db_conn():
-    conn = get_read_connection()
+def get_read_db_conn(consistency_token: Optional[str] = Header(None, alias=CONSISTENCY_HEADER)):
+    conn = read_router.acquire_read(consistency_token)
     try:
         yield conn
     finally:
         release_connection(conn)
 
-def get_idempotency_key(idempotency_key: str = Header(..., alias="Idempotency-Key")):
-    return idempotency_key
+APPLICATION_BATCH_MAX_ITEMS = int(os.environ.get("APPLICATION_BATCH_MAX_ITEMS", "5000"))
+BOOKING_BATCH_MAX_ITEMS = int(os.environ.get("BOOKING_BATCH_MAX_ITEMS", "5000"))
 
 # Helpers
-def derive_id(key: str) -> str:
-    return str(uuid.uuid5(uuid.NAMESPACE_OID, key))
-
-def log_audit(conn, app_id: str, action: str, details: Dict):
+def log_audit(conn, app_id: str, action: str, details: Dict, durable: bool = True) -> Optional[AuditRecord]:
+    """
+    Inserts the audit row in the caller's transaction.
+    With durable=False and AUDIT_WRITER_MODE=buffered nothing is written here; the record is
+    returned and must be handed to audit_writer.submit() once the transaction has committed.
+    """
+    if not durable and audit_buffered():
+        return audit_record(app_id, action, details)
     cursor = conn.cursor()
     try:
-        cursor.execute(
-            "INSERT INTO audit_logs (application_id, action, details) VALUES (:1, :2, :3)",
-            [app_id, action, json.dumps(details)]
-        )
+        cursor.execute(*audit_repo.insert(app_id, action, json.dumps(details)))
     except Exception as e:
         logger.error(f"Failed to write audit log: {e}")
         raise e
@@ -70,14 +95,14 @@ def log_audit(conn, app_id: str, action: str, details: Dict):
 
 def fetch_application(conn, app_id: str) -> Dict:
     cursor = conn.cursor()
-    cursor.execute("SELECT id, status, applicant_data, decision_data, created_at FROM applications WHERE id = :1", [app_id])
+    cursor.execute(*application_repo.select(app_id))
     row = cursor.fetchone()
     cursor.close()
     if not row:
         raise HTTPException(status_code=404, detail="Application not found")
     
-    app_data = json.loads(row[2].read()) if row[2] else {}
-    dec_data = json.loads(row[3].read()) if row[3] else {}
+    app_data = load_json(row[2])
+    dec_data = load_json(row[3])
     
     return {
         "id": row[0],
@@ -87,37 +112,49 @@ def fetch_application(conn, app_id: str) -> Dict:
         "created_at": str(row[4])
     }
 
-def update_app_data(conn, app_id: str, field: str, value: Dict):
-    current = fetch_application(conn, app_id)
-    dec_data = current["decision_data"]
-    dec_data[field] = value
-    
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE applications SET decision_data = :1, updated_at = CURRENT_TIMESTAMP WHERE id = :2",
-        [json.dumps(dec_data), app_id]
-    )
-    conn.commit()
-    cursor.close()
-    return dec_data
+def audit_row(r) -> Dict:
+    return {
+        "id": r[0],
+        "action": r[1],
+        "details": load_json(r[2]),
+        "timestamp": str(r[3])
+    }
 
-def update_app_status(conn, app_id: str, status: str):
+def audit_page(rows: List, limit: int) -> Dict:
+    # rows were fetched with limit + 1 so a following page can be detected without another query
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [audit_row(r) for r in rows],
+        "next_cursor": encode_audit_cursor(rows[-1][3], rows[-1][0]) if has_more else None
+    }
+
+def load_plan_summary(conn, plan_id: str, app_id: str) -> Dict:
+    # Plan fields needed to execute by reference, without transferring plan_json
     cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE applications SET status = :1, updated_at = CURRENT_TIMESTAMP WHERE id = :2",
-        [status, app_id]
-    )
-    conn.commit()
+    cursor.execute(*plan_repo.select_summary(plan_id))
+    row = cursor.fetchone()
     cursor.close()
+    if not row or row[0] != app_id:
+        raise HTTPException(status_code=404, detail="Decision plan not found for this application")
+    return {
+        "plan_id": plan_id,
+        "workspace_id": row[1],
+        "inputs_hash": row[2],
+        "status": row[3],
+        "recommended_decision": row[4],
+        "scenarios_count": int(row[5] or 0)
+    }
 
 def mark_plan_executed(conn, plan_id: str):
+    # Conditional transition: only a CREATED plan can be executed. The row lock also
+    # serializes concurrent executes of the same plan under different idempotency keys.
     cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE decision_plans SET status = 'EXECUTED', executed_at = CURRENT_TIMESTAMP WHERE plan_id = :1",
-        [plan_id]
-    )
-    conn.commit()
+    cursor.execute(*plan_repo.mark_executed(plan_id))
+    updated = cursor.rowcount
     cursor.close()
+    if not updated:
+        raise HTTPException(status_code=409, detail="Decision plan is not executable (already EXECUTED or SUPERSEDED)")
 
 # Routes
 
@@ -137,15 +174,10 @@ def create_application(
     try:
         app_id = derive_id(idempotency_key)
         
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO applications (id, status, applicant_data, decision_data) VALUES (:1, 'NEW', :2, '{}')",
-            [app_id, json.dumps(app_data.model_dump())]
-        )
-        cursor.close()
-        
-        log_audit(conn, app_id, "APPLICATION_CREATED", {"source": "API"})
-        conn.commit()
+        ops = [
+            application_repo.insert(app_id, json.dumps(app_data.model_dump())),
+            audit_op(app_id, "APPLICATION_CREATED", {"source": "API"})
+        ]
         
         response = {
             "id": app_id,
@@ -155,16 +187,166 @@ def create_application(
             "created_at": str(datetime.datetime.now())
         }
         
-        idem.complete(idempotency_key, route, response)
+        idem.complete(idempotency_key, route, response, ops=ops)
         return response
     except Exception as e:
         logger.error(f"Error creating app: {e}")
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        idem.fail(idempotency_key, route)
+        raise write_error(e)
+
+def parse_batch_body(raw: bytes, content_type: str) -> List[Any]:
+    """A JSON array, or NDJSON (one item per line) when the content type says so."""
+    try:
+        if "ndjson" in content_type:
+            return [json.loads(line) for line in raw.splitlines() if line.strip()]
+        items = json.loads(raw)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Batch body must be a JSON array")
+    return items
+
+def batch_error(index: int, key: Optional[str], status_code: int, error: Any) -> Dict:
+    return {"index": index, "idempotency_key": key, "status_code": status_code, "error": error}
+
+def create_applications_bulk(raw_items: List[Any]) -> Dict:
+    """
+    Bulk equivalent of create_application: items are locked, inserted, audited and
+    completed with one executemany each, and committed together.
+    Items share the idempotency namespace of POST /applications, so a key may be
+    retried through either route.
+    """
+    route = "/applications"
+    results: List[Optional[Dict]] = [None] * len(raw_items)
+    valid = []
+    seen = set()
+    for i, raw in enumerate(raw_items):
+        try:
+            item = BatchApplicationItem.model_validate(raw)
+        except ValidationError as e:
+            results[i] = batch_error(i, raw.get("idempotency_key") if isinstance(raw, dict) else None, 422, e.errors(include_url=False))
+            continue
+        if item.idempotency_key in seen:
+            results[i] = batch_error(i, item.idempotency_key, 409, "Duplicate idempotency key in batch")
+            continue
+        seen.add(item.idempotency_key)
+        valid.append((i, item.idempotency_key, item.application.model_dump()))
+
+    conn = get_write_connection()
+    try:
+        idem = IdempotencyManager(conn)
+        locks = idem.check_and_lock_many([(key, route, body) for _, key, body in valid], "POST", "EXECUTE")
+
+        to_create = []
+        for (i, key, body), lock in zip(valid, locks):
+            if isinstance(lock, HTTPException):
+                results[i] = batch_error(i, key, lock.status_code, lock.detail)
+            elif lock:
+                results[i] = {"index": i, "idempotency_key": key, "status_code": 200, "replayed": True, "response": lock}
+            else:
+                to_create.append((i, key, body, derive_id(key)))
+
+        if to_create:
+            try:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    application_repo.INSERT_APPLICATION_SQL,
+                    [[app_id, json.dumps(body)] for _, _, body, app_id in to_create],
+                    batcherrors=True
+                )
+                insert_errors = {err.offset: err.message for err in cursor.getbatcherrors()}
+                created = [entry for n, entry in enumerate(to_create) if n not in insert_errors]
+                if created:
+                    cursor.executemany(
+                        audit_repo.INSERT_AUDIT_SQL,
+                        [[app_id, "APPLICATION_CREATED", json.dumps({"source": "API_BATCH"})] for *_, app_id in created]
+                    )
+                cursor.close()
+
+                now = str(datetime.datetime.now())
+                responses = [
+                    {"id": app_id, "status": "NEW", "applicant_data": body, "decision_data": {}, "created_at": now}
+                    for _, _, body, app_id in created
+                ]
+                idem.complete_many([(key, route, resp) for (_, key, _, _), resp in zip(created, responses)])
+                for (i, key, _, _), resp in zip(created, responses):
+                    results[i] = {"index": i, "idempotency_key": key, "status_code": 200, "replayed": False, "response": resp}
+
+                failed = [to_create[n] for n in insert_errors]
+                idem.fail_many([(key, route) for _, key, _, _ in failed])
+                for n, (i, key, _, _) in zip(insert_errors, failed):
+                    results[i] = batch_error(i, key, 500, insert_errors[n])
+            except Exception as e:
+                logger.error(f"Error creating application batch: {e}")
+                conn.rollback()
+                idem.fail_many([(key, route) for _, key, _, _ in to_create])
+                for i, key, _, _ in to_create:
+                    results[i] = batch_error(i, key, 500, str(e))
+    finally:
+        release_connection(conn)
+
+    return {
+        "created": sum(1 for r in results if r.get("replayed") is False),
+        "replayed": sum(1 for r in results if r.get("replayed")),
+        "failed": sum(1 for r in results if "error" in r),
+        "results": results
+    }
+
+@app.post("/applications:batch")
+async def create_applications_batch(request: Request):
+    """
+    Bulk intake. Body: JSON array, or NDJSON with Content-Type application/x-ndjson, of
+    {"idempotency_key": ..., "application": ApplicationCreate}. Returns per-item results
+    in input order; one failing item does not fail the others.
+    """
+    items = parse_batch_body(await request.body(), request.headers.get("content-type", ""))
+    if len(items) > APPLICATION_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {APPLICATION_BATCH_MAX_ITEMS} items")
+    return await run_in_threadpool(create_applications_bulk, items)
+
+@app.post("/ingest/{check}")
+async def ingest_results(
+    check: str,
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    idempotency_key: str = Depends(get_idempotency_key)
+):
+    """
+    Bulk-applies vendor results (check: kyc, fraud or credit-score) from a CSV (with header)
+    or NDJSON body; rows carry application_id plus the fields of the single-result route.
+    The body is streamed and applied in batches; returns counts and per-line errors.
+    The Idempotency-Key covers the upload (check and format), not the file contents, which
+    are only read while the batches are applied: send one key per file.
+    """
+    if check not in INGEST_CHECKS:
+        raise HTTPException(status_code=404, detail=f"Unknown check '{check}'")
+    fmt = format or format_for("", request.headers.get("content-type", "application/x-ndjson"))
+    conn = await run_in_threadpool(get_write_connection)
+    try:
+        idem = IdempotencyManager(conn)
+        route = request.url.path
+        cached = await run_in_threadpool(idem.check_and_lock, idempotency_key, route, {"format": fmt}, "POST", "EXECUTE")
+        if cached: return cached
+
+        try:
+            summary = await ingest_stream(conn, check, fmt, request.stream())
+            # Batches are committed as they go; this only stores the summary for replays
+            await run_in_threadpool(idem.complete, idempotency_key, route, summary)
+            return summary
+        except Exception as e:
+            await run_in_threadpool(idem.fail, idempotency_key, route)
+            raise write_error(e)
+    finally:
+        await run_in_threadpool(release_connection, conn)
 
 @app.get("/applications/{id}", response_model=ApplicationResponse)
-def get_application(id: str, conn = Depends(get_read_db_conn)):
-    return fetch_application(conn, id)
+def get_application(
+    id: str,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    conn = Depends(get_read_db_conn)
+):
+    # Served from the snapshot cache; 304 when the client's ETag is still current
+    return snapshot_response(get_snapshot(conn, id, if_none_match), if_none_match)
 
 @app.post("/applications/{id}/kyc")
 def add_kyc_result(
@@ -180,16 +362,18 @@ def add_kyc_result(
     if cached: return cached
     
     try:
-        update_app_data(conn, id, "kyc_result", result.model_dump())
-        log_audit(conn, id, "KYC_UPDATED", result.model_dump())
-        conn.commit() 
-        
+        ops, deferred = check_ops(id, "kyc_result", result.model_dump(), "KYC_UPDATED", result.model_dump())
+
         resp = {"status": "Updated", "kyc_result": result.model_dump()}
-        idem.complete(idempotency_key, route, resp)
-        return resp
+        idem.complete(idempotency_key, route, resp, ops=ops)
     except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        idem.fail(idempotency_key, route)
+        raise write_error(e)
+    # Only once committed (invalidating earlier lets a concurrent read cache the old row again),
+    # and outside the try: the key is COMPLETED, a failure here must not fail() it
+    invalidate_application(id)
+    audit_writer.submit(deferred)
+    return resp
 
 @app.post("/applications/{id}/fraud")
 def add_fraud_result(
@@ -205,16 +389,16 @@ def add_fraud_result(
     if cached: return cached
     
     try:
-        update_app_data(conn, id, "fraud_result", result.model_dump())
-        log_audit(conn, id, "FRAUD_CHECK_UPDATED", result.model_dump())
-        conn.commit()
-        
+        ops, deferred = check_ops(id, "fraud_result", result.model_dump(), "FRAUD_CHECK_UPDATED", result.model_dump())
+
         resp = {"status": "Updated", "fraud_result": result.model_dump()}
-        idem.complete(idempotency_key, route, resp)
-        return resp
+        idem.complete(idempotency_key, route, resp, ops=ops)
     except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        idem.fail(idempotency_key, route)
+        raise write_error(e)
+    invalidate_application(id)
+    audit_writer.submit(deferred)
+    return resp
 
 @app.post("/applications/{id}/credit-score")
 def add_credit_score(
@@ -230,16 +414,16 @@ def add_credit_score(
     if cached: return cached
     
     try:
-        update_app_data(conn, id, "credit_score", result.score)
-        log_audit(conn, id, "CREDIT_SCORE_UPDATED", {"score": result.score})
-        conn.commit()
-        
+        ops, deferred = check_ops(id, "credit_score", result.score, "CREDIT_SCORE_UPDATED", {"score": result.score})
+
         resp = {"status": "Updated", "credit_score": result.score}
-        idem.complete(idempotency_key, route, resp)
-        return resp
+        idem.complete(idempotency_key, route, resp, ops=ops)
     except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        idem.fail(idempotency_key, route)
+        raise write_error(e)
+    invalidate_application(id)
+    audit_writer.submit(deferred)
+    return resp
 
 @app.post("/applications/{id}/decision/plan", response_model=DecisionPlan)
 def decision_plan_endpoint(
@@ -265,24 +449,30 @@ def decision_plan_endpoint(
         # Inject mock flag
         app_data["decision_data"]["mock_agent"] = x_mock_agent
         
-        plan = create_plan(conn, id, app_data, plan_request, idempotency_key)
+        cache_writes = []
+        plan = create_plan(conn, id, app_data, plan_request, idempotency_key, cache_writes)
         
         idem.complete(idempotency_key, route, plan.model_dump())
-        return plan
     except Exception as e:
         logger.error(f"Plan creation failed: {e}")
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        idem.fail(idempotency_key, route)
+        raise write_error(e)
+    decision_cache.save(conn, cache_writes)
+    return plan
 
 @app.post("/applications/{id}/decision/execute")
 def decision_execute_endpoint(
     id: str,
-    decision_plan: DecisionPlan,
+    decision_plan: Union[DecisionPlan, DecisionPlanReference],
     request: Request,
     idempotency_key: str = Depends(get_idempotency_key),
     x_mock_agent: Optional[bool] = Header(None, alias="X-Mock-Agent"),
     conn = Depends(get_write_db_conn)
 ):
+    """
+    Executes a plan, sent either in full (as returned by /decision/plan) or by
+    reference ({"plan_id": ...}), in which case the stored plan is used.
+    """
     idem = IdempotencyManager(conn)
     route = request.url.path
     
@@ -292,8 +482,21 @@ def decision_execute_endpoint(
     if cached: return cached
     
     try:
+        if isinstance(decision_plan, DecisionPlanReference):
+            plan = load_plan_summary(conn, decision_plan.plan_id, id)
+        else:
+            plan = {
+                "plan_id": decision_plan.plan_id,
+                "workspace_id": decision_plan.workspace_id,
+                "inputs_hash": decision_plan.inputs_hash,
+                "recommended_decision": decision_plan.recommended_decision,
+                "scenarios_count": len(decision_plan.scenario_results)
+            }
+
         # Validate Inputs Hash
         app_data = fetch_application(conn, id)
+        if app_data["status"] not in DECIDABLE_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Application is {app_data['status']}, a decision can no longer be executed")
         applicant = app_data["applicant_data"]
         decision_data = app_data["decision_data"]
         kyc = decision_data.get("kyc_result", {})
@@ -303,8 +506,8 @@ def decision_execute_endpoint(
         # Reconstruct options from plan to verify hash
         # Assuming plan request used defaults if not visible, or derived from plan structure
         options = {
-            "workspace_id": decision_plan.workspace_id,
-            "scenarios_count": len(decision_plan.scenario_results)
+            "workspace_id": plan["workspace_id"],
+            "scenarios_count": plan["scenarios_count"]
         }
         
         current_hash = calculate_inputs_hash(
@@ -315,8 +518,11 @@ def decision_execute_endpoint(
             options
         )
         
-        if current_hash != decision_plan.inputs_hash:
+        if current_hash != plan["inputs_hash"]:
             raise HTTPException(status_code=409, detail="Application state has changed since plan was created. Inputs hash mismatch.")
+
+        # Claim the plan before running anything; refused if already EXECUTED or SUPERSEDED
+        mark_plan_executed(conn, plan["plan_id"])
             
         # Execute Decision
         # We reuse the deterministic logic. It should yield the same result as recommended_decision if state is same.
@@ -325,23 +531,20 @@ def decision_execute_endpoint(
             "kyc_result": kyc,
             "fraud_result": fraud,
             "credit_score": credit,
-            "db_conn": conn,
+            "persist_decision": decision_persister(conn),
             "mock_agent": x_mock_agent
         }
         
-        result = execute_decision_workflow(inputs, "EXECUTE", derive_id(idempotency_key))
+        cache_writes = []
+        decision_cache.load(conn, [inputs])
+        result = execute_decision_workflow(inputs, "EXECUTE", derive_id(idempotency_key), cache_writes)
         
         # Verify result matches plan? Not strictly required but good practice.
-        if result["decision"] != decision_plan.recommended_decision:
-             logger.warning(f"Execution result {result['decision']} differs from plan {decision_plan.recommended_decision}")
+        if result["decision"] != plan["recommended_decision"]:
+             logger.warning(f"Execution result {result['decision']} differs from plan {plan['recommended_decision']}")
         
         # Persist
-        log_audit(conn, id, "DECISION_EXECUTED", {"run_id": result["run_id"], "decision": result["decision"], "plan_id": decision_plan.plan_id})
-        
-        # Mark Plan Executed
-        mark_plan_executed(conn, decision_plan.plan_id)
-        
-        conn.commit()
+        log_audit(conn, id, "DECISION_EXECUTED", {"run_id": result["run_id"], "decision": result["decision"], "plan_id": plan["plan_id"]})
         
         response = {
             "run_id": result["run_id"],
@@ -352,15 +555,17 @@ def decision_execute_endpoint(
         }
         
         idem.complete(idempotency_key, route, response)
-        return response
-        
-    except HTTPException as he:
-        conn.rollback()
-        raise he
+    except HTTPException:
+        idem.fail(idempotency_key, route)
+        raise
     except Exception as e:
         logger.error(f"Execution failed: {e}")
-        conn.rollback()
+        idem.fail(idempotency_key, route)
         raise HTTPException(status_code=500, detail=str(e))
+    # step_persist rewrote the application row
+    invalidate_application(id)
+    decision_cache.save(conn, cache_writes)
+    return response
 
 @app.post("/applications/{id}/decision/dry-run")
 def decision_dry_run(
@@ -392,11 +597,13 @@ def run_decision_legacy(app_id: str, request: Request, idempotency_key: str, con
             "kyc_result": decision_data.get("kyc_result", {}),
             "fraud_result": decision_data.get("fraud_result", {}),
             "credit_score": decision_data.get("credit_score", 0),
-            "db_conn": conn,
+            "persist_decision": decision_persister(conn),
             "mock_agent": mock_agent
         }
         
-        result = execute_decision_workflow(inputs, mode, derive_id(idempotency_key))
+        cache_writes = []
+        decision_cache.load(conn, [inputs])
+        result = execute_decision_workflow(inputs, mode, derive_id(idempotency_key), cache_writes)
         
         response = {
             "run_id": result["run_id"],
@@ -410,10 +617,11 @@ def run_decision_legacy(app_id: str, request: Request, idempotency_key: str, con
         # No, dry run doesn't persist.
         
         idem.complete(idempotency_key, route, response)
-        return response
     except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        idem.fail(idempotency_key, route)
+        raise write_error(e)
+    decision_cache.save(conn, cache_writes)
+    return response
 
 @app.post("/offers/{id}/accept")
 def accept_offer(
@@ -429,19 +637,16 @@ def accept_offer(
     if cached: return cached
     
     try:
-        # Verify app exists
-        app_data = fetch_application(conn, id)
-        
-        update_app_status(conn, id, "OFFER_ACCEPTED")
-        log_audit(conn, id, "OFFER_ACCEPTED", {"timestamp": str(datetime.datetime.now())})
-        conn.commit()
+        # APPROVE -> OFFER_ACCEPTED and the audit row in one statement; 404 / 409 otherwise (see loan_api.lifecycle)
+        ops = [accept_offer_op(id)]
         
         resp = {"status": "OFFER_ACCEPTED", "application_id": id}
-        idem.complete(idempotency_key, route, resp)
-        return resp
+        idem.complete(idempotency_key, route, resp, ops=ops)
     except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        idem.fail(idempotency_key, route)
+        raise write_error(e)
+    invalidate_application(id)
+    return resp
 
 @app.post("/bookings")
 def create_booking(
@@ -458,38 +663,153 @@ def create_booking(
     
     try:
         app_id = booking_data.application_id
-        # Verify app exists
-        app_data = fetch_application(conn, app_id)
-        
-        # Update status
-        update_app_status(conn, app_id, "BOOKED")
-        
-        # Create Booking Record? (Audit log is sufficient for this sample)
         booking_id = derive_id(idempotency_key)
-        
-        log_audit(conn, app_id, "BOOKING_CREATED", {"booking_id": booking_id, "activation_date": booking_data.activation_date})
-        conn.commit()
+        # OFFER_ACCEPTED -> BOOKED, the bookings row and the audit row in one statement
+        ops = [book_op(app_id, booking_id, booking_data.activation_date)]
         
         resp = {"booking_id": booking_id, "status": "BOOKED", "application_id": app_id}
-        idem.complete(idempotency_key, route, resp)
-        return resp
+        idem.complete(idempotency_key, route, resp, ops=ops)
     except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        idem.fail(idempotency_key, route)
+        raise write_error(e)
+    invalidate_application(app_id)
+    return resp
+
+def create_bookings_bulk(raw_items: List[Any]) -> Dict:
+    """
+    Bulk equivalent of create_booking (see loan_api.bookings.book_many), committed together.
+    Items share the idempotency namespace and booking ids of POST /bookings.
+    """
+    route = "/bookings"
+    results: List[Optional[Dict]] = [None] * len(raw_items)
+    valid = []
+    seen = set()
+    for i, raw in enumerate(raw_items):
+        try:
+            item = BatchBookingItem.model_validate(raw)
+        except ValidationError as e:
+            results[i] = batch_error(i, raw.get("idempotency_key") if isinstance(raw, dict) else None, 422, e.errors(include_url=False))
+            continue
+        if item.idempotency_key in seen:
+            results[i] = batch_error(i, item.idempotency_key, 409, "Duplicate idempotency key in batch")
+            continue
+        seen.add(item.idempotency_key)
+        valid.append((i, item.idempotency_key, item.booking.model_dump()))
+
+    conn = get_write_connection()
+    try:
+        idem = IdempotencyManager(conn)
+        locks = idem.check_and_lock_many([(key, route, body) for _, key, body in valid], "POST", "EXECUTE")
+
+        to_book = []
+        for (i, key, body), lock in zip(valid, locks):
+            if isinstance(lock, HTTPException):
+                results[i] = batch_error(i, key, lock.status_code, lock.detail)
+            elif lock:
+                results[i] = {"index": i, "idempotency_key": key, "status_code": 200, "replayed": True, "response": lock}
+            else:
+                to_book.append((i, key, body, derive_id(key)))
+
+        if to_book:
+            try:
+                outcomes = book_many(conn, [(booking_id, body["application_id"], body["activation_date"])
+                                            for _, _, body, booking_id in to_book])
+                booked = [entry for entry, error in zip(to_book, outcomes) if error is None]
+                responses = [
+                    {"booking_id": booking_id, "status": "BOOKED", "application_id": body["application_id"]}
+                    for _, _, body, booking_id in booked
+                ]
+                idem.complete_many([(key, route, resp) for (_, key, _, _), resp in zip(booked, responses)])
+                for (i, key, _, _), resp in zip(booked, responses):
+                    results[i] = {"index": i, "idempotency_key": key, "status_code": 200, "replayed": False, "response": resp}
+
+                refused = [(entry, error) for entry, error in zip(to_book, outcomes) if error is not None]
+                idem.fail_many([(key, route) for (_, key, _, _), _ in refused])
+                for (i, key, _, _), error in refused:
+                    results[i] = batch_error(i, key, error.status_code, error.detail)
+            except Exception as e:
+                logger.error(f"Error creating booking batch: {e}")
+                conn.rollback()
+                idem.fail_many([(key, route) for _, key, _, _ in to_book])
+                for i, key, _, _ in to_book:
+                    results[i] = batch_error(i, key, 500, str(e))
+                booked = []
+            for _, _, body, _ in booked:
+                invalidate_application(body["application_id"])
+    finally:
+        release_connection(conn)
+
+    return {
+        "booked": sum(1 for r in results if r.get("replayed") is False),
+        "replayed": sum(1 for r in results if r.get("replayed")),
+        "failed": sum(1 for r in results if "error" in r),
+        "results": results
+    }
+
+@app.post("/bookings:batch")
+async def create_bookings_batch(request: Request):
+    """
+    Bulk booking for activation runs. Body: JSON array, or NDJSON with Content-Type
+    application/x-ndjson, of {"idempotency_key": ..., "booking": BookingCreate}.
+    Returns per-item results in input order; refused items (404 / 409) do not fail the others.
+    """
+    items = parse_batch_body(await request.body(), request.headers.get("content-type", ""))
+    if len(items) > BOOKING_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BOOKING_BATCH_MAX_ITEMS} items")
+    return await run_in_threadpool(create_bookings_bulk, items)
 
 @app.get("/applications/{id}/audit")
-def get_audit(id: str, conn = Depends(get_read_db_conn)):
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, action, details, created_at FROM audit_logs WHERE application_id = :1 ORDER BY created_at", [id])
-    rows = cursor.fetchall()
-    cursor.close()
-    
-    return [
-        {
-            "id": r[0], 
-            "action": r[1], 
-            "details": json.loads(r[2].read()) if r[2] else {}, 
-            "timestamp": str(r[3])
-        }
-        for r in rows
-    ]
+def get_audit(
+    id: str,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=AUDIT_PAGE_MAX_LIMIT),
+    conn = Depends(get_read_db_conn)
+):
+    """
+    Without cursor/limit returns the full list (legacy shape).
+    With either, returns {"items": [...], "next_cursor": ...}; pass next_cursor back to get the next page.
+    """
+    db_cursor = conn.cursor()
+    try:
+        if cursor is None and limit is None:
+            db_cursor.execute(*audit_repo.select(id))
+            return [audit_row(r) for r in db_cursor.fetchall()]
+
+        limit = limit or AUDIT_PAGE_DEFAULT_LIMIT
+        sql, binds = audit_repo.page(id, decode_audit_cursor(cursor) if cursor else None, limit + 1)
+        db_cursor.arraysize = limit + 1
+        db_cursor.prefetchrows = limit + 2 # whole page in the execute round trip
+        db_cursor.execute(sql, binds)
+        return audit_page(db_cursor.fetchall(), limit)
+    finally:
+        db_cursor.close()
+
+@app.get("/applications/{id}/audit/stream")
+def stream_audit(
+    id: str,
+    cursor: Optional[str] = None,
+    consistency_token: Optional[str] = Header(None, alias=CONSISTENCY_HEADER)
+):
+    """
+    Streams the audit log as NDJSON (one event per line) without building the list in memory.
+    The generator holds its own read connection for the duration of the response.
+    """
+    after = decode_audit_cursor(cursor) if cursor else None
+
+    def rows():
+        conn = read_router.acquire_read(consistency_token)
+        db_cursor = conn.cursor()
+        try:
+            sql, binds = audit_repo.page(id, after, None)
+            db_cursor.arraysize = AUDIT_STREAM_ARRAYSIZE
+            db_cursor.prefetchrows = AUDIT_STREAM_ARRAYSIZE
+            db_cursor.execute(sql, binds)
+            for r in db_cursor:
+                yield json.dumps(audit_row(r)) + "\n"
+        finally:
+            db_cursor.close()
+            release_connection(conn)
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+app.get("/metrics")(get_metrics)
@@ -0,0 +1,359 @@
+"""
+Async variant of the Loan Origination API.
+
+Serves the same routes as loan_api.main for the intake, checks, dry-run,
+offer/booking and read paths, but on python-oracledb's asyncio pool, so a
+request waiting on the database does not hold a threadpool thread.
+Planning and execution stay on the sync app.
+
+Run side by side with the sync app for comparison, e.g.:
+    uvicorn loan_api.main:app --port 8000
+    uvicorn loan_api.main_async:app --port 8001
+"""
+from fastapi import FastAPI, Header, HTTPException, Depends, Request, Query
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+import json
+import logging
+import datetime
+
+from .db import init_db_async, get_write_connection_async, close_db_async, release_connection_async, load_json_async
+from .models import ApplicationCreate, ApplicationResponse, KYCResult, FraudResult, CreditScore, BookingCreate
+from .idempotency import AsyncIdempotencyManager
+from .decision import execute_decision_workflow
+from .audit import AUDIT_WRITER_MODE, audit_writer
+from .routing import CONSISTENCY_HEADER, read_router
+from .snapshots import get_snapshot_async, invalidate_application, snapshot_response
+from .lifecycle import write_error
+from .storage import application_repo, audit_repo
+from .common import (
+    derive_id, get_idempotency_key, get_metrics, stamp_consistency_token, count_round_trips,
+    accept_offer_op, audit_op, book_op, check_ops,
+    AUDIT_PAGE_DEFAULT_LIMIT, AUDIT_PAGE_MAX_LIMIT, AUDIT_STREAM_ARRAYSIZE,
+    decode_audit_cursor, encode_audit_cursor
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("loan_api.async")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db_async()
+    if AUDIT_WRITER_MODE == "buffered":
+        # The writer flushes from its own thread on the sync write pool
+        audit_writer.start()
+    read_router.start()
+    yield
+    read_router.stop()
+    audit_writer.stop()
+    await close_db_async()
+
+app = FastAPI(lifespan=lifespan, title="Loan Origination API (async)")
+app.middleware("http")(stamp_consistency_token)
+app.middleware("http")(count_round_trips)
+
+# Dependencies
+async def get_write_db_conn():
+    conn = await get_write_connection_async()
+    try:
+        yield conn
+    finally:
+        await release_connection_async(conn)
+
+async def get_read_db_conn(consistency_token: Optional[str] = Header(None, alias=CONSISTENCY_HEADER)):
+    conn = await read_router.acquire_read_async(consistency_token)
+    try:
+        yield conn
+    finally:
+        await release_connection_async(conn)
+
+# Helpers
+
+async def fetch_application(conn, app_id: str) -> Dict:
+    cursor = conn.cursor()
+    await cursor.execute(*application_repo.select(app_id))
+    row = await cursor.fetchone()
+    cursor.close()
+    if not row:
+        raise HTTPException(status_code=404, detail="Application not found")
+
+    app_data = await load_json_async(row[2])
+    dec_data = await load_json_async(row[3])
+
+    return {
+        "id": row[0],
+        "status": row[1],
+        "applicant_data": app_data,
+        "decision_data": dec_data,
+        "created_at": str(row[4])
+    }
+
+async def audit_row(r) -> Dict:
+    return {
+        "id": r[0],
+        "action": r[1],
+        "details": await load_json_async(r[2]),
+        "timestamp": str(r[3])
+    }
+
+async def record_check(conn, request: Request, idempotency_key: str, app_id: str, body: Dict,
+                       field: str, value: Any, action: str, details: Dict, resp: Dict):
+    # Shared body of the KYC / fraud / credit-score routes
+    idem = AsyncIdempotencyManager(conn)
+    route = request.url.path
+    cached = await idem.check_and_lock(idempotency_key, route, body, "POST", "EXECUTE")
+    if cached: return cached
+
+    try:
+        ops, deferred = check_ops(app_id, field, value, action, details)
+        await idem.complete(idempotency_key, route, resp, ops=ops)
+    except Exception as e:
+        await idem.fail(idempotency_key, route)
+        raise write_error(e)
+    # Only once committed (invalidating earlier lets a concurrent read cache the old row again),
+    # and outside the try: the key is COMPLETED, a failure here must not fail() it
+    invalidate_application(app_id)
+    audit_writer.submit(deferred)
+    return resp
+
+# Routes
+
+@app.post("/applications", response_model=ApplicationResponse)
+async def create_application(
+    app_data: ApplicationCreate,
+    request: Request,
+    idempotency_key: str = Depends(get_idempotency_key),
+    conn = Depends(get_write_db_conn)
+):
+    idem = AsyncIdempotencyManager(conn)
+    route = request.url.path
+
+    cached = await idem.check_and_lock(idempotency_key, route, app_data.model_dump(), "POST", "EXECUTE")
+    if cached: return cached
+
+    try:
+        app_id = derive_id(idempotency_key)
+        ops = [
+            application_repo.insert(app_id, json.dumps(app_data.model_dump())),
+            audit_op(app_id, "APPLICATION_CREATED", {"source": "API"})
+        ]
+
+        response = {
+            "id": app_id,
+            "status": "NEW",
+            "applicant_data": app_data.model_dump(),
+            "decision_data": {},
+            "created_at": str(datetime.datetime.now())
+        }
+
+        await idem.complete(idempotency_key, route, response, ops=ops)
+        return response
+    except Exception as e:
+        logger.error(f"Error creating app: {e}")
+        await idem.fail(idempotency_key, route)
+        raise write_error(e)
+
+@app.get("/applications/{id}", response_model=ApplicationResponse)
+async def get_application(
+    id: str,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    conn = Depends(get_read_db_conn)
+):
+    return snapshot_response(await get_snapshot_async(conn, id, if_none_match), if_none_match)
+
+@app.post("/applications/{id}/kyc")
+async def add_kyc_result(
+    id: str,
+    result: KYCResult,
+    request: Request,
+    idempotency_key: str = Depends(get_idempotency_key),
+    conn = Depends(get_write_db_conn)
+):
+    return await record_check(
+        conn, request, idempotency_key, id, result.model_dump(),
+        "kyc_result", result.model_dump(), "KYC_UPDATED", result.model_dump(),
+        {"status": "Updated", "kyc_result": result.model_dump()}
+    )
+
+@app.post("/applications/{id}/fraud")
+async def add_fraud_result(
+    id: str,
+    result: FraudResult,
+    request: Request,
+    idempotency_key: str = Depends(get_idempotency_key),
+    conn = Depends(get_write_db_conn)
+):
+    return await record_check(
+        conn, request, idempotency_key, id, result.model_dump(),
+        "fraud_result", result.model_dump(), "FRAUD_CHECK_UPDATED", result.model_dump(),
+        {"status": "Updated", "fraud_result": result.model_dump()}
+    )
+
+@app.post("/applications/{id}/credit-score")
+async def add_credit_score(
+    id: str,
+    result: CreditScore,
+    request: Request,
+    idempotency_key: str = Depends(get_idempotency_key),
+    conn = Depends(get_write_db_conn)
+):
+    return await record_check(
+        conn, request, idempotency_key, id, result.model_dump(),
+        "credit_score", result.score, "CREDIT_SCORE_UPDATED", {"score": result.score},
+        {"status": "Updated", "credit_score": result.score}
+    )
+
+@app.post("/applications/{id}/decision/dry-run")
+async def decision_dry_run(
+    id: str,
+    request: Request,
+    idempotency_key: str = Depends(get_idempotency_key),
+    x_mock_agent: Optional[bool] = Header(None, alias="X-Mock-Agent"),
+    conn = Depends(get_write_db_conn)
+):
+    idem = AsyncIdempotencyManager(conn)
+    route = request.url.path
+    mode = "DRY_RUN"
+
+    cached = await idem.check_and_lock(idempotency_key, route, {}, "POST", mode)
+    if cached: return cached
+
+    try:
+        app_data = await fetch_application(conn, id)
+        applicant = app_data["applicant_data"]
+        decision_data = app_data["decision_data"]
+
+        # DRY_RUN never persists, so the workflow gets no connection
+        inputs = {
+            "application": {"id": id, **applicant},
+            "kyc_result": decision_data.get("kyc_result", {}),
+            "fraud_result": decision_data.get("fraud_result", {}),
+            "credit_score": decision_data.get("credit_score", 0),
+            "mock_agent": x_mock_agent
+        }
+
+        # The workflow is sync (agent and engine); run it off the event loop
+        result = await run_in_threadpool(execute_decision_workflow, inputs, mode, derive_id(idempotency_key))
+
+        response = {
+            "run_id": result["run_id"],
+            "decision": result["decision"],
+            "reason_codes": result["reason_codes"],
+            "pricing": result["pricing"],
+            "mode": mode
+        }
+
+        await idem.complete(idempotency_key, route, response)
+        return response
+    except Exception as e:
+        await idem.fail(idempotency_key, route)
+        raise write_error(e)
+
+@app.post("/offers/{id}/accept")
+async def accept_offer(
+    id: str,
+    request: Request,
+    idempotency_key: str = Depends(get_idempotency_key),
+    conn = Depends(get_write_db_conn)
+):
+    idem = AsyncIdempotencyManager(conn)
+    route = request.url.path
+    cached = await idem.check_and_lock(idempotency_key, route, {}, "POST", "EXECUTE")
+    if cached: return cached
+
+    try:
+        # Guarded APPROVE -> OFFER_ACCEPTED transition with its audit row (404 / 409 otherwise)
+        ops = [accept_offer_op(id)]
+
+        resp = {"status": "OFFER_ACCEPTED", "application_id": id}
+        await idem.complete(idempotency_key, route, resp, ops=ops)
+    except Exception as e:
+        await idem.fail(idempotency_key, route)
+        raise write_error(e)
+    invalidate_application(id)
+    return resp
+
+@app.post("/bookings")
+async def create_booking(
+    booking_data: BookingCreate,
+    request: Request,
+    idempotency_key: str = Depends(get_idempotency_key),
+    conn = Depends(get_write_db_conn)
+):
+    idem = AsyncIdempotencyManager(conn)
+    route = request.url.path
+
+    cached = await idem.check_and_lock(idempotency_key, route, booking_data.model_dump(), "POST", "EXECUTE")
+    if cached: return cached
+
+    try:
+        app_id = booking_data.application_id
+        booking_id = derive_id(idempotency_key)
+        # Guarded OFFER_ACCEPTED -> BOOKED transition with the bookings and audit rows
+        ops = [book_op(app_id, booking_id, booking_data.activation_date)]
+
+        resp = {"booking_id": booking_id, "status": "BOOKED", "application_id": app_id}
+        await idem.complete(idempotency_key, route, resp, ops=ops)
+    except Exception as e:
+        await idem.fail(idempotency_key, route)
+        raise write_error(e)
+    invalidate_application(app_id)
+    return resp
+
+@app.get("/applications/{id}/audit")
+async def get_audit(
+    id: str,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=AUDIT_PAGE_MAX_LIMIT),
+    conn = Depends(get_read_db_conn)
+):
+    # Same contract as loan_api.main.get_audit
+    db_cursor = conn.cursor()
+    try:
+        if cursor is None and limit is None:
+            await db_cursor.execute(*audit_repo.select(id))
+            return [await audit_row(r) for r in await db_cursor.fetchall()]
+
+        limit = limit or AUDIT_PAGE_DEFAULT_LIMIT
+        sql, binds = audit_repo.page(id, decode_audit_cursor(cursor) if cursor else None, limit + 1)
+        db_cursor.arraysize = limit + 1
+        db_cursor.prefetchrows = limit + 2
+        await db_cursor.execute(sql, binds)
+        rows = await db_cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "items": [await audit_row(r) for r in rows],
+            "next_cursor": encode_audit_cursor(rows[-1][3], rows[-1][0]) if has_more else None
+        }
+    finally:
+        db_cursor.close()
+
+@app.get("/applications/{id}/audit/stream")
+async def stream_audit(
+    id: str,
+    cursor: Optional[str] = None,
+    consistency_token: Optional[str] = Header(None, alias=CONSISTENCY_HEADER)
+):
+    after = decode_audit_cursor(cursor) if cursor else None
+
+    async def rows():
+        conn = await read_router.acquire_read_async(consistency_token)
+        db_cursor = conn.cursor()
+        try:
+            sql, binds = audit_repo.page(id, after, None)
+            db_cursor.arraysize = AUDIT_STREAM_ARRAYSIZE
+            db_cursor.prefetchrows = AUDIT_STREAM_ARRAYSIZE
+            await db_cursor.execute(sql, binds)
+            async for r in db_cursor:
+                yield json.dumps(await audit_row(r)) + "\n"
+        finally:
+            db_cursor.close()
+            await release_connection_async(conn)
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+# Same payload as the sync app; pool_stats() includes the async pools
+app.get("/metrics")(get_metrics)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict, Any, List
 
 class ApplicationCreate(BaseModel):
@@ -9,6 +9,11 @@ class ApplicationCreate(BaseModel):
     debt: float
     email: Optional[str] = None
 
+class BatchApplicationItem(BaseModel):
+    # Per-item equivalent of the Idempotency-Key header of POST /applications
+    idempotency_key: str
+    application: ApplicationCreate
+
 class ApplicationResponse(BaseModel):
     id: str
     status: str
@@ -33,8 +38,14 @@ class DecisionResponse(BaseModel):
 
 class BookingCreate(BaseModel):
     application_id: str
+    # Free text, as before the bookings table; only a YYYY-MM-DD value sets bookings.activation_date
     activation_date: Optional[str] = None
 
+class BatchBookingItem(BaseModel):
+    # Per-item equivalent of the Idempotency-Key header of POST /bookings
+    idempotency_key: str
+    booking: BookingCreate
+
 # --- Planning Models ---
 
 class ScenarioResult(BaseModel):
@@ -62,3 +73,8 @@ class DecisionPlan(BaseModel):
     ai_commentary: Optional[Dict[str, Any]] = None
     schema_hints: Optional[Dict[str, Any]] = None
     execute_preview: List[str]
+
+class DecisionPlanReference(BaseModel):
+    # Execute a stored plan by id; extra fields are rejected so a full DecisionPlan never matches
+    model_config = ConfigDict(extra="forbid")
+    plan_id: str
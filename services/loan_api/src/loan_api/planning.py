@@ -1,14 +1,40 @@
-import hashlib
-import json
 import uuid
 import logging
 import os
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
 from .models import DecisionPlan, ScenarioResult, DecisionPlanRequest
-from .decision import execute_decision_workflow
+from .decision import decision_cache, execute_decision_workflow
+from .storage import plan_repo
+from .canonical import canonical_hash, frozen
 
 logger = logging.getLogger("loan_api.planning")
 
+# Shared pool for scenario evaluation. Bounded process-wide so planning bursts
+# cannot grow threads beyond PLANNING_POOL_SIZE on top of the API threadpool.
+PLANNING_POOL_SIZE = int(os.environ.get("PLANNING_POOL_SIZE", "4"))
+# Max scenarios a single plan request may have in flight at once
+PLANNING_MAX_PARALLEL_PER_REQUEST = int(os.environ.get("PLANNING_MAX_PARALLEL_PER_REQUEST", "2"))
+
+_scenario_pool = None
+_scenario_pool_lock = threading.Lock()
+
+def get_scenario_pool() -> ThreadPoolExecutor:
+    global _scenario_pool
+    if _scenario_pool is None:
+        with _scenario_pool_lock:
+            if _scenario_pool is None:
+                _scenario_pool = ThreadPoolExecutor(max_workers=PLANNING_POOL_SIZE, thread_name_prefix="planning")
+    return _scenario_pool
+
+def shutdown_scenario_pool():
+    global _scenario_pool
+    with _scenario_pool_lock:
+        if _scenario_pool is not None:
+            _scenario_pool.shutdown(wait=True)
+            _scenario_pool = None
+
 def calculate_inputs_hash(application: Dict, kyc: Dict, fraud: Dict, credit: int, plan_options: Dict) -> str:
     # Canonicalize
     data = {
@@ -19,8 +45,7 @@ def calculate_inputs_hash(application: Dict, kyc: Dict, fraud: Dict, credit: int
         "options": plan_options
     }
     # Sort keys for determinism
-    canonical_json = json.dumps(data, sort_keys=True)
-    return hashlib.sha256(canonical_json.encode("utf-8")).hexdigest()
+    return canonical_hash(data)
 
 def get_scenarios(conn, workspace_id: str, app_id: str, seed: str, count: int, fallback_inputs: Dict) -> List[Dict]:
     # 1. Try DB Native
@@ -85,21 +110,71 @@ def generate_ai_commentary(conn, plan_data: Dict) -> Dict:
 
 def persist_plan(conn, plan: DecisionPlan, idem_key: str):
     cursor = conn.cursor()
-    cursor.execute(
-        """INSERT INTO decision_plans 
-           (plan_id, workspace_id, application_id, idempotency_key, inputs_hash, plan_json, status)
-           VALUES (:1, :2, :3, :4, :5, :6, :7)""",
-        [plan.plan_id, plan.workspace_id, plan.application_id, idem_key, plan.inputs_hash, plan.model_dump_json(), plan.status]
-    )
-    conn.commit()
+    cursor.execute(*plan_repo.insert(
+        plan.plan_id, plan.workspace_id, plan.application_id, idem_key, plan.inputs_hash, plan.model_dump_json(), plan.status
+    ))
+    # Committed by the caller together with the idempotency completion
     cursor.close()
 
-def create_plan(conn, app_id: str, app_data: Dict, request: DecisionPlanRequest, idempotency_key: str) -> DecisionPlan:
+def run_scenarios(scenarios_data: List[Dict], base_run_id: str, cache_writes: Optional[List] = None) -> List[ScenarioResult]:
+    """
+    Evaluates scenarios on the shared planning pool.
+
+    At most PLANNING_MAX_PARALLEL_PER_REQUEST scenarios of this request are in flight
+    at any time. Results keep the order of scenarios_data and the `_s{i}` run id suffixes.
+    Scenarios run in PLAN mode without persist_decision, which holds the request's
+    connection: oracledb connections must not be shared between threads, and a
+    scenario never writes.
+    """
+    def evaluate(i: int, s_input: Dict) -> ScenarioResult:
+        s_res = execute_decision_workflow(
+            {k: v for k, v in s_input["inputs"].items() if k != "persist_decision"},
+            mode="PLAN",
+            run_id_base=f"{base_run_id}_s{i}",
+            cache_writes=cache_writes
+        )
+        # We pass the whole application object as inputs context (models.py: inputs: Dict).
+        return ScenarioResult(
+            name=s_input["name"],
+            inputs=s_input["inputs"]["application"],
+            decision=s_res["decision"],
+            reason_codes=s_res["reason_codes"],
+            pricing=s_res["pricing"]
+        )
+
+    if len(scenarios_data) <= 1 or PLANNING_MAX_PARALLEL_PER_REQUEST <= 1:
+        return [evaluate(i, s_input) for i, s_input in enumerate(scenarios_data)]
+
+    pool = get_scenario_pool()
+    slots = threading.BoundedSemaphore(PLANNING_MAX_PARALLEL_PER_REQUEST)
+    futures = []
+    try:
+        for i, s_input in enumerate(scenarios_data):
+            # Blocks the request thread (which would wait for the results anyway) once the cap is reached
+            slots.acquire()
+            future = pool.submit(evaluate, i, s_input)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+    except Exception:
+        for future in futures:
+            future.cancel()
+        raise
+
+    # Collect in submission order for deterministic scenario_results
+    return [future.result() for future in futures]
+
+def create_plan(conn, app_id: str, app_data: Dict, request: DecisionPlanRequest, idempotency_key: str,
+                cache_writes: Optional[List] = None) -> DecisionPlan:
+    """
+    Builds and stores (uncommitted) a plan. New agent results are appended to
+    cache_writes, for decision_cache.save() once the caller has committed.
+    """
     # 1. Gather Inputs
     applicant = app_data["applicant_data"]
     decision_data = app_data["decision_data"]
-    kyc = decision_data.get("kyc_result", {})
-    fraud = decision_data.get("fraud_result", {})
+    # Shared unchanged by the base decision and every scenario, so each is serialized for hashing once
+    kyc = frozen(decision_data.get("kyc_result", {}))
+    fraud = frozen(decision_data.get("fraud_result", {}))
     credit = decision_data.get("credit_score", 0)
     mock_agent = decision_data.get("mock_agent", False)
     
@@ -121,34 +196,22 @@ def create_plan(conn, app_id: str, app_data: Dict, request: DecisionPlanRequest,
     }
     inputs_hash = calculate_inputs_hash(inputs["application"], kyc, fraud, credit, options_for_hash)
     
-    # 3. Base Decision
+    # 3. Scenarios, and the DB tier of the decision cache for them and the base decision,
+    # read here on the request thread: the runs below do not get the connection
+    scenarios_data = get_scenarios(conn, ws_id, app_id, idempotency_key, request.scenarios_count, inputs)
+    decision_cache.load(conn, [inputs] + [s["inputs"] for s in scenarios_data])
+
+    # 4. Base Decision
     base_run_id = str(uuid.uuid5(uuid.NAMESPACE_OID, idempotency_key))
     base_result = execute_decision_workflow(
-        {**inputs, "db_conn": conn}, 
+        inputs,
         mode="PLAN",
-        run_id_base=base_run_id
+        run_id_base=base_run_id,
+        cache_writes=cache_writes
     )
     
-    # 4. Scenarios
-    scenarios_data = get_scenarios(conn, ws_id, app_id, idempotency_key, request.scenarios_count, inputs)
-    scenario_results = []
-    
-    for i, s_input in enumerate(scenarios_data):
-        s_res = execute_decision_workflow(
-            {**s_input["inputs"], "db_conn": conn},
-            mode="PLAN",
-            run_id_base=f"{base_run_id}_s{i}"
-        )
-        # Calculate diff inputs for display? 
-        # For now just passing the full app object might be heavy, but models.py says inputs: Dict.
-        # We'll pass the whole application object as inputs context.
-        scenario_results.append(ScenarioResult(
-            name=s_input["name"],
-            inputs=s_input["inputs"]["application"], 
-            decision=s_res["decision"],
-            reason_codes=s_res["reason_codes"],
-            pricing=s_res["pricing"]
-        ))
+    # Scenarios are fanned out to the bounded planning pool
+    scenario_results = run_scenarios(scenarios_data, base_run_id, cache_writes)
 
     # 5. AI Commentary
     commentary = generate_ai_commentary(conn, {"base": base_result, "scenarios": scenario_results})
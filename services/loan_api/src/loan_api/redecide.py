@@ -0,0 +1,215 @@
+"""
+Portfolio re-decisioning job.
+
+Re-runs the loan decision policy over every application, e.g. after a policy
+threshold change, and records the applications whose decision would change.
+Applications are read in keyset chunks (ORDER BY id), scored with the
+vectorized LoanDecisionAgent.run_batch, and the diffs plus the job checkpoint
+are written in one transaction per chunk, so an interrupted job resumes after
+the last committed chunk. Applications are not modified.
+
+CLI:
+    python -m loan_api.redecide --min-credit-score 620
+    python -m loan_api.redecide --resume <job_id>
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from decision_agent import LoanDecisionAgent
+from workflows.loan_origination_wayflow.workflow import tool_price_offer_batch
+
+from .db import get_read_connection, get_write_connection, load_json, release_connection
+from .storage import redecision_repo
+
+logger = logging.getLogger("loan_api.redecide")
+
+REDECIDE_CHUNK_SIZE = int(os.environ.get("REDECIDE_CHUNK_SIZE", "5000"))
+
+# Statuses that record a decision (see step_persist); others (NEW, OFFER_ACCEPTED, ...) fall back to decision_data
+_DECISION_STATUSES = ("APPROVE", "REJECT")
+
+def make_agent(policy: Dict[str, Any]) -> LoanDecisionAgent:
+    """LoanDecisionAgent with policy thresholds overridden per instance (keys are the class constant names)."""
+    agent = LoanDecisionAgent()
+    for name, value in policy.items():
+        if not hasattr(LoanDecisionAgent, name):
+            raise ValueError(f"Unknown policy setting '{name}'")
+        setattr(agent, name, value)
+    return agent
+
+def to_columns(rows: List) -> Dict[str, Any]:
+    """
+    Builds run_batch columns from application rows, with the defaults of the scalar path.
+    Rows whose decision_data holds no check results (no checks yet, or decided before
+    decisions were merged into decision_data) are returned in `skipped` instead.
+    """
+    ids, old, skipped = [], [], []
+    cols: Dict[str, List] = {c: [] for c in LoanDecisionAgent.BATCH_COLUMNS}
+    for app_id, status, applicant_data, decision_data in rows:
+        applicant = load_json(applicant_data)
+        data = load_json(decision_data)
+        if "kyc_result" not in data and "credit_score" not in data:
+            skipped.append(app_id)
+            continue
+        ids.append(app_id)
+        old.append(status if status in _DECISION_STATUSES else data.get("decision"))
+        cols["credit_score"].append(data.get("credit_score", 0))
+        cols["risk_score"].append(data.get("fraud_result", {}).get("risk_score", 0))
+        cols["kyc_pass"].append(data.get("kyc_result", {}).get("status") == "PASS")
+        cols["amount"].append(applicant.get("amount", 10000))
+        cols["income"].append(applicant.get("income", 0))
+        cols["debt"].append(applicant.get("debt", 0))
+    return {"ids": ids, "old": old, "skipped": skipped, "columns": {k: np.asarray(v) for k, v in cols.items()}}
+
+class RedecisionJob:
+    def __init__(self, job_id: Optional[str] = None, policy: Optional[Dict[str, Any]] = None,
+                 chunk_size: int = REDECIDE_CHUNK_SIZE, write_all: bool = False):
+        self.job_id = job_id or str(uuid.uuid4())
+        self.policy = policy or {}
+        self.chunk_size = chunk_size
+        self.write_all = write_all
+        self.last_id = ""
+        self.processed = 0
+        self.changed = 0
+        self.skipped = 0
+        self.timings = {"read": 0.0, "prepare": 0.0, "decide": 0.0, "write": 0.0}
+
+    def _start(self, conn, resume: bool):
+        cursor = conn.cursor()
+        try:
+            if resume:
+                cursor.execute(*redecision_repo.select_job(self.job_id))
+                row = cursor.fetchone()
+                if not row:
+                    raise ValueError(f"Re-decision job {self.job_id} not found")
+                status, policy, self.last_id, self.processed, self.changed, self.skipped = row
+                if status == "COMPLETED":
+                    raise ValueError(f"Re-decision job {self.job_id} already completed")
+                # The stored policy wins, so resumed chunks are scored like the earlier ones
+                self.policy = load_json(policy)
+                self.last_id = self.last_id or ""
+                logger.info(f"Resuming job {self.job_id} after {self.last_id!r} ({self.processed} processed)")
+            else:
+                cursor.execute(*redecision_repo.insert_job(self.job_id, json.dumps(self.policy), self.last_id))
+                conn.commit()
+        finally:
+            cursor.close()
+
+    def _read_chunk(self, conn) -> List:
+        cursor = conn.cursor()
+        try:
+            cursor.arraysize = self.chunk_size
+            cursor.prefetchrows = self.chunk_size + 1
+            # An empty string is NULL in Oracle, so the first chunk starts after a value below every id
+            cursor.execute(*redecision_repo.select_chunk(self.last_id or " ", self.chunk_size))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _write_chunk(self, conn, results: List[List], last_id: str):
+        cursor = conn.cursor()
+        try:
+            if results:
+                cursor.executemany(redecision_repo.INSERT_RESULT_SQL, results)
+            cursor.execute(*redecision_repo.checkpoint(self.job_id, last_id, self.processed, self.changed, self.skipped))
+            conn.commit()
+        finally:
+            cursor.close()
+
+    def run(self, resume: bool = False) -> Dict[str, Any]:
+        read_conn = get_read_connection()
+        write_conn = get_write_connection()
+        started = time.perf_counter()
+        processed_at_start = self.processed
+        try:
+            self._start(write_conn, resume)
+            agent = make_agent(self.policy)
+            tools = {"price_offer_batch": tool_price_offer_batch}
+
+            while True:
+                t0 = time.perf_counter()
+                rows = self._read_chunk(read_conn)
+                t1 = time.perf_counter()
+                if not rows:
+                    break
+
+                chunk = to_columns(rows)
+                t2 = time.perf_counter()
+
+                results = []
+                if chunk["ids"]:
+                    batch = agent.run_batch(chunk["columns"], tools)
+                    for i, (app_id, old) in enumerate(zip(chunk["ids"], chunk["old"])):
+                        new = str(batch["decision"][i])
+                        # Undecided applications (old is None) have no decision to change
+                        changed = old is not None and new != old
+                        if not changed and not self.write_all:
+                            continue
+                        row = LoanDecisionAgent.batch_row(batch, i)
+                        results.append([self.job_id, app_id, old, new, json.dumps(row["reason_codes"]), json.dumps(row["pricing"])])
+                        if changed:
+                            self.changed += 1
+                t3 = time.perf_counter()
+
+                self.processed += len(chunk["ids"])
+                self.skipped += len(chunk["skipped"])
+                self._write_chunk(write_conn, results, rows[-1][0])
+                self.last_id = rows[-1][0]
+                t4 = time.perf_counter()
+
+                for stage, seconds in zip(self.timings, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+                    self.timings[stage] += seconds
+                logger.info(f"Job {self.job_id}: {self.processed} processed, {self.changed} changed, up to {self.last_id}")
+
+            cursor = write_conn.cursor()
+            cursor.execute(*redecision_repo.finish(self.job_id))
+            cursor.close()
+            write_conn.commit()
+        finally:
+            release_connection(read_conn)
+            release_connection(write_conn)
+
+        elapsed = time.perf_counter() - started
+        processed_now = self.processed - processed_at_start
+        return {
+            "job_id": self.job_id,
+            "policy": self.policy,
+            "processed": self.processed,
+            "changed": self.changed,
+            "skipped": self.skipped,
+            "elapsed_s": round(elapsed, 3),
+            "apps_per_sec": round(processed_now / elapsed, 1) if elapsed > 0 else None,
+            "stage_seconds": {stage: round(seconds, 3) for stage, seconds in self.timings.items()}
+        }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Re-run the loan decision policy over all applications and record changed decisions")
+    parser.add_argument("--resume", metavar="JOB_ID", help="continue an interrupted job from its checkpoint")
+    parser.add_argument("--min-credit-score", type=int, help="override LoanDecisionAgent.MIN_CREDIT_SCORE")
+    parser.add_argument("--fraud-reject-score", type=int, help="override LoanDecisionAgent.FRAUD_REJECT_SCORE")
+    parser.add_argument("--chunk-size", type=int, default=REDECIDE_CHUNK_SIZE)
+    parser.add_argument("--write-all", action="store_true", help="record every application, not only changed decisions")
+    args = parser.parse_args(argv)
+
+    policy = {}
+    if args.min_credit_score is not None:
+        policy["MIN_CREDIT_SCORE"] = args.min_credit_score
+    if args.fraud_reject_score is not None:
+        policy["FRAUD_REJECT_SCORE"] = args.fraud_reject_score
+
+    job = RedecisionJob(job_id=args.resume, policy=policy, chunk_size=args.chunk_size, write_all=args.write_all)
+    summary = job.run(resume=bool(args.resume))
+    print(json.dumps(summary, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""
+Read-your-writes routing between the primary and the True Cache read pool.
+
+Every write response carries an X-Consistency-Token: the wall-clock time (ms)
+at which the response was produced, i.e. after the request committed. A
+background monitor samples the primary SCN and then the True Cache SCN; once
+True Cache has applied an SCN read from the primary at time t, every commit
+that finished before t is visible there. Reads that send a token are served by
+True Cache only if it is known to cover the token's time, otherwise by the
+primary. Reads without a token go to True Cache while it is healthy.
+
+The monitor also fails reads over to the primary when True Cache lags by more
+than TRUE_CACHE_MAX_LAG_MS or misses TRUE_CACHE_FAILURE_THRESHOLD probes in a
+row, and moves them back once it has caught up.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+import oracledb
+
+from .db import (
+    DB_BACKEND, connect_standalone, get_read_connection, get_read_connection_async,
+    get_write_connection, get_write_connection_async, release_connection
+)
+
+logger = logging.getLogger("loan_api.routing")
+
+CONSISTENCY_HEADER = "X-Consistency-Token"
+
+# The embedded backend (DB_BACKEND=embedded) has no True Cache: every read goes to its single pool
+TRUE_CACHE_ENABLED = os.environ.get("TRUE_CACHE_ENABLED", "false").lower() == "true" and DB_BACKEND == "oracle"
+# false: legacy behavior, every read goes to True Cache
+CONSISTENCY_ROUTING = os.environ.get("CONSISTENCY_ROUTING", "true").lower() == "true"
+TRUE_CACHE_PROBE_INTERVAL_MS = int(os.environ.get("TRUE_CACHE_PROBE_INTERVAL_MS", "250"))
+TRUE_CACHE_PROBE_TIMEOUT_MS = int(os.environ.get("TRUE_CACHE_PROBE_TIMEOUT_MS", "1000"))
+TRUE_CACHE_MAX_LAG_MS = int(os.environ.get("TRUE_CACHE_MAX_LAG_MS", "5000"))
+TRUE_CACHE_FAILURE_THRESHOLD = int(os.environ.get("TRUE_CACHE_FAILURE_THRESHOLD", "3"))
+# Allowance for clock differences between API hosts (tokens and samples may come from different workers)
+CONSISTENCY_CLOCK_SKEW_MS = int(os.environ.get("CONSISTENCY_CLOCK_SKEW_MS", "50"))
+
+# On True Cache, CURRENT_SCN is the SCN up to which redo has been applied
+SELECT_SCN_SQL = os.environ.get("TRUE_CACHE_SCN_SQL", "SELECT current_scn FROM v$database")
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+def issue_token() -> str:
+    return str(_now_ms())
+
+def parse_token(value: Optional[str]) -> Optional[int]:
+    """Token value as epoch ms, None when absent. Raises ValueError when malformed."""
+    if value is None or not value.strip():
+        return None
+    return int(value)
+
+class ConsistencyRouter:
+    """
+    Chooses the pool for each read and monitors True Cache in a background thread.
+    Inactive (every read on the read pool, which aliases the primary) unless
+    True Cache is enabled.
+    """
+
+    def __init__(self, enabled: bool = TRUE_CACHE_ENABLED, consistency: bool = CONSISTENCY_ROUTING,
+                 probe_interval_ms: int = TRUE_CACHE_PROBE_INTERVAL_MS, max_lag_ms: int = TRUE_CACHE_MAX_LAG_MS,
+                 failure_threshold: int = TRUE_CACHE_FAILURE_THRESHOLD, clock_skew_ms: int = CONSISTENCY_CLOCK_SKEW_MS):
+        self.enabled = enabled
+        self.consistency = consistency
+        self.probe_interval = probe_interval_ms / 1000
+        self.max_lag_ms = max_lag_ms
+        self.failure_threshold = failure_threshold
+        self.clock_skew_ms = clock_skew_ms
+        # (sample time ms, primary SCN), oldest first; enough to measure lag up to max_lag_ms
+        self._samples: Deque[Tuple[int, int]] = deque(maxlen=max(16, 2 * max_lag_ms // max(probe_interval_ms, 1) + 2))
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._primary = None
+        self._cache = None
+        self.state = "unknown" # unknown (no probe yet), healthy, lagging, unreachable
+        self.primary_scn: Optional[int] = None
+        self.cache_scn: Optional[int] = None
+        self.covered_until_ms = 0 # commits finished before this time are visible on True Cache
+        self.lag_ms: Optional[int] = None
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+        self.probes = 0
+        self.probe_errors = 0
+        self.failovers = 0
+        self.recoveries = 0
+        self.routes: Dict[str, Dict[str, int]] = {"cache": {}, "primary": {}}
+
+    @property
+    def active(self) -> bool:
+        return self.enabled and self.consistency
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # --- Monitor ---
+
+    def start(self):
+        if not self.active or self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="true-cache-monitor", daemon=True)
+        self._thread.start()
+        logger.info(f"True Cache monitor started (interval={self.probe_interval}s, max_lag={self.max_lag_ms}ms)")
+
+    def stop(self, timeout: float = 5.0):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        for conn in (self._primary, self._cache):
+            release_connection(conn)
+        self._primary = self._cache = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.probe_interval)
+
+    def _scn(self, attr: str, read: bool) -> int:
+        # Dedicated standalone connections, so probes neither queue behind nor count in the request pools
+        conn = getattr(self, attr)
+        if conn is None:
+            conn = connect_standalone(read=read)
+            conn.call_timeout = TRUE_CACHE_PROBE_TIMEOUT_MS
+            setattr(self, attr, conn)
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(SELECT_SCN_SQL)
+                return int(cursor.fetchone()[0])
+            finally:
+                cursor.close()
+        except Exception:
+            setattr(self, attr, None)
+            release_connection(conn)
+            raise
+
+    def probe(self):
+        """One health check: primary SCN first, then True Cache SCN, so the sample time is a lower bound."""
+        sampled_at = _now_ms()
+        try:
+            primary_scn = self._scn("_primary", read=False)
+        except Exception as e:
+            # Cannot judge True Cache without the primary; keep the current state
+            logger.warning(f"True Cache monitor could not read the primary SCN: {e}")
+            with self._lock:
+                self.probe_errors += 1
+            return
+        try:
+            cache_scn = self._scn("_cache", read=True)
+        except Exception as e:
+            self.cache_failed(e)
+            return
+
+        with self._lock:
+            self.probes += 1
+            self.consecutive_failures = 0
+            self.last_error = None
+            self.primary_scn, self.cache_scn = primary_scn, cache_scn
+            self._samples.append((sampled_at, primary_scn))
+            while len(self._samples) > 1 and self._samples[1][1] <= cache_scn:
+                self._samples.popleft()
+            oldest_at, oldest_scn = self._samples[0]
+            if oldest_scn <= cache_scn:
+                self.covered_until_ms = max(self.covered_until_ms, oldest_at)
+                self.lag_ms = sampled_at - oldest_at
+            else:
+                # Behind every sample still held: the lag is at least the age of the last covered one
+                self.lag_ms = sampled_at - (self.covered_until_ms or oldest_at)
+            self._set_state("lagging" if self.lag_ms > self.max_lag_ms else "healthy")
+
+    def cache_failed(self, error: Exception):
+        """Records a failed True Cache probe or acquire; enough in a row mark it unreachable."""
+        with self._lock:
+            self.probe_errors += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error)
+            if self.consecutive_failures >= self.failure_threshold:
+                self._set_state("unreachable")
+
+    def _set_state(self, state: str):
+        # Caller holds self._lock
+        if state == self.state:
+            return
+        if state == "healthy":
+            if self.state != "unknown":
+                self.recoveries += 1
+                logger.info(f"True Cache recovered (was {self.state}), reads routed to it again")
+        elif self.state in ("healthy", "unknown"):
+            self.failovers += 1
+            logger.warning(f"True Cache {state} (lag_ms={self.lag_ms}, error={self.last_error}), reads fail over to the primary")
+        self.state = state
+
+    # --- Routing ---
+
+    def route(self, token: Optional[str]) -> Tuple[str, str]:
+        """Returns (target, reason); target is "cache" or "primary"."""
+        if not self.enabled:
+            return "primary", "true_cache_disabled"
+        if not self.consistency:
+            return "cache", "routing_disabled"
+        try:
+            written_at = parse_token(token)
+        except ValueError:
+            return "primary", "invalid_token"
+        with self._lock:
+            if self.state != "healthy":
+                return "primary", self.state
+            if written_at is None:
+                return "cache", "no_token"
+            if self.covered_until_ms >= written_at + self.clock_skew_ms:
+                return "cache", "caught_up"
+            return "primary", "behind"
+
+    def _count(self, target: str, reason: str):
+        with self._lock:
+            counts = self.routes[target]
+            counts[reason] = counts.get(reason, 0) + 1
+
+    def acquire_read(self, token: Optional[str] = None):
+        """Read connection for a request carrying token (the X-Consistency-Token header value, if any)."""
+        target, reason = self.route(token)
+        if target == "cache":
+            try:
+                conn = get_read_connection()
+                self._count(target, reason)
+                return conn
+            except oracledb.Error as e:
+                self.cache_failed(e)
+                reason = "acquire_failed"
+        self._count("primary", reason)
+        return get_write_connection() if self.enabled else get_read_connection()
+
+    async def acquire_read_async(self, token: Optional[str] = None):
+        target, reason = self.route(token)
+        if target == "cache":
+            try:
+                conn = await get_read_connection_async()
+                self._count(target, reason)
+                return conn
+            except oracledb.Error as e:
+                self.cache_failed(e)
+                reason = "acquire_failed"
+        self._count("primary", reason)
+        return await (get_write_connection_async() if self.enabled else get_read_connection_async())
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "consistency_routing": self.consistency,
+                "state": self.state,
+                "primary_scn": self.primary_scn,
+                "cache_scn": self.cache_scn,
+                "lag_ms": self.lag_ms,
+                "covered_until_ms": self.covered_until_ms or None,
+                "probes": self.probes,
+                "probe_errors": self.probe_errors,
+                "consecutive_failures": self.consecutive_failures,
+                "last_error": self.last_error,
+                "failovers": self.failovers,
+                "recoveries": self.recoveries,
+                "routes": {target: dict(counts) for target, counts in self.routes.items()}
+            }
+
+read_router = ConsistencyRouter()
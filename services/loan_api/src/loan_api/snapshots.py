@@ -0,0 +1,145 @@
+"""
+Application snapshot cache for GET /applications/{id}.
+
+Each entry holds the serialized ApplicationResponse of one application with
+the updated_at value of the row it was read from, which is also the version
+behind the ETag. With APP_SNAPSHOT_VALIDATE=version (default), every read
+first fetches updated_at alone (primary-key lookup, no JSON columns): a
+matching If-None-Match returns 304 and a cached body of the same version is
+served as-is, so writes from other workers are never missed. With
+APP_SNAPSHOT_VALIDATE=ttl, cached bodies are served without the version
+query and may trail other workers' writes by up to the TTL.
+
+Write paths in this process call invalidate_application() once their change has
+committed; dropping the entry earlier would let a concurrent read cache the old
+row again.
+"""
+import hashlib
+import os
+from typing import Any, NamedTuple, Optional
+
+from fastapi import HTTPException, Response
+
+from .cache import LRUCache
+from .db import load_json, load_json_async
+from .models import ApplicationResponse
+from .storage import application_repo
+
+APP_SNAPSHOT_VALIDATE = os.environ.get("APP_SNAPSHOT_VALIDATE", "version").lower()
+if APP_SNAPSHOT_VALIDATE not in ("version", "ttl"):
+    raise ValueError(f"APP_SNAPSHOT_VALIDATE must be 'version' or 'ttl', got '{APP_SNAPSHOT_VALIDATE}'")
+
+application_snapshots = LRUCache(
+    max_entries=int(os.environ.get("APP_SNAPSHOT_CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(os.environ.get("APP_SNAPSHOT_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl_seconds=float(os.environ.get("APP_SNAPSHOT_CACHE_TTL_SECONDS", "30"))
+)
+
+class Snapshot(NamedTuple):
+    version: Any # updated_at of the row
+    etag: str
+    body: Optional[str] # ApplicationResponse JSON; None when the client's copy is current (304)
+
+def invalidate_application(app_id: Optional[str] = None):
+    """Drops one application (or everything) from the snapshot cache."""
+    if app_id is None:
+        application_snapshots.clear()
+    else:
+        application_snapshots.invalidate(app_id)
+
+def make_etag(app_id: str, version: Any) -> str:
+    return '"' + hashlib.sha256(f"{app_id}|{version}".encode("utf-8")).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110): W/"x" matches "x"
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def snapshot_response(snapshot: Snapshot, if_none_match: Optional[str]) -> Response:
+    headers = {"ETag": snapshot.etag}
+    if snapshot.body is None or etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+def _not_found():
+    return HTTPException(status_code=404, detail="Application not found")
+
+def _cached(app_id: str, version: Any) -> Optional[Snapshot]:
+    cached = application_snapshots.get(app_id)
+    if cached is None or (version is not None and cached.version != version):
+        return None
+    return cached
+
+def _store(app_id: str, version: Any, data: dict) -> Snapshot:
+    body = ApplicationResponse.model_validate(data).model_dump_json()
+    snapshot = Snapshot(version, make_etag(app_id, version), body)
+    application_snapshots.put(app_id, snapshot, size=len(body))
+    return snapshot
+
+def get_snapshot(conn, app_id: str, if_none_match: Optional[str] = None) -> Snapshot:
+    cursor = conn.cursor()
+    try:
+        version = None
+        if APP_SNAPSHOT_VALIDATE == "version":
+            cursor.execute(*application_repo.select_version(app_id))
+            row = cursor.fetchone()
+            if not row:
+                raise _not_found()
+            version = row[0]
+            etag = make_etag(app_id, version)
+            if etag_matches(if_none_match, etag):
+                return Snapshot(version, etag, None)
+        cached = _cached(app_id, version)
+        if cached:
+            return cached
+
+        cursor.execute(*application_repo.select_snapshot(app_id))
+        row = cursor.fetchone()
+        if not row:
+            raise _not_found()
+        data = {
+            "id": row[0],
+            "status": row[1],
+            "applicant_data": load_json(row[2]),
+            "decision_data": load_json(row[3]),
+            "created_at": str(row[4])
+        }
+        return _store(app_id, row[5], data)
+    finally:
+        cursor.close()
+
+async def get_snapshot_async(conn, app_id: str, if_none_match: Optional[str] = None) -> Snapshot:
+    # Same as get_snapshot on an AsyncConnection
+    cursor = conn.cursor()
+    try:
+        version = None
+        if APP_SNAPSHOT_VALIDATE == "version":
+            await cursor.execute(*application_repo.select_version(app_id))
+            row = await cursor.fetchone()
+            if not row:
+                raise _not_found()
+            version = row[0]
+            etag = make_etag(app_id, version)
+            if etag_matches(if_none_match, etag):
+                return Snapshot(version, etag, None)
+        cached = _cached(app_id, version)
+        if cached:
+            return cached
+
+        await cursor.execute(*application_repo.select_snapshot(app_id))
+        row = await cursor.fetchone()
+        if not row:
+            raise _not_found()
+        data = {
+            "id": row[0],
+            "status": row[1],
+            "applicant_data": await load_json_async(row[2]),
+            "decision_data": await load_json_async(row[3]),
+            "created_at": str(row[4])
+        }
+        return _store(app_id, row[5], data)
+    finally:
+        cursor.close()
@@ -0,0 +1,21 @@
+"""
+Storage layer: the statements of loan_api, grouped by repository (see storage.base).
+
+The repositories of the configured DB_BACKEND are created here; callers run their
+ops on connections from loan_api.db, which serves the same backend:
+
+    cursor.execute(*application_repo.select(app_id))
+"""
+from ..db import DB_BACKEND
+from .base import Op
+
+if DB_BACKEND == "embedded":
+    from . import sqlite as _backend
+else:
+    from . import oracle as _backend
+
+idempotency_repo = _backend.IdempotencyRepository()
+application_repo = _backend.ApplicationRepository()
+plan_repo = _backend.PlanRepository()
+audit_repo = _backend.AuditRepository()
+redecision_repo = _backend.RedecisionRepository()
@@ -0,0 +1,158 @@
+"""
+Repository interface of the storage layer.
+
+Each repository holds the statements of one group of tables as *_SQL attributes,
+which the backends (storage.oracle, storage.sqlite) set, and builds (statement,
+binds) ops from them. The binds are built here, so callers pass the same values
+whatever the backend. An op runs as is on a sync or async cursor, in a pipeline
+or in a PL/SQL batch (loan_api.db.plsql_batch); executemany callers use the
+statement attribute with rows in the bind order of the matching op.
+"""
+import datetime
+from typing import Any, Dict, Optional, Tuple
+
+Op = Tuple[str, Any] # (statement, binds)
+
+class IdempotencyRepository:
+    # binds key, route, phash, request_mode, execution_mode, lease_seconds;
+    # out binds (cursor.var) outcome, existing_route, response_body
+    CHECK_AND_LOCK_SQL: str
+    COMPLETE_SQL: str
+    # Bulk path (check_and_lock_many): rows of key, route, phash, request_mode, execution_mode
+    LOCK_INSERT_SQL: str
+    FAIL_SQL: str
+
+    def complete(self, key: str, route: str, status_code: int, body_json: str) -> Op:
+        return (self.COMPLETE_SQL, [status_code, body_json, key, route])
+
+    def fail(self, key: str, route: str) -> Op:
+        return (self.FAIL_SQL, [key, route])
+
+class ApplicationRepository:
+    """Applications, their status transitions and bookings."""
+    INSERT_APPLICATION_SQL: str
+    SELECT_APPLICATION_SQL: str
+    SELECT_APPLICATION_VERSION_SQL: str
+    SELECT_APPLICATION_SNAPSHOT_SQL: str
+    # One statement per decision_data field (kyc_result, fraud_result, credit_score)
+    PATCH_DECISION_DATA_SQL: Dict[str, str]
+    # The same; updating no row raises ORA-20404
+    PATCH_DECISION_DATA_CHECKED_SQL: Dict[str, str]
+    PERSIST_DECISION_SQL: str
+    ACCEPT_OFFER_SQL: str
+    BOOK_APPLICATION_SQL: str
+    # Array DML of loan_api.bookings: rows of application id
+    BOOK_TRANSITION_SQL: str
+    INSERT_BOOKING_SQL: str
+    SELECT_STATUSES_SQL: str
+
+    def insert(self, app_id: str, applicant_json: str) -> Op:
+        return (self.INSERT_APPLICATION_SQL, [app_id, applicant_json])
+
+    def select(self, app_id: str) -> Op:
+        return (self.SELECT_APPLICATION_SQL, [app_id])
+
+    def select_version(self, app_id: str) -> Op:
+        return (self.SELECT_APPLICATION_VERSION_SQL, [app_id])
+
+    def select_snapshot(self, app_id: str) -> Op:
+        return (self.SELECT_APPLICATION_SNAPSHOT_SQL, [app_id])
+
+    def patch_decision_data(self, app_id: str, field: str, value_json: str, checked: bool = True) -> Op:
+        statements = self.PATCH_DECISION_DATA_CHECKED_SQL if checked else self.PATCH_DECISION_DATA_SQL
+        return (statements[field], [value_json, app_id])
+
+    def persist_decision(self, app_id: str, decision: str, result_json: str) -> Op:
+        return (self.PERSIST_DECISION_SQL, [decision, result_json, app_id])
+
+    def accept_offer(self, app_id: str, details_json: str) -> Op:
+        return (self.ACCEPT_OFFER_SQL, {"app_id": app_id, "action": "OFFER_ACCEPTED", "details": details_json})
+
+    def book(self, app_id: str, booking_id: str, activation_date: Optional[str], details_json: str) -> Op:
+        return (self.BOOK_APPLICATION_SQL, {
+            "app_id": app_id, "booking_id": booking_id, "activation_date": activation_date,
+            "action": "BOOKING_CREATED", "details": details_json
+        })
+
+    def booking_row(self, booking_id: str, app_id: str, activation_date: Optional[str]) -> Dict:
+        """Binds of INSERT_BOOKING_SQL (executemany)."""
+        return {"booking_id": booking_id, "app_id": app_id, "activation_date": activation_date}
+
+    def select_statuses(self, ids_json: str) -> Op:
+        return (self.SELECT_STATUSES_SQL, [ids_json])
+
+class PlanRepository:
+    """Decision plans and the decision_cache table."""
+    INSERT_PLAN_SQL: str
+    SELECT_PLAN_SUMMARY_SQL: str
+    MARK_PLAN_EXECUTED_SQL: str
+    SELECT_DECISION_CACHE_SQL: str
+    # executemany rows of {"cache_key", "result"}
+    INSERT_DECISION_CACHE_SQL: str
+
+    def insert(self, plan_id: str, workspace_id: str, app_id: str, idempotency_key: str,
+               inputs_hash: str, plan_json: str, status: str) -> Op:
+        return (self.INSERT_PLAN_SQL, [plan_id, workspace_id, app_id, idempotency_key, inputs_hash, plan_json, status])
+
+    def select_summary(self, plan_id: str) -> Op:
+        return (self.SELECT_PLAN_SUMMARY_SQL, [plan_id])
+
+    def mark_executed(self, plan_id: str) -> Op:
+        return (self.MARK_PLAN_EXECUTED_SQL, [plan_id])
+
+    def select_cached_decisions(self, keys_json: str) -> Op:
+        return (self.SELECT_DECISION_CACHE_SQL, [keys_json])
+
+class AuditRepository:
+    # executemany rows of application_id, action, details (audit.AuditRecord)
+    INSERT_AUDIT_SQL: str
+    SELECT_AUDIT_SQL: str
+    # Keyset paging on the (application_id, created_at, id) index: SELECT_AUDIT_PAGE_SQL,
+    # then AUDIT_PAGE_AFTER_SQL after a position, the ordering and AUDIT_PAGE_LIMIT_SQL
+    SELECT_AUDIT_PAGE_SQL: str
+    AUDIT_PAGE_AFTER_SQL: str
+    AUDIT_PAGE_LIMIT_SQL: str
+
+    def insert(self, app_id: str, action: str, details_json: str) -> Op:
+        return (self.INSERT_AUDIT_SQL, [app_id, action, details_json])
+
+    def select(self, app_id: str) -> Op:
+        return (self.SELECT_AUDIT_SQL, [app_id])
+
+    def page(self, app_id: str, after: Optional[Tuple[datetime.datetime, int]], limit: Optional[int]) -> Op:
+        """Audit rows after the (created_at, id) position, optionally limited."""
+        sql = self.SELECT_AUDIT_PAGE_SQL
+        binds: Dict[str, Any] = {"app_id": app_id}
+        if after:
+            sql += self.AUDIT_PAGE_AFTER_SQL
+            binds.update(after_ts=after[0], after_id=after[1])
+        sql += " ORDER BY created_at, id"
+        if limit:
+            sql += self.AUDIT_PAGE_LIMIT_SQL
+            binds["limit"] = limit
+        return sql, binds
+
+class RedecisionRepository:
+    """Jobs and results of loan_api.redecide."""
+    SELECT_CHUNK_SQL: str
+    INSERT_JOB_SQL: str
+    SELECT_JOB_SQL: str
+    CHECKPOINT_SQL: str
+    FINISH_SQL: str
+    # executemany rows of job_id, application_id, old_decision, new_decision, reason_codes, pricing
+    INSERT_RESULT_SQL: str
+
+    def select_chunk(self, after: str, chunk: int) -> Op:
+        return (self.SELECT_CHUNK_SQL, {"after": after, "chunk": chunk})
+
+    def insert_job(self, job_id: str, policy_json: str, last_id: str) -> Op:
+        return (self.INSERT_JOB_SQL, [job_id, policy_json, last_id])
+
+    def select_job(self, job_id: str) -> Op:
+        return (self.SELECT_JOB_SQL, [job_id])
+
+    def checkpoint(self, job_id: str, last_id: str, processed: int, changed: int, skipped: int) -> Op:
+        return (self.CHECKPOINT_SQL, [last_id, processed, changed, skipped, job_id])
+
+    def finish(self, job_id: str) -> Op:
+        return (self.FINISH_SQL, [job_id])
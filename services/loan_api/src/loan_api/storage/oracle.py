@@ -0,0 +1,223 @@
+"""
+Oracle implementation of the repositories (DB_BACKEND=oracle).
+
+Schema: infra/db/oracle/init. The guarded writes (idempotency check-and-lock,
+offer / booking transitions, updates that must hit a row) are PL/SQL blocks:
+one round trip each, raising ORA-20404 / ORA-20409 (see loan_api.lifecycle).
+"""
+from ..lifecycle import APP_NOT_FOUND_ERROR, INVALID_TRANSITION_ERROR, TRANSITIONS
+from . import base
+
+def must_update(sql: str) -> str:
+    """Wraps an UPDATE of one application so that updating no row raises ORA-20404."""
+    return (f"BEGIN {sql}; IF SQL%ROWCOUNT = 0 THEN "
+            f"RAISE_APPLICATION_ERROR(-{APP_NOT_FOUND_ERROR}, 'Application not found'); END IF; END;")
+
+def _in_list(statuses) -> str:
+    return ", ".join(f"'{s}'" for s in statuses)
+
+def _transition_block(target: str, returning: str = "", then: str = "") -> str:
+    # Conditional update plus audit row; the current status is only read when nothing was updated
+    allowed = TRANSITIONS[target]
+    return f"""
+    DECLARE
+        v_status applications.status%TYPE;
+        v_principal NUMBER;
+    BEGIN
+        UPDATE applications
+           SET status = '{target}', updated_at = CURRENT_TIMESTAMP
+         WHERE id = :app_id AND status IN ({_in_list(allowed)})
+        {returning};
+        IF SQL%ROWCOUNT = 0 THEN
+            SELECT status INTO v_status FROM applications WHERE id = :app_id;
+            RAISE_APPLICATION_ERROR(-{INVALID_TRANSITION_ERROR},
+                'Application is ' || v_status || ', expected {" or ".join(allowed)}');
+        END IF;
+        {then}
+        INSERT INTO audit_logs (application_id, action, details) VALUES (:app_id, :action, :details);
+    EXCEPTION
+        WHEN NO_DATA_FOUND THEN
+            RAISE_APPLICATION_ERROR(-{APP_NOT_FOUND_ERROR}, 'Application not found');
+    END;"""
+
+# activation_date stays free text (it is kept as sent in the audit row); a value
+# that is not YYYY-MM-DD books with the booking day instead of failing the request
+BOOKING_ACTIVATION_DATE = "NVL(TO_DATE(:activation_date DEFAULT NULL ON CONVERSION ERROR, 'YYYY-MM-DD'), TRUNC(SYSDATE))"
+
+class IdempotencyRepository(base.IdempotencyRepository):
+    # Single round trip: try to insert the lock row; on a duplicate key, inspect the
+    # existing row (locked FOR UPDATE) and either report the outcome or re-lock it.
+    # IN_PROGRESS rows whose lease (updated_at + :lease_seconds) expired are re-locked.
+    # The unique index on idempotency_key (01_schema.sql) makes cross-route reuse
+    # surface as DUP_VAL_ON_INDEX too, so no prior SELECT is needed.
+    CHECK_AND_LOCK_SQL = """
+        DECLARE
+            v_route   idempotency_keys.route_path%TYPE;
+            v_hash    idempotency_keys.payload_hash%TYPE;
+            v_status  idempotency_keys.status%TYPE;
+            v_updated idempotency_keys.updated_at%TYPE;
+        BEGIN
+            BEGIN
+                INSERT INTO idempotency_keys
+                    (idempotency_key, route_path, payload_hash, request_mode, execution_mode, status)
+                VALUES (:key, :route, :phash, :request_mode, :execution_mode, 'IN_PROGRESS');
+                :outcome := 'LOCKED';
+            EXCEPTION
+                WHEN DUP_VAL_ON_INDEX THEN
+                    SELECT route_path, payload_hash, status, updated_at, response_body
+                      INTO v_route, v_hash, v_status, v_updated, :response_body
+                      FROM idempotency_keys
+                     WHERE idempotency_key = :key
+                       FOR UPDATE;
+
+                    :existing_route := v_route;
+                    IF v_route != :route OR v_hash != :phash THEN
+                        :outcome := 'CONFLICT';
+                    ELSIF v_status = 'COMPLETED' THEN
+                        :outcome := v_status;
+                    ELSIF v_status = 'IN_PROGRESS'
+                          AND v_updated > LOCALTIMESTAMP - NUMTODSINTERVAL(:lease_seconds, 'SECOND') THEN
+                        :outcome := v_status;
+                    ELSE
+                        -- FAILED, other, or an expired IN_PROGRESS lease: retryable, take the lock again
+                        UPDATE idempotency_keys
+                           SET status = 'IN_PROGRESS', updated_at = CURRENT_TIMESTAMP
+                         WHERE idempotency_key = :key AND route_path = :route;
+                        :outcome := CASE WHEN v_status = 'IN_PROGRESS' THEN 'RECLAIMED' ELSE 'LOCKED' END;
+                    END IF;
+            END;
+            COMMIT;
+        END;
+    """
+
+    COMPLETE_SQL = """
+        UPDATE idempotency_keys
+        SET status = 'COMPLETED',
+            response_code = :1,
+            response_body = :2,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE idempotency_key = :3 AND route_path = :4
+    """
+
+    # Plain inserts, duplicates are reported as batch errors
+    LOCK_INSERT_SQL = """
+        INSERT INTO idempotency_keys
+            (idempotency_key, route_path, payload_hash, request_mode, execution_mode, status)
+        VALUES (:1, :2, :3, :4, :5, 'IN_PROGRESS')
+    """
+
+    # Only an IN_PROGRESS key fails: a COMPLETED one keeps its stored response
+    FAIL_SQL = """
+        UPDATE idempotency_keys
+        SET status = 'FAILED', updated_at = CURRENT_TIMESTAMP
+        WHERE idempotency_key = :1 AND route_path = :2 AND status = 'IN_PROGRESS'
+    """
+
+class ApplicationRepository(base.ApplicationRepository):
+    INSERT_APPLICATION_SQL = "INSERT INTO applications (id, status, applicant_data, decision_data) VALUES (:1, 'NEW', :2, '{}')"
+    SELECT_APPLICATION_SQL = "SELECT id, status, applicant_data, decision_data, created_at FROM applications WHERE id = :1"
+    # Version check of the snapshot cache: primary-key lookup, no JSON columns
+    SELECT_APPLICATION_VERSION_SQL = "SELECT updated_at FROM applications WHERE id = :1"
+    SELECT_APPLICATION_SNAPSHOT_SQL = "SELECT id, status, applicant_data, decision_data, created_at, updated_at FROM applications WHERE id = :1"
+
+    # Server-side patch of a single decision_data field (JSON paths cannot be bound, hence one statement per field)
+    PATCH_DECISION_DATA_SQL = {
+        field: f"""UPDATE applications
+                      SET decision_data = JSON_TRANSFORM(NVL(decision_data, JSON('{{}}')), SET '$.{field}' = :1 FORMAT JSON),
+                          updated_at = CURRENT_TIMESTAMP
+                    WHERE id = :2"""
+        for field in ("kyc_result", "fraud_result", "credit_score")
+    }
+    PATCH_DECISION_DATA_CHECKED_SQL = {field: must_update(sql) for field, sql in PATCH_DECISION_DATA_SQL.items()}
+
+    # Only until an offer is accepted (DECIDABLE_STATUSES in loan_api.lifecycle). The result is
+    # merged into decision_data, so the check results stay next to it (re-decisioning reads them)
+    PERSIST_DECISION_SQL = (
+        "UPDATE applications SET status = :1, "
+        "decision_data = JSON_MERGEPATCH(NVL(decision_data, JSON('{}')), :2 RETURNING JSON), updated_at = CURRENT_TIMESTAMP "
+        "WHERE id = :3 AND status IN ('NEW', 'APPROVE', 'REJECT')"
+    )
+
+    ACCEPT_OFFER_SQL = _transition_block("OFFER_ACCEPTED")
+    BOOK_APPLICATION_SQL = _transition_block(
+        "BOOKED",
+        returning="RETURNING JSON_VALUE(applicant_data, '$.amount' RETURNING NUMBER) INTO v_principal",
+        then=f"""INSERT INTO bookings (booking_id, application_id, activation_date, principal)
+                 VALUES (:booking_id, :app_id, {BOOKING_ACTIVATION_DATE}, v_principal);"""
+    )
+
+    # The same transition without the state lookup, for array DML
+    BOOK_TRANSITION_SQL = f"""
+    UPDATE applications
+       SET status = 'BOOKED', updated_at = CURRENT_TIMESTAMP
+     WHERE id = :1 AND status IN ({_in_list(TRANSITIONS["BOOKED"])})
+"""
+    INSERT_BOOKING_SQL = f"""
+    INSERT INTO bookings (booking_id, application_id, activation_date, principal)
+    SELECT :booking_id, id, {BOOKING_ACTIVATION_DATE}, JSON_VALUE(applicant_data, '$.amount' RETURNING NUMBER)
+      FROM applications
+     WHERE id = :app_id
+"""
+    SELECT_STATUSES_SQL = """
+    SELECT id, status FROM applications
+     WHERE id IN (SELECT jt.id FROM JSON_TABLE(:1, '$[*]' COLUMNS (id VARCHAR2(50) PATH '$')) jt)
+"""
+
+class PlanRepository(base.PlanRepository):
+    INSERT_PLAN_SQL = """INSERT INTO decision_plans
+           (plan_id, workspace_id, application_id, idempotency_key, inputs_hash, plan_json, status)
+           VALUES (:1, :2, :3, :4, :5, :6, :7)"""
+
+    # Plan fields needed to execute by reference, without transferring plan_json
+    SELECT_PLAN_SUMMARY_SQL = """
+    SELECT application_id, workspace_id, inputs_hash, status,
+           JSON_VALUE(plan_json, '$.recommended_decision'),
+           JSON_VALUE(plan_json, '$.scenario_results.size()' RETURNING NUMBER)
+      FROM decision_plans
+     WHERE plan_id = :1
+"""
+
+    # Conditional transition: only a CREATED plan can be executed. The row lock also
+    # serializes concurrent executes of the same plan under different idempotency keys.
+    MARK_PLAN_EXECUTED_SQL = "UPDATE decision_plans SET status = 'EXECUTED', executed_at = CURRENT_TIMESTAMP WHERE plan_id = :1 AND status = 'CREATED'"
+
+    SELECT_DECISION_CACHE_SQL = """
+    SELECT cache_key, result FROM decision_cache
+     WHERE cache_key IN (SELECT jt.cache_key FROM JSON_TABLE(:1, '$[*]' COLUMNS (cache_key VARCHAR2(200) PATH '$')) jt)
+"""
+    INSERT_DECISION_CACHE_SQL = """
+    MERGE INTO decision_cache d
+    USING (SELECT :cache_key AS cache_key FROM dual) s
+    ON (d.cache_key = s.cache_key)
+    WHEN NOT MATCHED THEN INSERT (cache_key, result) VALUES (s.cache_key, :result)
+"""
+
+class AuditRepository(base.AuditRepository):
+    INSERT_AUDIT_SQL = "INSERT INTO audit_logs (application_id, action, details) VALUES (:1, :2, :3)"
+    SELECT_AUDIT_SQL = "SELECT id, action, details, created_at FROM audit_logs WHERE application_id = :1 ORDER BY created_at, id"
+    # Keyset paging on the (application_id, created_at, id) index, see 01_schema.sql
+    SELECT_AUDIT_PAGE_SQL = "SELECT id, action, details, created_at FROM audit_logs WHERE application_id = :app_id"
+    AUDIT_PAGE_AFTER_SQL = " AND (created_at > :after_ts OR (created_at = :after_ts AND id > :after_id))"
+    AUDIT_PAGE_LIMIT_SQL = " FETCH FIRST :limit ROWS ONLY"
+
+class RedecisionRepository(base.RedecisionRepository):
+    SELECT_CHUNK_SQL = """
+    SELECT id, status, applicant_data, decision_data
+      FROM applications
+     WHERE id > :after
+     ORDER BY id
+     FETCH FIRST :chunk ROWS ONLY
+"""
+
+    INSERT_JOB_SQL = "INSERT INTO redecision_jobs (job_id, status, policy, last_application_id) VALUES (:1, 'RUNNING', :2, :3)"
+    SELECT_JOB_SQL = "SELECT status, policy, last_application_id, processed, changed, skipped FROM redecision_jobs WHERE job_id = :1"
+    CHECKPOINT_SQL = """
+    UPDATE redecision_jobs
+       SET last_application_id = :1, processed = :2, changed = :3, skipped = :4, updated_at = CURRENT_TIMESTAMP
+     WHERE job_id = :5
+"""
+    FINISH_SQL = "UPDATE redecision_jobs SET status = 'COMPLETED', finished_at = CURRENT_TIMESTAMP WHERE job_id = :1"
+    INSERT_RESULT_SQL = """
+    INSERT INTO redecision_results (job_id, application_id, old_decision, new_decision, reason_codes, pricing)
+    VALUES (:1, :2, :3, :4, :5, :6)
+"""
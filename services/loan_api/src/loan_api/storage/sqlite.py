@@ -0,0 +1,184 @@
+"""
+SQLite implementation of the repositories (DB_BACKEND=embedded, see loan_api.embedded).
+
+Same statements, binds and outcomes as storage.oracle. Positional binds are
+written ?1, ?2, ... for Oracle's :1, :2, ...; named binds keep their names. The
+PL/SQL blocks are procedures: Python functions run by the embedded engine in the
+caller's transaction, setting the same out binds and raising the same ORA- errors.
+"""
+import datetime
+import sqlite3
+
+from ..embedded import NOW, ora_error, procedure
+from ..lifecycle import APP_NOT_FOUND_ERROR, INVALID_TRANSITION_ERROR, TRANSITIONS
+from . import base
+
+def _in_list(statuses) -> str:
+    return ", ".join(f"'{s}'" for s in statuses)
+
+# Dates that are not YYYY-MM-DD book with the booking day, as on Oracle
+BOOKING_ACTIVATION_DATE = "COALESCE(date(:activation_date), date('now', 'localtime'))"
+
+def must_update(sql: str) -> str:
+    """Procedure running an UPDATE of one application; updating no row raises ORA-20404."""
+    def run(db: sqlite3.Connection, binds):
+        count = db.execute(sql, binds).rowcount
+        if not count:
+            raise ora_error(APP_NOT_FOUND_ERROR, "Application not found")
+        return [], count
+    return procedure(f"must_update({sql})", run)
+
+def _check_and_lock(db: sqlite3.Connection, binds):
+    # The insert takes the write lock, which stands in for FOR UPDATE
+    key, route, phash = binds["key"], binds["route"], binds["phash"]
+    try:
+        db.execute(
+            "INSERT INTO idempotency_keys (idempotency_key, route_path, payload_hash, request_mode, execution_mode, status, created_at, updated_at) "
+            f"VALUES (?1, ?2, ?3, ?4, ?5, 'IN_PROGRESS', {NOW}, {NOW})",
+            [key, route, phash, binds["request_mode"], binds["execution_mode"]]
+        )
+        binds["outcome"].setvalue(0, "LOCKED")
+    except sqlite3.IntegrityError:
+        row = db.execute(
+            "SELECT route_path, payload_hash, status, updated_at, response_body FROM idempotency_keys WHERE idempotency_key = ?1",
+            [key]
+        ).fetchone()
+        if row is None:
+            raise ora_error(1403, "no data found")
+        existing_route, existing_hash, status, updated_at, body = row
+        binds["response_body"].setvalue(0, body)
+        binds["existing_route"].setvalue(0, existing_route)
+        lease_start = datetime.datetime.now() - datetime.timedelta(seconds=binds["lease_seconds"])
+        if existing_route != route or existing_hash != phash:
+            binds["outcome"].setvalue(0, "CONFLICT")
+        elif status == "COMPLETED" or (status == "IN_PROGRESS" and updated_at > lease_start):
+            binds["outcome"].setvalue(0, status)
+        else:
+            # FAILED, other, or an expired IN_PROGRESS lease: retryable, take the lock again
+            db.execute(
+                f"UPDATE idempotency_keys SET status = 'IN_PROGRESS', updated_at = {NOW} WHERE idempotency_key = ?1 AND route_path = ?2",
+                [key, route]
+            )
+            binds["outcome"].setvalue(0, "RECLAIMED" if status == "IN_PROGRESS" else "LOCKED")
+    db.commit()
+    return [], 1
+
+def _transition(target: str, insert_booking: bool = False):
+    # Conditional update plus audit row; the current status is only read when nothing was updated
+    allowed = TRANSITIONS[target]
+
+    def run(db: sqlite3.Connection, binds):
+        app_id = binds["app_id"]
+        row = db.execute(
+            f"UPDATE applications SET status = ?, updated_at = {NOW} "
+            f"WHERE id = ? AND status IN ({', '.join('?' * len(allowed))}) "
+            "RETURNING json_extract(applicant_data, '$.amount')",
+            [target, app_id, *allowed]
+        ).fetchone()
+        if row is None:
+            current = db.execute("SELECT status FROM applications WHERE id = ?1", [app_id]).fetchone()
+            if current is None:
+                raise ora_error(APP_NOT_FOUND_ERROR, "Application not found")
+            raise ora_error(INVALID_TRANSITION_ERROR, f"Application is {current[0]}, expected {' or '.join(allowed)}")
+        if insert_booking:
+            db.execute(
+                "INSERT INTO bookings (booking_id, application_id, activation_date, principal, created_at) "
+                f"VALUES (:booking_id, :app_id, {BOOKING_ACTIVATION_DATE}, :principal, {NOW})",
+                {"booking_id": binds["booking_id"], "app_id": app_id, "activation_date": binds["activation_date"], "principal": row[0]}
+            )
+        db.execute(
+            f"INSERT INTO audit_logs (application_id, action, details, created_at) VALUES (?1, ?2, ?3, {NOW})",
+            [app_id, binds["action"], binds["details"]]
+        )
+        return [], 1
+    return run
+
+class IdempotencyRepository(base.IdempotencyRepository):
+    CHECK_AND_LOCK_SQL = procedure("check_and_lock", _check_and_lock)
+    COMPLETE_SQL = (
+        f"UPDATE idempotency_keys SET status = 'COMPLETED', response_code = ?1, response_body = ?2, updated_at = {NOW} "
+        "WHERE idempotency_key = ?3 AND route_path = ?4"
+    )
+    LOCK_INSERT_SQL = (
+        "INSERT INTO idempotency_keys (idempotency_key, route_path, payload_hash, request_mode, execution_mode, status, created_at, updated_at) "
+        f"VALUES (?1, ?2, ?3, ?4, ?5, 'IN_PROGRESS', {NOW}, {NOW})"
+    )
+    FAIL_SQL = (
+        f"UPDATE idempotency_keys SET status = 'FAILED', updated_at = {NOW} "
+        "WHERE idempotency_key = ?1 AND route_path = ?2 AND status = 'IN_PROGRESS'"
+    )
+
+class ApplicationRepository(base.ApplicationRepository):
+    INSERT_APPLICATION_SQL = (
+        "INSERT INTO applications (id, status, applicant_data, decision_data, created_at, updated_at) "
+        f"VALUES (?1, 'NEW', ?2, '{{}}', {NOW}, {NOW})"
+    )
+    SELECT_APPLICATION_SQL = "SELECT id, status, applicant_data, decision_data, created_at FROM applications WHERE id = ?1"
+    SELECT_APPLICATION_VERSION_SQL = "SELECT updated_at FROM applications WHERE id = ?1"
+    SELECT_APPLICATION_SNAPSHOT_SQL = "SELECT id, status, applicant_data, decision_data, created_at, updated_at FROM applications WHERE id = ?1"
+
+    PATCH_DECISION_DATA_SQL = {
+        field: f"UPDATE applications SET decision_data = json_set(COALESCE(decision_data, '{{}}'), '$.{field}', json(?1)), "
+               f"updated_at = {NOW} WHERE id = ?2"
+        for field in ("kyc_result", "fraud_result", "credit_score")
+    }
+    PATCH_DECISION_DATA_CHECKED_SQL = {field: must_update(sql) for field, sql in PATCH_DECISION_DATA_SQL.items()}
+
+    PERSIST_DECISION_SQL = (
+        f"UPDATE applications SET status = ?1, decision_data = json_patch(COALESCE(decision_data, '{{}}'), ?2), updated_at = {NOW} "
+        "WHERE id = ?3 AND status IN ('NEW', 'APPROVE', 'REJECT')"
+    )
+
+    ACCEPT_OFFER_SQL = procedure("accept_offer", _transition("OFFER_ACCEPTED"))
+    BOOK_APPLICATION_SQL = procedure("book_application", _transition("BOOKED", insert_booking=True))
+
+    BOOK_TRANSITION_SQL = (
+        f"UPDATE applications SET status = 'BOOKED', updated_at = {NOW} "
+        f"WHERE id = ?1 AND status IN ({_in_list(TRANSITIONS['BOOKED'])})"
+    )
+    INSERT_BOOKING_SQL = (
+        "INSERT INTO bookings (booking_id, application_id, activation_date, principal, created_at) "
+        f"SELECT :booking_id, id, {BOOKING_ACTIVATION_DATE}, json_extract(applicant_data, '$.amount'), {NOW} "
+        "FROM applications WHERE id = :app_id"
+    )
+    SELECT_STATUSES_SQL = "SELECT id, status FROM applications WHERE id IN (SELECT value FROM json_each(?1))"
+
+class PlanRepository(base.PlanRepository):
+    INSERT_PLAN_SQL = (
+        "INSERT INTO decision_plans (plan_id, workspace_id, application_id, idempotency_key, inputs_hash, plan_json, status, created_at) "
+        f"VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, {NOW})"
+    )
+    SELECT_PLAN_SUMMARY_SQL = (
+        "SELECT application_id, workspace_id, inputs_hash, status, json_extract(plan_json, '$.recommended_decision'), "
+        "json_array_length(plan_json, '$.scenario_results') FROM decision_plans WHERE plan_id = ?1"
+    )
+    MARK_PLAN_EXECUTED_SQL = f"UPDATE decision_plans SET status = 'EXECUTED', executed_at = {NOW} WHERE plan_id = ?1 AND status = 'CREATED'"
+    SELECT_DECISION_CACHE_SQL = "SELECT cache_key, result FROM decision_cache WHERE cache_key IN (SELECT value FROM json_each(?1))"
+    INSERT_DECISION_CACHE_SQL = (
+        f"INSERT INTO decision_cache (cache_key, result, created_at) VALUES (:cache_key, :result, {NOW}) "
+        "ON CONFLICT (cache_key) DO NOTHING"
+    )
+
+class AuditRepository(base.AuditRepository):
+    INSERT_AUDIT_SQL = f"INSERT INTO audit_logs (application_id, action, details, created_at) VALUES (?1, ?2, ?3, {NOW})"
+    SELECT_AUDIT_SQL = "SELECT id, action, details, created_at FROM audit_logs WHERE application_id = ?1 ORDER BY created_at, id"
+    SELECT_AUDIT_PAGE_SQL = "SELECT id, action, details, created_at FROM audit_logs WHERE application_id = :app_id"
+    AUDIT_PAGE_AFTER_SQL = " AND (created_at > :after_ts OR (created_at = :after_ts AND id > :after_id))"
+    AUDIT_PAGE_LIMIT_SQL = " LIMIT :limit"
+
+class RedecisionRepository(base.RedecisionRepository):
+    SELECT_CHUNK_SQL = "SELECT id, status, applicant_data, decision_data FROM applications WHERE id > :after ORDER BY id LIMIT :chunk"
+    INSERT_JOB_SQL = (
+        "INSERT INTO redecision_jobs (job_id, status, policy, last_application_id, started_at, updated_at) "
+        f"VALUES (?1, 'RUNNING', ?2, ?3, {NOW}, {NOW})"
+    )
+    SELECT_JOB_SQL = "SELECT status, policy, last_application_id, processed, changed, skipped FROM redecision_jobs WHERE job_id = ?1"
+    CHECKPOINT_SQL = (
+        f"UPDATE redecision_jobs SET last_application_id = ?1, processed = ?2, changed = ?3, skipped = ?4, updated_at = {NOW} "
+        "WHERE job_id = ?5"
+    )
+    FINISH_SQL = f"UPDATE redecision_jobs SET status = 'COMPLETED', finished_at = {NOW} WHERE job_id = ?1"
+    INSERT_RESULT_SQL = (
+        "INSERT INTO redecision_results (job_id, application_id, old_decision, new_decision, reason_codes, pricing, created_at) "
+        f"VALUES (?1, ?2, ?3, ?4, ?5, ?6, {NOW})"
+    )
@@ -0,0 +1,11 @@
+"""
+The tests run on the embedded backend (loan_api.embedded) in a temporary
+database, with round-trip counting on. Set DB_BACKEND=oracle and the DB_
+settings of loan_api.db to run the ones that use the pools against Oracle instead.
+"""
+import os
+import tempfile
+
+os.environ.setdefault("DB_BACKEND", "embedded")
+os.environ.setdefault("EMBEDDED_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="loan_api_tests_"), "loan_api.db"))
+os.environ.setdefault("DB_COUNT_ROUND_TRIPS", "true")
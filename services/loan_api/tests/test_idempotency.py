@@ -0,0 +1,51 @@
+"""
+A key is only marked FAILED while IN_PROGRESS: once complete() committed the
+response, a later error (after the commit, or a stray fail()) leaves it COMPLETED.
+"""
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from loan_api import main
+from loan_api.db import get_write_connection, release_connection
+from loan_api.idempotency import IdempotencyManager, invalidate_completed
+
+APPLICANT = {"applicant_id": "a", "applicant_name": "n", "amount": 1000, "income": 90000, "debt": 100}
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app, raise_server_exceptions=False) as c:
+        yield c
+
+def test_fail_keeps_completed_key(client):
+    key, route, body = f"fail-{uuid.uuid4()}", "/applications", {"amount": 1}
+    conn = get_write_connection()
+    try:
+        idem = IdempotencyManager(conn)
+        assert idem.check_and_lock(key, route, body, "POST", "EXECUTE") is None
+        idem.complete(key, route, {"id": "x"})
+        idem.fail(key, route)
+        # Read the stored row, not the in-process replay cache
+        invalidate_completed(key)
+        assert IdempotencyManager(conn).check_and_lock(key, route, body, "POST", "EXECUTE") == {"id": "x"}
+    finally:
+        release_connection(conn)
+
+def test_error_after_commit_replays(client, monkeypatch):
+    key = str(uuid.uuid4())
+    app_id = client.post("/applications", json=APPLICANT, headers={"Idempotency-Key": key}).json()["id"]
+
+    def broken(_):
+        raise RuntimeError("post-commit failure")
+    monkeypatch.setattr(main, "invalidate_application", broken)
+    headers = {"Idempotency-Key": f"{key}-kyc"}
+    assert client.post(f"/applications/{app_id}/kyc", json={"status": "PASS"}, headers=headers).status_code == 500
+    monkeypatch.undo()
+
+    invalidate_completed(f"{key}-kyc")
+    replay = client.post(f"/applications/{app_id}/kyc", json={"status": "PASS"}, headers=headers)
+    assert replay.status_code == 200
+    assert replay.json() == {"status": "Updated", "kyc_result": {"status": "PASS"}}
+    audit = client.get(f"/applications/{app_id}/audit").json()
+    assert [row["action"] for row in audit].count("KYC_UPDATED") == 1
@@ -0,0 +1,72 @@
+"""
+Concurrent requests with one idempotency key: exactly one of them locks the key
+and runs, every other one gets a 409 while it is in progress or the stored
+response once it completed.
+"""
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from loan_api.db import close_db, get_write_connection, init_db, release_connection
+from loan_api.idempotency import IdempotencyManager
+
+THREADS = 16
+ROUTE = "/applications"
+BODY = {"applicant_id": "a", "amount": 1000}
+RESPONSE = {"id": "app-1", "status": "NEW"}
+
+@pytest.fixture(scope="module", autouse=True)
+def pools():
+    init_db()
+    yield
+    close_db()
+
+def check_and_lock(key: str, complete: bool = False):
+    """One request: the HTTPException, the stored response, or None when it locked the key."""
+    conn = get_write_connection()
+    try:
+        manager = IdempotencyManager(conn)
+        result = manager.check_and_lock(key, ROUTE, BODY, "POST", "EXECUTE")
+        if result is None and complete:
+            manager.complete(key, ROUTE, RESPONSE)
+        return result
+    except HTTPException as e:
+        return e
+    finally:
+        release_connection(conn)
+
+def hammer(key: str, complete: bool = False) -> list:
+    """check_and_lock of one key from THREADS threads, started together."""
+    start = threading.Barrier(THREADS)
+
+    def attempt(_):
+        start.wait()
+        return check_and_lock(key, complete)
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        return list(executor.map(attempt, range(THREADS)))
+
+def test_one_winner_while_in_progress():
+    key = f"concurrency-{uuid.uuid4()}"
+    # The winner does not complete: the key stays IN_PROGRESS (committed by check_and_lock)
+    results = hammer(key)
+    assert results.count(None) == 1
+    conflicts = [r for r in results if r is not None]
+    assert all(isinstance(r, HTTPException) and r.status_code == 409 for r in conflicts), conflicts
+
+    conn = get_write_connection()
+    try:
+        IdempotencyManager(conn).complete(key, ROUTE, RESPONSE)
+    finally:
+        release_connection(conn)
+    assert check_and_lock(key) == RESPONSE
+
+def test_one_winner_then_replays():
+    key = f"concurrency-{uuid.uuid4()}"
+    results = hammer(key, complete=True)
+    assert results.count(None) == 1
+    others = [r for r in results if r is not None]
+    assert all(r == RESPONSE or (isinstance(r, HTTPException) and r.status_code == 409) for r in others), others
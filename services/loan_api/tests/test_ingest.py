@@ -0,0 +1,50 @@
+"""
+A vendor file line that is not valid UTF-8 is reported like any other malformed
+record; the rest of the file is applied.
+"""
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from loan_api import main
+from loan_api.ingest import RecordParser, iter_lines
+
+APPLICANT = {"applicant_id": "a", "applicant_name": "n", "amount": 1000, "income": 90000, "debt": 100}
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+def test_parser_reports_undecodable_lines():
+    csv_body = [b"application_id,status\n", b"a1,PASS\n", b"a2,\xff\xfe\n", b"a3,FAIL\n"]
+    records = list(RecordParser("csv").records(iter_lines(csv_body)))
+    assert [(n, r if isinstance(r, dict) else str(r)) for n, r in records] == [
+        (2, {"application_id": "a1", "status": "PASS"}),
+        (3, "Line is not valid UTF-8"),
+        (4, {"application_id": "a3", "status": "FAIL"}),
+    ]
+    # A chunk boundary inside a multi-byte character still decodes
+    ndjson_body = [b'{"application_id": "a1", "note": "caf\xc3', b'\xa9"}\n{"application_id": \x80}\n']
+    records = list(RecordParser("ndjson").records(iter_lines(ndjson_body)))
+    assert records[0] == (1, {"application_id": "a1", "note": "café"})
+    assert str(records[1][1]) == "Line is not valid UTF-8"
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+def test_upload_with_invalid_utf8(client, fmt):
+    key = str(uuid.uuid4())
+    ids = [client.post("/applications", json=APPLICANT, headers={"Idempotency-Key": f"{key}-{i}"}).json()["id"] for i in range(2)]
+    if fmt == "csv":
+        body = f"application_id,status\n{ids[0]},PASS\n".encode() + b"\xff,PASS\n" + f"{ids[1]},PASS\n".encode()
+        content_type, bad_line = "text/csv", 3
+    else:
+        body = (f'{{"application_id": "{ids[0]}", "status": "PASS"}}\n'.encode() + b'{"application_id": "\xff"}\n'
+                + f'{{"application_id": "{ids[1]}", "status": "PASS"}}\n'.encode())
+        content_type, bad_line = "application/x-ndjson", 2
+
+    response = client.post("/ingest/kyc", content=body, headers={"Content-Type": content_type, "Idempotency-Key": f"{key}-ingest"})
+    assert response.status_code == 200, response.text
+    summary = response.json()
+    assert (summary["applied"], summary["failed"]) == (2, 1)
+    assert summary["errors"] == [{"line": bad_line, "application_id": None, "error": "Malformed line: Line is not valid UTF-8"}]
@@ -0,0 +1,60 @@
+"""
+Re-decisioning re-scores decided applications on the check results kept in
+decision_data, so a threshold change shows up as changed decisions.
+"""
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from loan_api import main
+from loan_api.db import get_read_connection, release_connection
+from loan_api.redecide import RedecisionJob
+
+APPLICANT = {"applicant_id": "a", "applicant_name": "n", "amount": 10000, "income": 90000, "debt": 100}
+CREDIT_SCORE = 700
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+@pytest.fixture
+def approved_id(client):
+    key = str(uuid.uuid4())
+    headers = lambda step: {"Idempotency-Key": f"{key}-{step}"}
+    app_id = client.post("/applications", json=APPLICANT, headers=headers("create")).json()["id"]
+    client.post(f"/applications/{app_id}/kyc", json={"status": "PASS"}, headers=headers("kyc"))
+    client.post(f"/applications/{app_id}/fraud", json={"risk_score": 10}, headers=headers("fraud"))
+    client.post(f"/applications/{app_id}/credit-score", json={"score": CREDIT_SCORE}, headers=headers("credit"))
+    plan = client.post(f"/applications/{app_id}/decision/plan", json={}, headers=headers("plan")).json()
+    response = client.post(f"/applications/{app_id}/decision/execute", json={"plan_id": plan["plan_id"]}, headers=headers("execute"))
+    assert response.status_code == 200, response.text
+    assert response.json()["decision"] == "APPROVE"
+    return app_id
+
+def results(job_id: str, app_id: str):
+    conn = get_read_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT old_decision, new_decision FROM redecision_results WHERE job_id = :job_id AND application_id = :app_id",
+            {"job_id": job_id, "app_id": app_id}
+        )
+        return cursor.fetchall()
+    finally:
+        release_connection(conn)
+
+def test_decision_keeps_check_results(client, approved_id):
+    data = client.get(f"/applications/{approved_id}").json()["decision_data"]
+    assert data["decision"] == "APPROVE"
+    assert data["kyc_result"] == {"status": "PASS"}
+    assert data["credit_score"] == CREDIT_SCORE
+
+def test_threshold_change_flips_decided_application(client, approved_id):
+    unchanged = RedecisionJob().run()
+    assert results(unchanged["job_id"], approved_id) == []
+
+    raised = RedecisionJob(policy={"MIN_CREDIT_SCORE": CREDIT_SCORE + 1}).run()
+    assert raised["changed"] >= 1
+    assert results(raised["job_id"], approved_id) == [("APPROVE", "REJECT")]
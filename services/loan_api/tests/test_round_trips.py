@@ -0,0 +1,81 @@
+"""
+Database round trips per read endpoint, from the X-DB-Round-Trips header
+(DB_COUNT_ROUND_TRIPS=true, see conftest.py). A change that adds a round trip
+to one of these paths fails here; update the counts only on purpose.
+"""
+import asyncio
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from loan_api import main, main_async
+from loan_api.common import ROUND_TRIPS_HEADER
+from loan_api.db import start_round_trip_count, stop_round_trip_count
+
+APPLICANT = {"applicant_id": "a", "applicant_name": "n", "amount": 1000, "income": 90000, "debt": 100}
+
+@pytest.fixture(scope="module", params=[main, main_async], ids=["sync", "async"])
+def app_module(request):
+    return request.param
+
+@pytest.fixture(scope="module")
+def client(app_module):
+    with TestClient(app_module.app) as c:
+        yield c
+
+@pytest.fixture
+def app_id(client):
+    """An application with three audit rows (created, KYC, fraud)."""
+    key = str(uuid.uuid4())
+    app_id = client.post("/applications", json=APPLICANT, headers={"Idempotency-Key": f"{key}-create"}).json()["id"]
+    client.post(f"/applications/{app_id}/kyc", json={"status": "PASS"}, headers={"Idempotency-Key": f"{key}-kyc"})
+    client.post(f"/applications/{app_id}/fraud", json={"risk_score": 10}, headers={"Idempotency-Key": f"{key}-fraud"})
+    return app_id
+
+def round_trips(response, status_code: int = 200) -> int:
+    assert response.status_code == status_code, response.text
+    return int(response.headers[ROUND_TRIPS_HEADER])
+
+def test_get_application(client, app_id):
+    # Snapshot cache miss: version check, then the full row
+    first = client.get(f"/applications/{app_id}")
+    assert round_trips(first) == 2
+    # Hit: the version check only
+    assert round_trips(client.get(f"/applications/{app_id}")) == 1
+    etag = first.headers["ETag"]
+    assert round_trips(client.get(f"/applications/{app_id}", headers={"If-None-Match": etag}), 304) == 1
+    assert round_trips(client.get("/applications/missing"), 404) == 1
+
+def test_audit(client, app_id):
+    response = client.get(f"/applications/{app_id}/audit")
+    assert round_trips(response) == 1
+    assert len(response.json()) == 3
+
+    page = client.get(f"/applications/{app_id}/audit?limit=2")
+    assert round_trips(page) == 1
+    cursor = page.json()["next_cursor"]
+    assert cursor
+    assert round_trips(client.get(f"/applications/{app_id}/audit?limit=2&cursor={cursor}")) == 1
+
+async def streamed(response) -> tuple:
+    """Body and round trips of a StreamingResponse, counted while its body is produced."""
+    started = start_round_trip_count()
+    try:
+        body = "".join([chunk async for chunk in response.body_iterator])
+    finally:
+        trips = stop_round_trip_count(started)
+    return body, trips
+
+def test_audit_stream(app_module, client, app_id):
+    # The header is stamped when the response starts, before the body queries,
+    # so the stream is counted around its body, on the app's event loop
+    async def stream():
+        response = app_module.stream_audit(app_id, cursor=None, consistency_token=None)
+        if asyncio.iscoroutine(response):
+            response = await response
+        return await streamed(response)
+
+    body, trips = client.portal.call(stream)
+    assert len(body.splitlines()) == 3
+    assert trips == 1
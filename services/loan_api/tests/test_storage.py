@@ -0,0 +1,183 @@
+"""
+The two storage backends must stay interchangeable: storage.oracle and
+storage.sqlite define every statement of the repository interface with the same
+binds, and every SQLite statement runs against the embedded schema.
+
+An edit to an Oracle statement fails test_oracle_statements_unchanged until
+storage/sqlite.py is checked against it and ORACLE_DIGESTS is updated.
+"""
+import datetime
+import hashlib
+import re
+import sqlite3
+
+import oracledb
+import pytest
+
+from loan_api import embedded
+from loan_api.lifecycle import APP_NOT_FOUND_ERROR, INVALID_TRANSITION_ERROR
+from loan_api.storage import base, oracle, sqlite
+
+REPOSITORIES = ("IdempotencyRepository", "ApplicationRepository", "PlanRepository", "AuditRepository", "RedecisionRepository")
+
+# Positional (:1 / ?1) and named (:name) binds, outside of string literals and PL/SQL assignments
+_LITERAL = re.compile(r"'[^']*'")
+_BIND = re.compile(r"[:?](\w+)")
+
+def binds(sql: str) -> set:
+    return set(_BIND.findall(_LITERAL.sub("''", sql)))
+
+def statements(backend):
+    """(repository.attribute[field], statement) of one backend, including the audit page variants."""
+    for name in REPOSITORIES:
+        repo = getattr(backend, name)()
+        for attr in getattr(base, name).__annotations__:
+            value = getattr(repo, attr)
+            if isinstance(value, dict):
+                for field, sql in value.items():
+                    yield f"{name}.{attr}[{field}]", sql
+            else:
+                yield f"{name}.{attr}", value
+    repo = backend.AuditRepository()
+    for after in (None, (datetime.datetime(2024, 1, 2), 7)):
+        for limit in (None, 5):
+            yield f"AuditRepository.page({after is not None}, {limit})", repo.page("app", after, limit)[0]
+
+# Clauses appended by AuditRepository.page
+FRAGMENTS = ("AuditRepository.AUDIT_PAGE_AFTER_SQL", "AuditRepository.AUDIT_PAGE_LIMIT_SQL")
+
+ORACLE = dict(statements(oracle))
+SQLITE = dict(statements(sqlite))
+
+def normalized_digest(sql: str) -> str:
+    return hashlib.sha256(" ".join(sql.split()).encode()).hexdigest()[:12]
+
+# Whitespace-normalized Oracle statements of the repository attributes
+ORACLE_DIGESTS = {
+    "ApplicationRepository.ACCEPT_OFFER_SQL": "2c652baea63a",
+    "ApplicationRepository.BOOK_APPLICATION_SQL": "b0615837674e",
+    "ApplicationRepository.BOOK_TRANSITION_SQL": "08752db2f1c8",
+    "ApplicationRepository.INSERT_APPLICATION_SQL": "3d6889dd4323",
+    "ApplicationRepository.INSERT_BOOKING_SQL": "72100a74d91c",
+    "ApplicationRepository.PATCH_DECISION_DATA_CHECKED_SQL[credit_score]": "eb121b103d2e",
+    "ApplicationRepository.PATCH_DECISION_DATA_CHECKED_SQL[fraud_result]": "97bfdf71c452",
+    "ApplicationRepository.PATCH_DECISION_DATA_CHECKED_SQL[kyc_result]": "0dcdcd204eba",
+    "ApplicationRepository.PATCH_DECISION_DATA_SQL[credit_score]": "9922368e3c7a",
+    "ApplicationRepository.PATCH_DECISION_DATA_SQL[fraud_result]": "aea1271e7aae",
+    "ApplicationRepository.PATCH_DECISION_DATA_SQL[kyc_result]": "ad9e923527a2",
+    "ApplicationRepository.PERSIST_DECISION_SQL": "939f534ff150",
+    "ApplicationRepository.SELECT_APPLICATION_SNAPSHOT_SQL": "25d75e4253f4",
+    "ApplicationRepository.SELECT_APPLICATION_SQL": "3c00a94e1e35",
+    "ApplicationRepository.SELECT_APPLICATION_VERSION_SQL": "77e3036743f4",
+    "ApplicationRepository.SELECT_STATUSES_SQL": "04c17a55e26d",
+    "AuditRepository.AUDIT_PAGE_AFTER_SQL": "5ded84af1b92",
+    "AuditRepository.AUDIT_PAGE_LIMIT_SQL": "fd3b7bddbb94",
+    "AuditRepository.INSERT_AUDIT_SQL": "696e7f1d7a34",
+    "AuditRepository.SELECT_AUDIT_PAGE_SQL": "1c78a2768e7f",
+    "AuditRepository.SELECT_AUDIT_SQL": "0e3cca000ae4",
+    "IdempotencyRepository.CHECK_AND_LOCK_SQL": "8b1ac48658ed",
+    "IdempotencyRepository.COMPLETE_SQL": "4b21ca056fdc",
+    "IdempotencyRepository.FAIL_SQL": "db987cf246a9",
+    "IdempotencyRepository.LOCK_INSERT_SQL": "0770db630ad1",
+    "PlanRepository.INSERT_DECISION_CACHE_SQL": "249075a7d4fa",
+    "PlanRepository.INSERT_PLAN_SQL": "732a1e4e7b24",
+    "PlanRepository.MARK_PLAN_EXECUTED_SQL": "2e4125d5a080",
+    "PlanRepository.SELECT_DECISION_CACHE_SQL": "5625a6971d02",
+    "PlanRepository.SELECT_PLAN_SUMMARY_SQL": "56cfa8975d64",
+    "RedecisionRepository.CHECKPOINT_SQL": "b080128e9486",
+    "RedecisionRepository.FINISH_SQL": "4a3051fda47e",
+    "RedecisionRepository.INSERT_JOB_SQL": "f902424728e9",
+    "RedecisionRepository.INSERT_RESULT_SQL": "e5660deefd83",
+    "RedecisionRepository.SELECT_CHUNK_SQL": "339160e9034f",
+    "RedecisionRepository.SELECT_JOB_SQL": "4d1b579e8038",
+}
+
+def test_backends_define_the_same_statements():
+    assert ORACLE.keys() == SQLITE.keys()
+    for name, sql in {**ORACLE, **SQLITE}.items():
+        assert isinstance(sql, str) and sql.strip(), name
+
+@pytest.mark.parametrize("name", sorted(ORACLE))
+def test_same_binds(name):
+    if SQLITE[name] in embedded.PROCEDURES and not name.startswith("ApplicationRepository.PATCH_DECISION_DATA_CHECKED_SQL"):
+        pytest.skip("procedure: binds are checked by running it")
+    # PL/SQL out binds are assigned (:outcome := ...), locals are not binds
+    assert binds(ORACLE[name]) == binds(SQLITE[name])
+
+def test_procedure_binds_match_the_plsql():
+    oracle_repo, sqlite_repo = oracle.ApplicationRepository(), sqlite.ApplicationRepository()
+    for op in ("accept_offer", "book"):
+        args = ("app", "details") if op == "accept_offer" else ("app", "booking", "2024-01-02", "details")
+        statement, op_binds = getattr(oracle_repo, op)(*args)
+        assert binds(statement) == set(op_binds), op
+        assert getattr(sqlite_repo, op)(*args)[0] in embedded.PROCEDURES, op
+    assert sqlite.IdempotencyRepository.CHECK_AND_LOCK_SQL in embedded.PROCEDURES
+    assert binds(oracle.IdempotencyRepository.CHECK_AND_LOCK_SQL) == {
+        "key", "route", "phash", "request_mode", "execution_mode", "lease_seconds",
+        "outcome", "existing_route", "response_body"
+    }
+
+@pytest.fixture(scope="module")
+def schema_db():
+    db = embedded._open(":memory:")
+    db.executescript(embedded.SCHEMA)
+    yield db
+    db.close()
+
+@pytest.mark.parametrize("name", sorted(SQLITE))
+def test_sqlite_statement_prepares(schema_db, name):
+    sql = SQLITE[name]
+    if sql in embedded.PROCEDURES:
+        pytest.skip("procedure")
+    if name in FRAGMENTS:
+        pytest.skip("fragment, prepared in the AuditRepository.page variants")
+    names = binds(sql)
+    if all(n.isdigit() for n in names):
+        params = [None] * max(map(int, names), default=0)
+    else:
+        params = dict.fromkeys(names)
+    try:
+        schema_db.execute(f"EXPLAIN {sql}", params)
+    except sqlite3.Error as e:
+        pytest.fail(f"{name}: {e}")
+
+def test_oracle_statements_unchanged():
+    changed = sorted(
+        name for name, sql in ORACLE.items()
+        if ".page(" not in name and ORACLE_DIGESTS.get(name) != normalized_digest(sql)
+    )
+    assert not changed, f"Oracle statements changed: {changed}; update storage/sqlite.py to match, then ORACLE_DIGESTS"
+
+@pytest.fixture
+def embedded_conn(tmp_path):
+    pool = embedded.create_pool(str(tmp_path / "storage.db"), min=1, max=1)
+    conn = pool.acquire()
+    yield conn
+    conn.close()
+    pool.close()
+
+def raises_ora(code):
+    return pytest.raises(oracledb.DatabaseError, match=f"ORA-{code:05d}")
+
+def test_sqlite_transitions_raise_like_plsql(embedded_conn):
+    repo = sqlite.ApplicationRepository()
+    cursor = embedded_conn.cursor()
+    cursor.execute(*repo.insert("app", '{"amount": 1000}'))
+
+    with raises_ora(APP_NOT_FOUND_ERROR):
+        cursor.execute(*repo.accept_offer("missing", "{}"))
+    with raises_ora(INVALID_TRANSITION_ERROR):
+        cursor.execute(*repo.accept_offer("app", "{}"))
+    with raises_ora(APP_NOT_FOUND_ERROR):
+        cursor.execute(*repo.patch_decision_data("missing", "kyc_result", '{"status": "PASS"}'))
+
+    cursor.execute(*repo.persist_decision("app", "APPROVE", "{}"))
+    cursor.execute(*repo.accept_offer("app", "{}"))
+    cursor.execute(*repo.book("app", "b1", "not a date", "{}"))
+    with raises_ora(INVALID_TRANSITION_ERROR):
+        cursor.execute(*repo.book("app", "b2", None, "{}"))
+
+    cursor.execute("SELECT booking_id, principal, activation_date FROM bookings")
+    assert cursor.fetchall() == [("b1", 1000, datetime.date.today().isoformat())]
+    cursor.execute(*sqlite.AuditRepository().select("app"))
+    assert [row[1] for row in cursor.fetchall()] == ["OFFER_ACCEPTED", "BOOKING_CREATED"]
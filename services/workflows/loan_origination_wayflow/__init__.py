@@ -1,3 +1,3 @@
-from .workflow import create_loan_workflow
+from .workflow import create_loan_workflow, loan_workflow, LOAN_WORKFLOW_NAME, decision_version
 
-__all__ = ["create_loan_workflow"]
+__all__ = ["create_loan_workflow", "loan_workflow", "LOAN_WORKFLOW_NAME", "decision_version"]
@@ -1,9 +1,19 @@
 import os
-import json
 import logging
 from typing import Any, Dict, List
-from workflows.wayflow import Wayflow, WorkflowContext, Step
-from decision_agent import AgentRunner, LoanDecisionAgent
+import numpy as np
+from workflows.wayflow import Wayflow, WorkflowContext, Step, register_workflow
+from decision_agent import LoanDecisionAgent, get_runner, spec_registry
+
+logger = logging.getLogger("loan_origination_wayflow")
+
+# Agent Spec locations (services/decision_agent/agent_spec)
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__))) # services/
+SPEC_PATH = os.path.join(_BASE_DIR, "decision_agent/agent_spec/manifest.yaml")
+TOOLS_PATH = os.path.join(_BASE_DIR, "decision_agent/agent_spec/tools.yaml")
+
+# The agent is stateless, so a single instance is shared by all runs
+_agent = LoanDecisionAgent()
 
 # Define Tools (Mock or Real Logic)
 def tool_get_application_snapshot(application_id: str):
@@ -27,6 +37,15 @@ def tool_price_offer(credit_score: int, amount: float):
     
     return {"rate": base_rate, "term": 36, "monthly_payment": amount * (1 + base_rate/100) / 36} # Simplified
 
+def tool_price_offer_batch(credit_scores: np.ndarray, amounts: np.ndarray):
+    # Vectorized tool_price_offer; same operations in the same order, so results are bit-identical
+    rates = np.where(credit_scores > 750, 4.5, np.where(credit_scores < 650, 6.0, 5.0))
+    return {
+        "rate": rates,
+        "term": np.full(rates.shape, 36),
+        "monthly_payment": amounts * (1 + rates/100) / 36
+    }
+
 # Steps
 
 def step_initialize(ctx: WorkflowContext):
@@ -37,7 +56,21 @@ def step_initialize(ctx: WorkflowContext):
             raise ValueError(f"Missing input: {r}")
     return {"status": "Initialized"}
 
+def decision_version() -> str:
+    """
+    Version of the decision logic: Agent Spec fingerprint plus the agent's policy thresholds.
+    Cached decision results are only reused while this is unchanged.
+    """
+    thresholds = f"fraud{_agent.FRAUD_REJECT_SCORE}-credit{_agent.MIN_CREDIT_SCORE}"
+    return f"{spec_registry.get_fingerprint(SPEC_PATH, TOOLS_PATH)}:{thresholds}"
+
 def step_decision_agent(ctx: WorkflowContext):
+    # Result reused from the decision cache (loan_api.decision); later steps still run
+    precomputed = ctx.payload.get("precomputed_decision")
+    if precomputed is not None:
+        ctx.state["decision_result"] = precomputed
+        return precomputed
+
     # Mock Mode Check
     if ctx.payload.get("mock_agent"):
         logger.info("Using MOCK AGENT for decision.")
@@ -51,14 +84,8 @@ def step_decision_agent(ctx: WorkflowContext):
             }
         }
 
-    # Setup Runner
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__))) # services/
-    spec_path = os.path.join(base_dir, "decision_agent/agent_spec/manifest.yaml")
-    tools_path = os.path.join(base_dir, "decision_agent/agent_spec/tools.yaml")
-    
-    # Initialize Agent
-    agent = LoanDecisionAgent()
-    runner = AgentRunner(spec_path, tools_path, agent)
+    # Setup Runner (spec is parsed once per process and hot-reloaded if the files change)
+    runner = get_runner(SPEC_PATH, TOOLS_PATH, _agent)
     
     # Prepare Inputs
     agent_inputs = {
@@ -93,8 +120,9 @@ def step_persist(ctx: WorkflowContext):
     # "System of Record... Oracle Database".
     # If the workflow is responsible for updating the Application status, we should do it here.
     
-    db_conn = ctx.payload.get("db_conn")
-    if not db_conn:
+    # Callback of the caller (loan_api.decision.decision_persister), bound to its connection and storage backend
+    persist_decision = ctx.payload.get("persist_decision")
+    if not persist_decision:
         # If no DB connection provided, maybe we return instruction to persist?
         # But requirements say "System of Record... Used for... decisions".
         # So we should write.
@@ -103,13 +131,8 @@ def step_persist(ctx: WorkflowContext):
     decision = ctx.state["decision_result"]["decision"]
     app_id = ctx.payload["application"]["id"]
     
-    # Update DB
-    # We use raw sql or similar
-    cursor = db_conn.cursor()
-    cursor.execute(
-        "UPDATE applications SET status = :1, decision_data = :2, updated_at = CURRENT_TIMESTAMP WHERE id = :3",
-        [decision, json.dumps(ctx.state["decision_result"]), app_id]
-    )
+    # Update DB; raises if the application is gone or past the decision stage
+    persist_decision(app_id, decision, ctx.state["decision_result"])
     # Commit handled by caller or here? 
     # Usually transaction management is outside.
     # We won't commit here to allow atomic transaction with idempotency.
@@ -118,9 +141,14 @@ def step_persist(ctx: WorkflowContext):
 
 # Workflow Construction
 
+LOAN_WORKFLOW_NAME = "LoanOrigination"
+
 def create_loan_workflow() -> Wayflow:
-    wf = Wayflow("LoanOrigination")
+    wf = Wayflow(LOAN_WORKFLOW_NAME)
     wf.add_step("initialize", step_initialize)
     wf.add_step("agent_decision", step_decision_agent)
     wf.add_step("persist_result", step_persist)
     return wf
+
+# Compiled once at import; callers fetch it with get_workflow(LOAN_WORKFLOW_NAME)
+loan_workflow = register_workflow(create_loan_workflow())
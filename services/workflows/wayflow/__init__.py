@@ -1,3 +1,3 @@
-from .core import Wayflow, Step, WorkflowContext
+from .core import Wayflow, Step, WorkflowContext, CompiledWorkflow, register_workflow, get_workflow
 
-__all__ = ["Wayflow", "Step", "WorkflowContext"]
+__all__ = ["Wayflow", "Step", "WorkflowContext", "CompiledWorkflow", "register_workflow", "get_workflow"]
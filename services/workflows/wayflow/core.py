@@ -1,6 +1,7 @@
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import logging
+import threading
 
 logger = logging.getLogger("wayflow")
 
@@ -26,6 +27,17 @@ class Wayflow:
     
     def add_step(self, name: str, func: Callable[['WorkflowContext'], Any]):
         self.steps.append(Step(name, func))
+
+    def compile(self) -> "CompiledWorkflow":
+        """
+        Freezes the current step list into an immutable, reusable plan.
+        Later add_step() calls do not affect the compiled plan.
+        """
+        return CompiledWorkflow(
+            name=self.name,
+            step_names=tuple(step.name for step in self.steps),
+            step_funcs=tuple(step.func for step in self.steps)
+        )
         
     def run(self, context: WorkflowContext) -> Dict[str, Any]:
         logger.info(f"Starting workflow {self.name} run_id={context.run_id} mode={context.mode}")
@@ -55,3 +67,54 @@ class Wayflow:
             "results": results,
             "final_state": context.state
         }
+
+@dataclass(frozen=True)
+class CompiledWorkflow:
+    """
+    Immutable execution plan produced by Wayflow.compile().
+    Safe to share between threads and run any number of times.
+    """
+    name: str
+    step_names: Tuple[str, ...]
+    step_funcs: Tuple[Callable[['WorkflowContext'], Any], ...]
+
+    def run(self, context: WorkflowContext) -> Dict[str, Any]:
+        # Logging guards are evaluated once per run instead of formatting per step
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Starting workflow %s run_id=%s mode=%s", self.name, context.run_id, context.mode)
+
+        results = {}
+        for name, func in zip(self.step_names, self.step_funcs):
+            if debug:
+                logger.debug("Executing step %s", name)
+            try:
+                results[name] = func(context)
+            except Exception as e:
+                logger.error("Step %s failed: %s", name, e)
+                results[name] = {"error": str(e)}
+                raise
+
+        return {
+            "workflow": self.name,
+            "run_id": context.run_id,
+            "status": "COMPLETED",
+            "results": results,
+            "final_state": context.state
+        }
+
+# Registry of compiled workflows, populated once at import time by workflow modules
+_registry: Dict[str, CompiledWorkflow] = {}
+_registry_lock = threading.Lock()
+
+def register_workflow(wf: Wayflow) -> CompiledWorkflow:
+    compiled = wf.compile()
+    with _registry_lock:
+        _registry[compiled.name] = compiled
+    return compiled
+
+def get_workflow(name: str) -> CompiledWorkflow:
+    try:
+        return _registry[name]
+    except KeyError:
+        raise KeyError(f"Workflow '{name}' is not registered")